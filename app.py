@@ -1,13 +1,19 @@
 import streamlit as st
-import os
-import sqlite3
 
-from db import init_db
+from db import init_db, reset_db, vacuum_db, get_conn
 from ui_form import render_form
+from ui_import import render_import
 from ui_audit import render_audit
+from ui_history import render_history
 from ui_screening import render_screening
+from ui_skill_search import render_skill_search
 from ui_quality import render_quality
+from ui_perf import render_perf_panel, capture_options
 from generate_dummy_data import generate_dummy_data
+from cache import invalidate as invalidate_cache
+from score_store import refresh_scores, refresh_if_due
+from skills import ROLE_PROFILES, DEFAULT_PROFILE
+import perf
 
 
 # ==========================================================
@@ -16,27 +22,6 @@ from generate_dummy_data import generate_dummy_data
 st.set_page_config(page_title="HC Employee DB", layout="wide")
 
 
-# ==========================================================
-# AUTO UPGRADE AUDIT TABLE (ADD username COLUMN IF NEEDED)
-# ==========================================================
-def auto_upgrade_audit_table():
-    conn = sqlite3.connect("hc_employee.db")
-    cur = conn.cursor()
-
-    # cek struktur tabel audit_log
-    cur.execute("PRAGMA table_info(audit_log)")
-    columns = [row[1] for row in cur.fetchall()]
-
-    # jika kolom username belum ada → tambahkan
-    if "username" not in columns:
-        cur.execute("ALTER TABLE audit_log ADD COLUMN username TEXT;")
-        conn.commit()
-
-    conn.close()
-
-auto_upgrade_audit_table()
-
-
 # ==========================================================
 # SESSION LOGIN STATE
 # ==========================================================
@@ -95,9 +80,13 @@ def main_menu():
     username = st.session_state.username
     role = USER_ROLE_MAP.get(username, DEFAULT_ROLE)
 
-    # memastikan DB ada
+    # memastikan DB ada + skema terbaru (sekali per proses)
     init_db()
 
+    # skor tersimpan diperbarui sebelum halaman dirender (bukan di
+    # tengah render) — tanpa tulis bila sudah mutakhir
+    refresh_if_due(get_conn(), ROLE_PROFILES[DEFAULT_PROFILE])
+
     # ================ SIDEBAR USER INFO ==================
     st.sidebar.title("User Info")
     st.sidebar.success(f"👤 Login sebagai: {username}")
@@ -111,48 +100,66 @@ def main_menu():
         "Pilih Halaman:",
         [
             "Input / Update Data Pegawai",
+            "Import Data Pegawai",
             "Screening Kandidat / Talent Readiness",
+            "Cari Pegawai per Skill",
             "Data Quality Dashboard",
-            "Audit Trail"
+            "Audit Trail",
+            "Riwayat Data (As-Of)"
         ]
     )
 
     # ================ HC SYSTEM ADMIN TOOLS ==================
+    perf_panel = None
     if role == "HC System Bureau Head":
         st.sidebar.markdown("### 🛠 Database Tools")
 
         if st.sidebar.button("🧨 RESET DATABASE"):
-            try:
-                os.remove("hc_employee.db")
-            except:
-                pass
-            init_db()
+            reset_db()
+            invalidate_cache()
             st.sidebar.success("Database berhasil direset!")
 
         if st.sidebar.button("🚀 Generate Dummy Employees"):
             msg = generate_dummy_data(50)
+            refresh_scores(get_conn(), ROLE_PROFILES[DEFAULT_PROFILE])
+            invalidate_cache()
             st.sidebar.success(msg)
 
         if st.sidebar.button("♻ Optimize Database"):
-            conn = sqlite3.connect("hc_employee.db")
-            conn.execute("VACUUM")
-            conn.close()
+            vacuum_db()
             st.sidebar.success("Database optimized!")
 
+        # diisi setelah halaman dirender (angka render ini ikut tampil)
+        perf_panel = st.sidebar.container()
+
 
     # ===================== PAGE ROUTER =====================
+    profile, trace_memory = capture_options() if perf_panel is not None else (False, False)
+
+    with perf.page_render(menu, profile, trace_memory) as capture:
+        if menu == "Input / Update Data Pegawai":
+            render_form(role, username)
+
+        elif menu == "Import Data Pegawai":
+            render_import(role, username)
+
+        elif menu == "Screening Kandidat / Talent Readiness":
+            render_screening()
+
+        elif menu == "Cari Pegawai per Skill":
+            render_skill_search()
 
-    if menu == "Input / Update Data Pegawai":
-        render_form(role, username)
+        elif menu == "Data Quality Dashboard":
+            render_quality()
 
-    elif menu == "Screening Kandidat / Talent Readiness":
-        render_screening()
+        elif menu == "Audit Trail":
+            render_audit()
 
-    elif menu == "Data Quality Dashboard":
-        render_quality()
+        elif menu == "Riwayat Data (As-Of)":
+            render_history()
 
-    elif menu == "Audit Trail":
-        render_audit()
+    if perf_panel is not None:
+        render_perf_panel(perf_panel, capture)
 
 
 # ==========================================================
@@ -1,8 +1,14 @@
-import sqlite3
 import json
-from datetime import datetime
+import os
+import zlib
+from datetime import datetime, timedelta
+import pandas as pd
 import pytz
 
+from db import get_conn, init_db
+from audit_writer import AsyncAuditWriter
+from perf import timed
+
 # ============================================
 # TIMEZONE WIB FIX — 100% MATCH LAPTOP USER
 # ============================================
@@ -12,60 +18,327 @@ def now_wib():
     return datetime.now().astimezone(WIB).isoformat(timespec="seconds")
 
 
+def to_wib_iso(value):
+    """
+    Normalisasi action_time ke format kanonik 'YYYY-MM-DDTHH:MM:SS+07:00'.
+    Timestamp naive (audit.py lama) dianggap waktu lokal server.
+    Dengan satu format & satu offset, urutan teks = urutan waktu.
+    """
+    ts = datetime.fromisoformat(str(value).strip().replace(" ", "T"))
+    return ts.astimezone(WIB).isoformat(timespec="seconds")
+
+
+# ============================================
+# PAYLOAD AUDIT (hanya field yang berubah)
+# ============================================
+# changes = {field: [before, after]} → JSON ringkas, dikompres zlib
+# bila cukup besar. Byte pertama menandai format payload.
+PAYLOAD_JSON = b"j"
+PAYLOAD_ZLIB = b"z"      # zlib dengan preset dictionary _ZDICT_V1
+COMPRESS_MIN_BYTES = 128
+AUDIT_COMPRESS = os.environ.get("HC_AUDIT_COMPRESS", "1") != "0"
+
+# Preset dictionary: nama field yang berulang di setiap payload.
+# JANGAN diubah — payload lama hanya bisa didekode dengan isi yang sama.
+# Format baru = byte penanda baru + dictionary baru.
+_ZDICT_V1 = (
+    '"employee_id":[null,"full_name":[null,"email":[null,'
+    '"department":[null,"bureau":[null,"job_title":[null,'
+    '"mpl_level":[null,"work_location":[null,"date_joined":[null,'
+    '"years_in_bureau":[null,"years_in_department":[null,'
+    '"avg_perf_3yr":[null,"has_discipline_issue":[null,'
+    '"technical_skills":[null,"soft_skills":[null,'
+    '"certifications":[null,"notes":[null,'
+    '"is_candidate_bureau_head":[null,"data_quality_score":[null,'
+    '"last_updated":[null,'
+).encode("utf-8")
+
+
+def change_set(before, after):
+    """Field di 'after' yang baru atau nilainya berbeda dari 'before'."""
+    return {
+        k: [before.get(k), v]
+        for k, v in after.items()
+        if k not in before or before[k] != v
+    }
+
+
+def encode_changes(changes, compress=None):
+    raw = json.dumps(changes, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+    if compress is None:
+        compress = AUDIT_COMPRESS and len(raw) >= COMPRESS_MIN_BYTES
+    if compress:
+        comp = zlib.compressobj(6, zdict=_ZDICT_V1)
+        return PAYLOAD_ZLIB + comp.compress(raw) + comp.flush()
+    return PAYLOAD_JSON + raw
+
+
+def decode_changes(payload):
+    if not payload:
+        return {}
+    payload = bytes(payload)
+    body = payload[1:]
+    if payload[:1] == PAYLOAD_ZLIB:
+        decomp = zlib.decompressobj(zdict=_ZDICT_V1)
+        body = decomp.decompress(body) + decomp.flush()
+    return json.loads(body.decode("utf-8"))
+
+
+def _legacy_json(raw):
+    if raw in (None, "", "null"):
+        return {}
+    try:
+        value = json.loads(raw)
+    except (TypeError, ValueError):
+        return {}
+    return value if isinstance(value, dict) else {}
+
+
+def row_changes(row):
+    """
+    changes satu baris audit_log (dict / Series). Baris format lama
+    (before_data / after_data / detail JSON) dibaca sebagai fallback.
+    """
+    if row.get("changes") is not None:
+        return decode_changes(row["changes"])
+
+    before = _legacy_json(row.get("before_data"))
+    after = _legacy_json(row.get("after_data"))
+    if before or after:
+        return change_set(before, after)
+
+    # audit.py lama: detail = {field: {"before": .., "after": ..}}
+    detail = _legacy_json(row.get("detail"))
+    return {
+        k: [v.get("before"), v.get("after")]
+        for k, v in detail.items() if isinstance(v, dict)
+    }
+
+
+def split_changes(changes):
+    """changes → (before, after) berisi field yang berubah saja."""
+    before = {k: v[0] for k, v in changes.items()}
+    after = {k: v[1] for k, v in changes.items()}
+    return before, after
+
+
+AUDIT_INSERT_SQL = """
+    INSERT INTO audit_log
+    (action_time, username, user_role, action_type,
+     employee_id, detail, changes, ip_address)
+    VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+"""
+
+
+def audit_row(action_time, username, user_role, action_type,
+              employee_id, detail, before, after, ip="0.0.0.0"):
+    """Satu baris parameter untuk AUDIT_INSERT_SQL (dipakai juga oleh bulk insert)."""
+    return (
+        action_time,
+        username,
+        user_role,
+        action_type,
+        employee_id,
+        detail,
+        encode_changes(change_set(before, after)),
+        ip
+    )
+
+
+def diff_detail(before, after):
+    """Ringkasan singkat kolom detail log UPDATE: daftar field yang berubah."""
+    return "Update: " + ", ".join(change_set(before, after))
+
+
+def _audit_changes(row):
+    _, changes, before_data, after_data, detail = row
+    return row_changes({
+        "changes": changes, "before_data": before_data,
+        "after_data": after_data, "detail": detail,
+    })
+
+
+def employee_images(conn, employee_id, audit_id):
+    """
+    Rekonstruksi data lengkap pegawai sebelum & sesudah satu entri
+    audit. Bila pegawai masih ada: mundur dari baris employees saat
+    ini dengan membatalkan entri yang lebih baru — tidak bergantung
+    pada adanya log INSERT (dummy, bulk load, data pra-audit).
+    Pegawai yang sudah dihapus: replay maju dari image penuh tertua
+    (before_data yang dipertahankan migrasi v5) bila ada.
+    """
+    cur = conn.execute("SELECT * FROM employees WHERE employee_id=?", (employee_id,))
+    current = cur.fetchone()
+
+    if current is not None:
+        state = dict(zip([d[0] for d in cur.description], current))
+        rows = conn.execute(
+            "SELECT id, changes, before_data, after_data, detail FROM audit_log "
+            "WHERE employee_id=? AND (action_time, id) >= "
+            "(SELECT action_time, id FROM audit_log WHERE id=?) "
+            "ORDER BY action_time DESC, id DESC",
+            (employee_id, audit_id)
+        ).fetchall()
+        after = state
+        for row in rows:
+            if row[0] == audit_id:
+                after = dict(state)
+            for k, (old, _) in _audit_changes(row).items():
+                state[k] = old
+        return state, after
+
+    rows = conn.execute(
+        "SELECT id, changes, before_data, after_data, detail FROM audit_log "
+        "WHERE employee_id=? AND (action_time, id) <= "
+        "(SELECT action_time, id FROM audit_log WHERE id=?) "
+        "ORDER BY action_time, id",
+        (employee_id, audit_id)
+    ).fetchall()
+
+    state = {}
+    before = {}
+    for row in rows:
+        state = {**_legacy_json(row[2]), **state}     # image penuh tertua
+        if row[0] == audit_id:
+            before = dict(state)
+        for k, (_, new) in _audit_changes(row).items():
+            state[k] = new
+    return before, state
+
+
+# ============================================
+# QUERY AUDIT (filter + keyset pagination)
+# ============================================
+AUDIT_PAGE_SIZE = 50
+
+
+def _day_start(day):
+    """date / 'YYYY-MM-DD' → awal hari WIB dalam format action_time."""
+    return f"{str(day)[:10]}T00:00:00+07:00"
+
+
+@timed("audit.query")
+def query_audit(conn, date_from=None, date_to=None, username=None,
+                employee_id=None, action_type=None, cursor=None,
+                limit=AUDIT_PAGE_SIZE):
+    """
+    Satu halaman audit_log, terbaru lebih dulu (action_time, id DESC).
+
+    - date_from / date_to : rentang tanggal WIB (inklusif)
+    - cursor              : (action_time, id) baris terakhir halaman
+                            sebelumnya; None = halaman pertama
+
+    Mengembalikan (DataFrame, next_cursor); next_cursor None bila
+    tidak ada halaman berikutnya.
+    """
+    where, params = [], []
+
+    if date_from:
+        where.append("action_time >= ?")
+        params.append(_day_start(date_from))
+    if date_to:
+        next_day = datetime.fromisoformat(str(date_to)[:10]) + timedelta(days=1)
+        where.append("action_time < ?")
+        params.append(_day_start(next_day.date()))
+    if username:
+        where.append("username = ?")
+        params.append(username)
+    if employee_id:
+        where.append("employee_id = ?")
+        params.append(employee_id)
+    if action_type:
+        where.append("action_type = ?")
+        params.append(action_type)
+    if cursor is not None:
+        where.append("(action_time, id) < (?, ?)")
+        params += [cursor[0], cursor[1]]
+
+    sql = "SELECT * FROM audit_log"
+    if where:
+        sql += " WHERE " + " AND ".join(where)
+    sql += " ORDER BY action_time DESC, id DESC LIMIT ?"
+    params.append(limit + 1)
+
+    df = pd.read_sql_query(sql, conn, params=params)
+
+    next_cursor = None
+    if len(df) > limit:
+        df = df.iloc[:limit]
+        last = df.iloc[-1]
+        next_cursor = (last["action_time"], int(last["id"]))
+
+    return df, next_cursor
+
+
+def audit_usernames(conn):
+    """Daftar username yang pernah tercatat (untuk pilihan filter)."""
+    rows = conn.execute(
+        "SELECT DISTINCT username FROM audit_log "
+        "WHERE username IS NOT NULL ORDER BY username"
+    ).fetchall()
+    return [r[0] for r in rows]
+
+
+# sync (default) | group | group_full — lihat audit_writer.py
+AUDIT_DURABILITY = os.environ.get("HC_AUDIT_DURABILITY", "sync")
+
+
 class AuditTrail:
-    def __init__(self, db_path="hc_employee.db", logfile="audit_log.txt"):
+    def __init__(self, db_path="hc_employee.db", logfile="audit_log.txt",
+                 durability=AUDIT_DURABILITY):
         self.db_path = db_path
         self.logfile = logfile
         self._init_table()
 
-    def _init_table(self):
-        conn = sqlite3.connect(self.db_path)
-        conn.execute("""
-            CREATE TABLE IF NOT EXISTS audit_log (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                action_time TEXT,
-                username TEXT,
-                user_role TEXT,
-                action_type TEXT,
-                employee_id TEXT,
-                detail TEXT,
-                before_data TEXT,
-                after_data TEXT,
-                ip_address TEXT
+        self.writer = None
+        if durability != "sync":
+            self.writer = AsyncAuditWriter(
+                AUDIT_INSERT_SQL, db_path=db_path,
+                durability=durability, fallback_log=logfile
             )
-        """)
-        conn.commit()
-        conn.close()
+
+    def _init_table(self):
+        # skema audit_log dikelola oleh migrasi (migrations.py)
+        init_db(self.db_path)
 
 
     # =====================================================
     # INTERNAL WRITE DB FUNCTION
     # =====================================================
+    @timed("audit.write")
     def _write_db_log(self, action_time, username, user_role,
                       action_type, employee_id, detail, before, after, ip):
 
-        conn = sqlite3.connect(self.db_path)
-        cur = conn.cursor()
+        row = audit_row(
+            action_time, username, user_role, action_type,
+            employee_id, detail, before, after, ip
+        )
 
-        cur.execute("""
-            INSERT INTO audit_log
-            (action_time, username, user_role, action_type,
-             employee_id, detail, before_data, after_data, ip_address)
-            VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)
-        """, (
-            action_time,
-            username,
-            user_role,
-            action_type,
-            employee_id,
-            detail,
-            json.dumps(before, ensure_ascii=False),
-            json.dumps(after, ensure_ascii=False),
-            ip
-        ))
+        if self.writer is not None:
+            self.writer.submit(row)
+            return
 
+        conn = get_conn(self.db_path)
+        cur = conn.cursor()
+        cur.execute(AUDIT_INSERT_SQL, row)
         conn.commit()
-        conn.close()
+
+    # =====================================================
+    # FLUSH / METRIK (mode async)
+    # =====================================================
+    def flush(self, timeout=None):
+        if self.writer is not None:
+            return self.writer.flush(timeout)
+        return True
+
+    def close(self):
+        if self.writer is not None:
+            self.writer.close()
+
+    def metrics(self) -> dict:
+        if self.writer is not None:
+            return self.writer.metrics()
+        return {"durability": "sync"}
 
 
     # =====================================================
@@ -87,10 +360,7 @@ class AuditTrail:
     def log_update(self, username, user_role, employee_id, before, after, ip="0.0.0.0"):
         action_time = now_wib()
 
-        detail = json.dumps({
-            k: {"before": before[k], "after": after[k]}
-            for k in after if k in before and before[k] != after[k]
-        }, ensure_ascii=False)
+        detail = diff_detail(before, after)
 
         self._write_db_log(
             action_time, username, user_role,
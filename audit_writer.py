@@ -0,0 +1,242 @@
+# ============================================================
+#  audit_writer.py
+#  Penulis audit asinkron: antrean terbatas + satu thread latar
+#  yang menulis banyak entri dalam satu transaksi (group commit).
+# ============================================================
+
+import atexit
+import base64
+import json
+import queue
+import threading
+import time
+
+from db import DB_NAME, get_conn
+
+# sync       : tulis + commit langsung di thread pemanggil (perilaku lama)
+# group      : antrean, commit per batch, PRAGMA synchronous=NORMAL (WAL)
+# group_full : antrean, commit per batch, PRAGMA synchronous=FULL
+#              (fsync tiap batch — tahan mati listrik)
+DURABILITY_MODES = ("sync", "group", "group_full")
+
+DEFAULT_QUEUE_SIZE = 10_000
+DEFAULT_BATCH_SIZE = 500
+DEFAULT_FLUSH_INTERVAL = 0.2        # detik
+DEFAULT_PUT_TIMEOUT = 5.0           # detik menunggu saat antrean penuh
+
+_STOP = object()
+
+
+class AsyncAuditWriter:
+    """
+    Antrean audit berbatas. submit() mengembalikan kendali segera;
+    thread latar mengumpulkan entri selama flush_interval (atau
+    sampai batch_size) lalu menulis semuanya dengan satu commit.
+
+    Back-pressure: bila antrean penuh, pemanggil menunggu hingga
+    put_timeout; bila tetap penuh, entri ditulis sinkron di thread
+    pemanggil (tidak ada entri yang dibuang).
+    """
+
+    def __init__(self, insert_sql, db_path=DB_NAME, durability="group",
+                 max_queue=DEFAULT_QUEUE_SIZE, batch_size=DEFAULT_BATCH_SIZE,
+                 flush_interval=DEFAULT_FLUSH_INTERVAL,
+                 put_timeout=DEFAULT_PUT_TIMEOUT, fallback_log="audit_log.txt"):
+        if durability not in DURABILITY_MODES or durability == "sync":
+            raise ValueError(f"Mode durability async tidak dikenal: {durability}")
+
+        self.insert_sql = insert_sql
+        self.db_path = db_path
+        self.durability = durability
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.put_timeout = put_timeout
+        self.fallback_log = fallback_log
+
+        self._queue = queue.Queue(maxsize=max_queue)
+        self._lock = threading.Lock()
+        self._closed = False
+        self._metrics = {
+            "enqueued": 0,
+            "written": 0,
+            "batches": 0,
+            "max_queue_depth": 0,
+            "blocked_puts": 0,
+            "blocked_seconds": 0.0,
+            "sync_fallbacks": 0,
+            "write_errors": 0,
+            "last_batch_rows": 0,
+            "last_batch_ms": 0.0,
+        }
+
+        self._thread = threading.Thread(
+            target=self._run, name="audit-writer", daemon=True
+        )
+        self._thread.start()
+        atexit.register(self.close)
+
+    # --------------------------------------------------------
+    # API PEMANGGIL
+    # --------------------------------------------------------
+    def submit(self, row):
+        """Antrekan satu tuple parameter untuk insert_sql."""
+        self.submit_many([row])
+
+    def submit_many(self, rows):
+        if self._closed:
+            self._write_sync(rows)
+            return
+
+        for row in rows:
+            try:
+                self._queue.put_nowait(row)
+            except queue.Full:
+                started = time.perf_counter()
+                try:
+                    self._queue.put(row, timeout=self.put_timeout)
+                except queue.Full:
+                    self._bump("sync_fallbacks")
+                    self._write_sync([row])
+                    continue
+                finally:
+                    with self._lock:
+                        self._metrics["blocked_puts"] += 1
+                        self._metrics["blocked_seconds"] += time.perf_counter() - started
+            self._bump("enqueued")
+
+        depth = self._queue.qsize()
+        with self._lock:
+            if depth > self._metrics["max_queue_depth"]:
+                self._metrics["max_queue_depth"] = depth
+
+    def flush(self, timeout=None):
+        """Tunggu sampai semua entri yang sudah diantrekan tertulis."""
+        if timeout is None:
+            self._queue.join()
+            return True
+        deadline = time.monotonic() + timeout
+        while self._queue.unfinished_tasks:
+            if time.monotonic() > deadline:
+                return False
+            time.sleep(0.01)
+        return True
+
+    def close(self):
+        """Flush sisa antrean lalu hentikan thread (dipanggil juga saat exit)."""
+        if self._closed:
+            return
+        self._closed = True
+        self._queue.put(_STOP)
+        self._thread.join()
+
+    def metrics(self) -> dict:
+        with self._lock:
+            out = dict(self._metrics)
+        out["queue_depth"] = self._queue.qsize()
+        out["durability"] = self.durability
+        return out
+
+    # --------------------------------------------------------
+    # THREAD LATAR
+    # --------------------------------------------------------
+    def _bump(self, key, n=1):
+        with self._lock:
+            self._metrics[key] += n
+
+    def _next_batch(self):
+        """Blok sampai ada entri, lalu kumpulkan sampai interval/batch habis."""
+        first = self._queue.get()
+        batch = [first]
+        if first is _STOP:
+            return batch
+
+        deadline = time.monotonic() + self.flush_interval
+        while len(batch) < self.batch_size:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break
+            try:
+                item = self._queue.get(timeout=remaining)
+            except queue.Empty:
+                break
+            batch.append(item)
+            if item is _STOP:
+                break
+        return batch
+
+    def _run(self):
+        while True:
+            batch = self._next_batch()
+            taken = len(batch)
+            stop = batch[-1] is _STOP
+            rows = [r for r in batch if r is not _STOP]
+
+            # saat berhenti, habiskan sisa antrean tanpa menunggu
+            while stop:
+                try:
+                    rows.append(self._queue.get_nowait())
+                    taken += 1
+                except queue.Empty:
+                    break
+
+            # thread harus tetap hidup dan task_done selalu terpanggil,
+            # kalau tidak flush()/close() menunggu selamanya
+            try:
+                if rows:
+                    self._write_batch(rows)
+            except Exception:
+                self._bump("write_errors")
+            finally:
+                for _ in range(taken):
+                    self._queue.task_done()
+            if stop:
+                return
+
+    def _write_batch(self, rows):
+        started = time.perf_counter()
+        conn = None
+        try:
+            conn = get_conn(self.db_path)
+            conn.execute(
+                "PRAGMA synchronous=FULL" if self.durability == "group_full"
+                else "PRAGMA synchronous=NORMAL"
+            )
+            conn.executemany(self.insert_sql, rows)
+            conn.commit()
+        except Exception:
+            self._bump("write_errors")
+            if conn is not None:
+                try:
+                    conn.rollback()
+                except Exception:
+                    pass
+            self._write_fallback_log(rows)
+            return
+
+        with self._lock:
+            self._metrics["written"] += len(rows)
+            self._metrics["batches"] += 1
+            self._metrics["last_batch_rows"] = len(rows)
+            self._metrics["last_batch_ms"] = (time.perf_counter() - started) * 1000
+
+    def _write_sync(self, rows):
+        conn = get_conn(self.db_path)
+        conn.executemany(self.insert_sql, rows)
+        conn.commit()
+        self._bump("written", len(rows))
+
+    def _write_fallback_log(self, rows):
+        """
+        Batch yang gagal ditulis ke DB disimpan ke file agar tidak hilang.
+        Payload changes (bytes, lihat audit_engine.encode_changes) ditulis
+        sebagai base64.
+        """
+        with open(self.fallback_log, "a", encoding="utf-8") as f:
+            for row in rows:
+                f.write(json.dumps(list(row), ensure_ascii=False, default=_jsonable) + "\n")
+
+
+def _jsonable(value):
+    if isinstance(value, (bytes, bytearray, memoryview)):
+        return base64.b64encode(bytes(value)).decode("ascii")
+    raise TypeError(f"{type(value).__name__} tidak bisa di-serialisasi ke JSON")
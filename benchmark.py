@@ -0,0 +1,405 @@
+# ============================================================
+#  benchmark.py
+#  Benchmark reproducible: dataset sintetis ber-seed (1k / 100k /
+#  1M pegawai), waktu wall + peak memori per tahap strategist,
+#  jalur TRI screening, throughput tulis AuditTrail dan latensi
+#  query halaman audit. Hasil dibandingkan dengan baseline JSON run
+#  sebelumnya; baseline hanya diganti bila tidak ada regresi (atau
+#  --accept). Sebelum diukur, output jalur streaming / paralel /
+#  inkremental dicek identik dengan score_employees.
+#
+#  python benchmark.py --sizes 1k 100k
+# ============================================================
+
+import argparse
+import json
+import os
+import platform
+import shutil
+import sqlite3
+import sys
+import tempfile
+import time
+import tracemalloc
+from contextlib import contextmanager
+from datetime import datetime
+
+import numpy as np
+import pandas as pd
+
+from db import DB_NAME, get_conn, close_conn
+from cache import invalidate
+from data_strategist import (
+    compute_data_quality, detect_anomalies, compute_competency_gap,
+    compute_talent_readiness, generate_insights, score_employees,
+    run_pipeline_streaming, score_parallel, SCORED_COLUMNS, DQ_REQUIRED_COLUMNS
+)
+from generate_dummy_data import build_employees, generate_bulk_employees
+from score_store import refresh_scores, load_scored_employees, STATE_SIGNATURE, STATE_AS_OF
+from skills import ROLE_PROFILES, DEFAULT_PROFILE
+from audit_engine import AuditTrail, query_audit
+from audit_writer import DURABILITY_MODES
+from ui_screening import query_candidates
+
+SIZES = {"1k": 1_000, "100k": 100_000, "1m": 1_000_000}
+SEED = 20240601
+REPEAT = 3
+RESULTS_DIR = "benchmark_results"
+
+# regresi: lebih lambat / lebih boros > 20% dan selisih absolut
+# melewati ambang noise
+REGRESSION_RATIO = 0.20
+NOISE_SECONDS = 0.005
+NOISE_MB = 1.0
+
+AUDIT_WRITES = 2_000        # log_update per mode durability
+AUDIT_DB_ROWS = 100_000     # batas pegawai yang diberi riwayat audit
+CHECK_CHUNK_ROWS = 7_919    # ukuran chunk ganjil → batas chunk tidak rata
+CHECK_WORKERS = 2
+CHECK_CHANGED = 0.01        # porsi pegawai yang diubah untuk cek inkremental
+CHECK_NULL_ROWS = 2_000     # pegawai untuk cek kolom teks wajib NULL
+CHECK_NULL_RATE = 0.2       # porsi sel kolom wajib yang dikosongkan
+
+
+# ============================================================
+# PENGUKURAN
+# ============================================================
+def measure(fn, repeat=REPEAT, setup=None) -> dict:
+    """
+    Waktu wall terbaik dari 'repeat' run (tanpa tracemalloc), lalu
+    satu run terpisah di bawah tracemalloc untuk peak memori (alokasi
+    NumPy/pandas ikut tercatat). setup() dijalankan di luar timer.
+    """
+    times = []
+    for _ in range(repeat):
+        if setup is not None:
+            setup()
+        start = time.perf_counter()
+        fn()
+        times.append(time.perf_counter() - start)
+
+    if setup is not None:
+        setup()
+    tracemalloc.start()
+    try:
+        fn()
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+
+    return {
+        "seconds": round(min(times), 6),
+        "median_seconds": round(float(np.median(times)), 6),
+        "peak_mb": round(peak / 2**20, 2),
+    }
+
+
+@contextmanager
+def _workdir(path):
+    """
+    Modul UI/cache memakai DB_NAME relatif (hc_employee.db); benchmark
+    dijalankan di direktori sementara agar memakai database sintetis.
+    """
+    previous = os.getcwd()
+    os.chdir(path)
+    try:
+        yield
+    finally:
+        os.chdir(previous)
+
+
+# ============================================================
+# CEK KEBENARAN OUTPUT
+# ============================================================
+def _mismatches(expected: pd.DataFrame, actual: pd.DataFrame, columns) -> int:
+    """Jumlah baris yang berbeda pada 'columns' (NaN == NaN)."""
+    bad = np.zeros(len(expected), dtype=bool)
+    for col in columns:
+        a = expected[col].to_numpy(dtype=float)
+        b = actual[col].to_numpy(dtype=float)
+        bad |= ~((a == b) | (np.isnan(a) & np.isnan(b)))
+    return int(bad.sum())
+
+
+def check_pipeline_paths(df, required) -> dict:
+    """score_employees vs mode streaming (chunk) dan paralel, as_of sama."""
+    as_of = pd.Timestamp.now(tz="UTC")
+    expected = score_employees(df, required, as_of=as_of)
+    insights = generate_insights(expected)
+
+    parts = []
+    _, streamed_insights = run_pipeline_streaming(
+        (df.iloc[i:i + CHECK_CHUNK_ROWS] for i in range(0, len(df), CHECK_CHUNK_ROWS)),
+        required, as_of=as_of, sink=parts.append
+    )
+    streamed = pd.concat(parts, ignore_index=True)
+    parallel, aggregate = score_parallel(df, required, CHECK_WORKERS, as_of=as_of)
+
+    return {
+        "streaming": _mismatches(expected, streamed, SCORED_COLUMNS)
+                     + int(streamed_insights != insights),
+        "parallel": _mismatches(expected, parallel, SCORED_COLUMNS)
+                    + int(aggregate.insights() != insights),
+    }
+
+
+def check_null_text() -> int:
+    """
+    Completeness: kolom teks wajib NULL (dibaca dari SQLite — pandas 3
+    memuatnya sebagai NaN, pandas lama sebagai None) harus dihitung
+    kosong, sama dengan "". Mengembalikan jumlah skor DQ yang berbeda.
+    """
+    rng = np.random.default_rng(SEED)
+    nulls = build_employees(CHECK_NULL_ROWS, rng)
+    blanks = nulls.copy()
+    for col in DQ_REQUIRED_COLUMNS:
+        rows = rng.random(len(nulls)) < CHECK_NULL_RATE
+        nulls.loc[rows, col] = None
+        blanks.loc[rows, col] = ""
+
+    conn = sqlite3.connect(":memory:")
+    try:
+        nulls.to_sql("employees", conn, index=False)
+        loaded = pd.read_sql_query("SELECT * FROM employees", conn)
+    finally:
+        conn.close()
+
+    as_of = pd.Timestamp.now(tz="UTC")
+    return _mismatches(
+        compute_data_quality(blanks, as_of), compute_data_quality(loaded, as_of),
+        ["data_quality_score_adv"]
+    )
+
+
+def check_incremental(required) -> int:
+    """
+    Skor tersimpan setelah refresh inkremental vs skor ulang penuh
+    dari nol. Sebagian pegawai diubah dulu agar jalur inkremental
+    benar-benar menghitung ulang sebagian baris.
+    """
+    conn = get_conn()
+    refresh_scores(conn, required)
+    rng = np.random.default_rng(SEED)
+    ids = [r[0] for r in conn.execute("SELECT employee_id FROM employees")]
+    changed = rng.choice(ids, max(1, int(len(ids) * CHECK_CHANGED)), replace=False)
+    conn.executemany(
+        "UPDATE employees SET technical_skills='SAP, SQL', avg_perf_3yr=4.5, "
+        "last_updated=? WHERE employee_id=?",
+        ((datetime.now().strftime("%Y-%m-%dT%H:%M:%S"), eid) for eid in changed.tolist())
+    )
+    conn.commit()
+    refresh_scores(conn, required)
+
+    stored = load_scored_employees(conn)
+    as_of = datetime.fromisoformat(conn.execute(
+        "SELECT value FROM pipeline_state WHERE key=?", (STATE_AS_OF,)
+    ).fetchone()[0])
+    expected = score_employees(stored, required, as_of=as_of)
+    return _mismatches(expected, stored, SCORED_COLUMNS)
+
+
+# ============================================================
+# BENCHMARK
+# ============================================================
+def bench_stages(n, repeat) -> dict:
+    """Tahap strategist 1–5 pada DataFrame di memori."""
+    required = ROLE_PROFILES[DEFAULT_PROFILE]
+    df = build_employees(n, np.random.default_rng(SEED))
+    scored = score_employees(df, required)
+
+    return {
+        "compute_data_quality": measure(lambda: compute_data_quality(df), repeat),
+        "detect_anomalies": measure(lambda: detect_anomalies(df), repeat),
+        "compute_competency_gap": measure(lambda: compute_competency_gap(df, required), repeat),
+        "compute_talent_readiness": measure(lambda: compute_talent_readiness(scored), repeat),
+        "generate_insights": measure(lambda: generate_insights(scored), repeat),
+    }
+
+
+def bench_screening(repeat) -> dict:
+    """Jalur TRI halaman screening: refresh skor (penuh / tanpa perubahan) + query kandidat."""
+    conn = get_conn()
+    required = ROLE_PROFILES[DEFAULT_PROFILE]
+
+    def reset_scores():
+        conn.execute("DELETE FROM pipeline_state WHERE key=?", (STATE_SIGNATURE,))
+        conn.commit()
+
+    results = {
+        "screening_refresh_full": measure(lambda: refresh_scores(conn, required),
+                                          repeat, setup=reset_scores),
+    }
+    refresh_scores(conn, required)
+    results["screening_refresh_incremental"] = measure(
+        lambda: refresh_scores(conn, required), repeat
+    )
+
+    department = conn.execute("SELECT department FROM employees LIMIT 1").fetchone()[0]
+    results["screening_query"] = measure(
+        lambda: query_candidates(department, 60, 100), repeat, setup=invalidate
+    )
+    return results
+
+
+def bench_audit_writes(db_path) -> dict:
+    """Throughput log_update lewat AuditTrail untuk tiap mode durability."""
+    before = {"full_name": "Budi Santoso", "job_title": "Staff", "avg_perf_3yr": 3.5}
+    after = {"full_name": "Budi Santoso", "job_title": "Supervisor", "avg_perf_3yr": 4.1}
+
+    results = {}
+    for mode in DURABILITY_MODES:
+        trail = AuditTrail(db_path=db_path, logfile=os.devnull, durability=mode)
+
+        def write():
+            for i in range(AUDIT_WRITES):
+                trail.log_update("bench", "HC Admin", f"EMP{i % 1000:07d}", before, after)
+            trail.flush()
+
+        result = measure(write, repeat=1)
+        trail.close()
+        result["rows_per_second"] = round(AUDIT_WRITES / result["seconds"], 1)
+        results[f"audit_write_{mode}"] = result
+    return results
+
+
+def bench_audit_queries(repeat) -> dict:
+    """Latensi query_audit untuk filter yang dipakai halaman audit."""
+    conn = get_conn()
+    first, cursor = query_audit(conn)
+    employee_id = first["employee_id"].iloc[0] if not first.empty else None
+    day = str(first["action_time"].iloc[0])[:10] if not first.empty else None
+
+    cases = {
+        "audit_query_first_page": {},
+        "audit_query_next_page": {"cursor": cursor},
+        "audit_query_username": {"username": "bench"},
+        "audit_query_employee": {"employee_id": employee_id},
+        "audit_query_date": {"date_from": day, "date_to": day},
+    }
+    return {
+        name: measure(lambda kw=kwargs: query_audit(conn, **kw), repeat)
+        for name, kwargs in cases.items()
+    }
+
+
+def run_size(label, repeat) -> dict:
+    n = SIZES[label]
+    required = ROLE_PROFILES[DEFAULT_PROFILE]
+    checks = check_pipeline_paths(build_employees(n, np.random.default_rng(SEED)), required)
+    checks["null_text"] = check_null_text()
+    results = bench_stages(n, repeat)
+
+    workdir = tempfile.mkdtemp(prefix=f"hc_bench_{label}_")
+    try:
+        with _workdir(workdir):
+            start = time.perf_counter()
+            generate_bulk_employees(n, seed=SEED, with_audit=n <= AUDIT_DB_ROWS)
+            setup_seconds = time.perf_counter() - start
+
+            results.update(bench_screening(repeat))
+            results.update(bench_audit_writes(DB_NAME))
+            results.update(bench_audit_queries(repeat))
+            checks["incremental"] = check_incremental(required)
+            close_conn()
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+
+    return {
+        "size": label,
+        "rows": n,
+        "seed": SEED,
+        "repeat": repeat,
+        "created": datetime.now().isoformat(timespec="seconds"),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "setup_seconds": round(setup_seconds, 2),
+        "mismatches": checks,
+        "results": results,
+    }
+
+
+# ============================================================
+# BASELINE & REGRESI
+# ============================================================
+def baseline_path(results_dir, label):
+    return os.path.join(results_dir, f"baseline_{label}.json")
+
+
+def load_baseline(results_dir, label):
+    try:
+        with open(baseline_path(results_dir, label), encoding="utf-8") as f:
+            return json.load(f)
+    except FileNotFoundError:
+        return None
+
+
+def save_baseline(results_dir, run):
+    os.makedirs(results_dir, exist_ok=True)
+    with open(baseline_path(results_dir, run["size"]), "w", encoding="utf-8") as f:
+        json.dump(run, f, indent=2)
+
+
+def find_regressions(previous, current, ratio=REGRESSION_RATIO) -> list:
+    """(benchmark, metrik, nilai lama, nilai baru) yang memburuk melewati ambang."""
+    if previous is None:
+        return []
+
+    regressions = []
+    for name, now in current["results"].items():
+        before = previous["results"].get(name)
+        if before is None:
+            continue
+        for metric, noise in (("seconds", NOISE_SECONDS), ("peak_mb", NOISE_MB)):
+            old, new = before.get(metric), now.get(metric)
+            if old is None or new is None:
+                continue
+            if new > old * (1 + ratio) and new - old > noise:
+                regressions.append((name, metric, old, new))
+    return regressions
+
+
+def print_report(run, previous, regressions):
+    flagged = {(name, metric) for name, metric, _, _ in regressions}
+    print(f"\n== {run['size']} ({run['rows']:,} pegawai, setup {run['setup_seconds']} s) ==")
+    print(f"{'benchmark':34} {'detik':>10} {'sebelumnya':>10} {'peak MB':>9} {'sebelumnya':>10}")
+    for name, now in run["results"].items():
+        before = (previous or {}).get("results", {}).get(name, {})
+        mark = " ".join(
+            f"⚠ {metric}" for metric in ("seconds", "peak_mb") if (name, metric) in flagged
+        )
+        print(f"{name:34} {now['seconds']:10.4f} {before.get('seconds', float('nan')):10.4f} "
+              f"{now['peak_mb']:9.1f} {before.get('peak_mb', float('nan')):10.1f} {mark}")
+    for path, bad in run["mismatches"].items():
+        status = "OK" if bad == 0 else f"✗ {bad:,} baris berbeda"
+        print(f"cek output {path:23} {status}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark pipeline strategist, screening dan audit.")
+    parser.add_argument("--sizes", nargs="+", default=list(SIZES), choices=list(SIZES))
+    parser.add_argument("--repeat", type=int, default=REPEAT)
+    parser.add_argument("--results-dir", default=RESULTS_DIR)
+    parser.add_argument("--no-save", action="store_true", help="jangan timpa baseline")
+    parser.add_argument("--accept", action="store_true",
+                        help="jadikan run ini baseline walau ada regresi")
+    args = parser.parse_args()
+
+    results_dir = os.path.abspath(args.results_dir)
+    failed = False
+    for label in args.sizes:
+        previous = load_baseline(results_dir, label)
+        run = run_size(label, args.repeat)
+        regressions = find_regressions(previous, run)
+        print_report(run, previous, regressions)
+        wrong = any(run["mismatches"].values())
+        failed |= bool(regressions) or wrong
+
+        # run yang regresi / outputnya salah tidak menggantikan baseline
+        if args.no_save:
+            continue
+        if (regressions or wrong) and not args.accept:
+            print(f"baseline {label} tidak diganti (gunakan --accept untuk menerima run ini)")
+        else:
+            save_baseline(results_dir, run)
+
+    sys.exit(1 if failed else 0)
@@ -0,0 +1,173 @@
+# ============================================================
+#  cache.py
+#  Cache hasil load + pipeline, dikunci pada versi database.
+#  Interaksi widget (filter, slider) tidak lagi memicu query
+#  ulang selama isi database tidak berubah.
+# ============================================================
+
+import os
+import sys
+import threading
+from collections import OrderedDict
+
+import pandas as pd
+
+from db import DB_NAME, open_conn, on_reset
+from perf import count
+
+DEFAULT_MAX_ENTRIES = 32
+DEFAULT_MAX_BYTES = 512 * 1024 * 1024
+
+_MISSING = object()
+
+
+def _sizeof(value) -> int:
+    if isinstance(value, pd.DataFrame):
+        return int(value.memory_usage(deep=True).sum())
+    if isinstance(value, pd.Series):
+        return int(value.memory_usage(deep=True))
+    if isinstance(value, (bytes, bytearray)):
+        return len(value)
+    if isinstance(value, (tuple, list)):
+        return sum(_sizeof(v) for v in value)
+    return sys.getsizeof(value)
+
+
+class LRUCache:
+    """LRU dengan batas jumlah entri dan perkiraan total byte."""
+
+    def __init__(self, max_entries=DEFAULT_MAX_ENTRIES, max_bytes=DEFAULT_MAX_BYTES):
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self._data = OrderedDict()
+        self._bytes = 0
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key, default=None):
+        with self._lock:
+            if key in self._data:
+                self._data.move_to_end(key)
+                self.hits += 1
+                return self._data[key][0]
+            self.misses += 1
+            return default
+
+    def __contains__(self, key):
+        with self._lock:
+            return key in self._data
+
+    def put(self, key, value):
+        size = _sizeof(value)
+        if size > self.max_bytes:
+            return
+        with self._lock:
+            if key in self._data:
+                self._bytes -= self._data.pop(key)[1]
+            self._data[key] = (value, size)
+            self._bytes += size
+            while self._data and (len(self._data) > self.max_entries
+                                  or self._bytes > self.max_bytes):
+                _, (_, evicted) = self._data.popitem(last=False)
+                self._bytes -= evicted
+
+    def pop(self, key):
+        with self._lock:
+            if key in self._data:
+                self._bytes -= self._data.pop(key)[1]
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+            self._bytes = 0
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "entries": len(self._data),
+                "bytes": self._bytes,
+                "hits": self.hits,
+                "misses": self.misses,
+            }
+
+
+# ============================================================
+# VERSI DATABASE
+# ============================================================
+_results = LRUCache()
+_lock = threading.Lock()
+_generation = 0
+_watcher = None          # (inode, koneksi)
+
+
+def _data_version(db_path, inode):
+    """
+    PRAGMA data_version dari koneksi pengamat khusus: nilainya berubah
+    setiap kali koneksi LAIN (termasuk proses lain) melakukan commit.
+    Koneksi dibuka ulang bila file database diganti (inode berbeda).
+    """
+    global _watcher
+    with _lock:
+        if _watcher is None or _watcher[0] != inode:
+            if _watcher is not None:
+                _watcher[1].close()
+            _watcher = (inode, open_conn(db_path, check_same_thread=False))
+        return _watcher[1].execute("PRAGMA data_version").fetchone()[0]
+
+
+def db_version(db_path=DB_NAME):
+    """
+    Penanda versi isi database: generasi invalidasi lokal, inode file
+    (berubah bila database di-reset) dan PRAGMA data_version.
+    """
+    try:
+        inode = os.stat(db_path).st_ino
+    except FileNotFoundError:
+        return (_generation, None, None)
+    return (_generation, inode, _data_version(db_path, inode))
+
+
+def cached(namespace, params, loader, db_path=DB_NAME):
+    """
+    Ambil hasil dari cache atau jalankan loader().
+    Bila loader sendiri menulis ke database (mis. refresh_scores),
+    hasilnya baru di-cache pada pemanggilan berikutnya ketika versi
+    database sudah stabil.
+    """
+    key = (namespace, params, db_version(db_path))
+    value = _results.get(key, _MISSING)
+    if value is not _MISSING:
+        count("cache.hit")
+        return value
+
+    count("cache.miss")
+    value = loader()
+    if db_version(db_path) == key[2]:
+        _results.put(key, value)
+    return value
+
+
+def invalidate():
+    """Dipanggil setelah penyimpanan data (form, reset, generate dummy)."""
+    global _generation
+    with _lock:
+        _generation += 1
+    _close_watcher()
+    _results.clear()
+
+
+def _close_watcher():
+    global _watcher
+    with _lock:
+        if _watcher is not None:
+            _watcher[1].close()
+            _watcher = None
+
+
+on_reset(_close_watcher)
+
+
+def cache_stats() -> dict:
+    return _results.stats()
+
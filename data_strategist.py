@@ -3,13 +3,60 @@
 #  Transformasi HC: Data Keeper → Data Strategist
 # ============================================================
 
+from concurrent.futures import ProcessPoolExecutor
+import multiprocessing
+
 import pandas as pd
 import numpy as np
 
+from perf import timed
+from skills import competency_gap_matrix, normalize_skill
+from talent_readiness import (
+    compute_tri, coerce_numeric, DEFAULT_TRI_FORMULA, READY_THRESHOLD
+)
+
 # ============================================================
 # 1. ADVANCED DATA QUALITY SCORING
 # ============================================================
-def compute_data_quality(df: pd.DataFrame) -> pd.DataFrame:
+DQ_REQUIRED_COLUMNS = [
+    "employee_id", "full_name", "department", "bureau",
+    "job_title", "mpl_level", "work_location",
+    "date_joined"
+]
+
+# Timeliness: data dianggap segar bila last_updated <= 1 tahun,
+# setengah nilai bila <= 2 tahun, selebihnya (atau kosong) 0.
+TIMELINESS_FRESH_DAYS = 365
+TIMELINESS_STALE_DAYS = 730
+
+
+def _text(series: pd.Series):
+    """
+    Akses .str yang aman: elemen non-string menjadi NaN
+    (setara isinstance(x, str) pada versi per-baris).
+    """
+    try:
+        return series.str
+    except AttributeError:
+        return pd.Series(np.nan, index=series.index, dtype=object).str
+
+
+def _numeric(series: pd.Series) -> pd.Series:
+    return pd.to_numeric(series, errors="coerce")
+
+
+def _flag(series: pd.Series) -> np.ndarray:
+    # hasil .str dapat berisi NaN untuk elemen non-string → False
+    return (series == True).to_numpy(dtype=bool)
+
+
+def _is_blank(series: pd.Series) -> np.ndarray:
+    values = series.to_numpy(dtype=object)
+    return pd.isna(values) | (values == "")
+
+
+@timed("stage.compute_data_quality")
+def compute_data_quality(df: pd.DataFrame, as_of=None, copy: bool = True) -> pd.DataFrame:
     """
     Skor kualitas data berbasis 5 dimensi:
     - Completeness (20)
@@ -17,93 +64,158 @@ def compute_data_quality(df: pd.DataFrame) -> pd.DataFrame:
     - Validity (20)
     - Accuracy (20)
     - Timeliness (20)
-    """
-    df = df.copy()
-    score = []
-
-    for idx, row in df.iterrows():
-
-        s = 0
 
-        # COMPLETENESS (kolom wajib)
-        required_cols = [
-            "employee_id", "full_name", "department", "bureau",
-            "job_title", "mpl_level", "work_location",
-            "date_joined"
-        ]
-        completeness_missing = sum([1 for col in required_cols if not row[col]])
-        s += max(0, 20 - (completeness_missing * 3))
-
-        # CONSISTENCY (contoh MPL dengan job_grade)
-        if isinstance(row["mpl_level"], str) and row["mpl_level"].upper().startswith("M"):
-            s += 10
-        if row["avg_perf_3yr"] is not None and 0 <= row["avg_perf_3yr"] <= 5:
-            s += 10
+    Dihitung per kolom (mask boolean per dimensi lalu dijumlahkan),
+    tanpa loop per baris. 'as_of' adalah acuan waktu Timeliness
+    (default: sekarang, UTC). copy=False menulis kolom hasil langsung
+    ke df (dipakai score_employees agar frame hanya disalin sekali).
+    """
+    if copy:
+        df = df.copy()
+    n = len(df)
+
+    # COMPLETENESS (kolom wajib)
+    missing = np.zeros(n, dtype=np.int64)
+    for col in DQ_REQUIRED_COLUMNS:
+        missing += _is_blank(df[col])
+    s = np.maximum(0, 20 - missing * 3)
+
+    # CONSISTENCY (contoh MPL dengan job_grade)
+    mpl_ok = _text(df["mpl_level"]).upper().str.startswith("M")
+    s += np.where(_flag(mpl_ok), 10, 0)
+    perf = _numeric(df["avg_perf_3yr"])
+    s += np.where(perf.between(0, 5), 10, 0)
+
+    # VALIDITY
+    email_ok = _text(df["email"]).contains("@", regex=False)
+    s += np.where(_flag(email_ok), 10, 0)
+    loc_ok = _text(df["work_location"]).len() >= 3
+    s += np.where(loc_ok, 10, 0)
+
+    # ACCURACY (deteksi data aneh)
+    s += np.where(_numeric(df["years_in_department"]) <= 50, 10, 0)
+    s += np.where(_numeric(df["years_in_bureau"]) <= 50, 10, 0)
+
+    # TIMELINESS (umur last_updated)
+    s += _timeliness_points(df, as_of)
+
+    df["data_quality_score_adv"] = s.astype(np.int64)
+    return df
 
-        # VALIDITY
-        if "@" in str(row["email"]):
-            s += 10
-        if isinstance(row["work_location"], str) and len(row["work_location"]) >= 3:
-            s += 10
 
-        # ACCURACY (deteksi data aneh)
-        if row["years_in_department"] <= 50:
-            s += 10
-        if row["years_in_bureau"] <= 50:
-            s += 10
+def _timeliness_points(df: pd.DataFrame, as_of=None) -> np.ndarray:
+    if "last_updated" not in df.columns:
+        return np.zeros(len(df), dtype=np.int64)
 
-        # TIMELINESS
-        s += 20  # placeholder, nanti bisa dicek last_updated
+    if as_of is None:
+        as_of = pd.Timestamp.now(tz="UTC")
+    else:
+        as_of = pd.Timestamp(as_of)
+        as_of = as_of.tz_localize("UTC") if as_of.tzinfo is None else as_of.tz_convert("UTC")
 
-        score.append(s)
+    updated = pd.to_datetime(df["last_updated"], errors="coerce", utc=True, format="ISO8601")
+    age_days = ((as_of - updated) / pd.Timedelta(days=1)).to_numpy(dtype=float)
 
-    df["data_quality_score_adv"] = score
-    return df
+    return np.select(
+        [age_days <= TIMELINESS_FRESH_DAYS, age_days <= TIMELINESS_STALE_DAYS],
+        [20, 10],
+        default=0
+    )
 
 
 # ============================================================
 # 2. ANOMALY DETECTION (DATA JANGGAL)
 # ============================================================
-def detect_anomalies(df: pd.DataFrame) -> pd.DataFrame:
+# Satu bit per aturan pada kolom integer 'anomaly_mask'.
+ANOMALY_BUREAU_GT_DEPT = 1
+ANOMALY_MPL_INVALID = 2
+ANOMALY_MPL_OUT_OF_RANGE = 4
+ANOMALY_MPL_PARSE_ERROR = 8
+ANOMALY_PERF_INVALID = 16
+
+# Urutan label mengikuti urutan pengecekan aturan
+ANOMALY_LABELS = {
+    ANOMALY_BUREAU_GT_DEPT: "Years bureau > years dept",
+    ANOMALY_MPL_INVALID: "MPL invalid",
+    ANOMALY_MPL_OUT_OF_RANGE: "MPL out of normal range",
+    ANOMALY_MPL_PARSE_ERROR: "MPL parsing error",
+    ANOMALY_PERF_INVALID: "Performance > 5 (invalid)",
+}
+
+MPL_MIN = 10
+MPL_MAX = 30
+
+
+def parse_mpl(series: pd.Series):
+    """
+    Parsing MPL sekali jalan: "M12", "m 15", "M+12" → angka.
+    Hasil: (punya prefiks 'M', nilai numerik / NaN bila gagal parse).
+    """
+    mpl = (
+        series.astype(object).where(series.notna(), "")
+        .astype(str).str.upper().str.replace(" ", "", regex=False)
+    )
+    has_prefix = mpl.str.startswith("M") & (mpl.str.len() >= 2)
+    value = pd.to_numeric(
+        mpl.str.extract(r"^M([+-]?\d+)$", expand=False), errors="coerce"
+    )
+    return has_prefix, value
+
+
+@timed("stage.detect_anomalies")
+def detect_anomalies(df: pd.DataFrame, copy: bool = True) -> pd.DataFrame:
     """
     Mendeteksi:
     - Years in bureau lebih besar dari years in dept
-    - MPL tidak sesuai rentang umum M10–M25
+    - MPL tidak sesuai rentang umum M10–M30
     - Kinerja tidak realistis
-    """
-    df = df.copy()
-    issues = []
 
-    for idx, row in df.iterrows():
-        anomaly = []
+    Hasil berupa bitmask integer 'anomaly_mask' (0 = OK).
+    Teks yang mudah dibaca dibuat terpisah lewat anomaly_labels().
+    """
+    if copy:
+        df = df.copy()
+    mask = np.zeros(len(df), dtype=np.int64)
 
-        if row["years_in_bureau"] > row["years_in_department"]:
-            anomaly.append("Years bureau > years dept")
+    years_bureau = _numeric(df["years_in_bureau"])
+    years_dept = _numeric(df["years_in_department"])
+    mask |= np.where(years_bureau > years_dept, ANOMALY_BUREAU_GT_DEPT, 0)
 
-        mpl = str(row["mpl_level"]).upper().replace(" ", "")
-        if not mpl.startswith("M") or len(mpl) < 2:
-            anomaly.append("MPL invalid")
-        else:
-            try:
-                mpl_value = int(mpl[1:])
-                if mpl_value < 10 or mpl_value > 30:
-                    anomaly.append("MPL out of normal range")
-            except:
-                anomaly.append("MPL parsing error")
+    has_prefix, mpl_value = parse_mpl(df["mpl_level"])
 
-        if row["avg_perf_3yr"] > 5:
-            anomaly.append("Performance > 5 (invalid)")
+    mask |= np.where(~has_prefix, ANOMALY_MPL_INVALID, 0)
+    mask |= np.where(has_prefix & mpl_value.isna(), ANOMALY_MPL_PARSE_ERROR, 0)
+    mask |= np.where(
+        has_prefix & ((mpl_value < MPL_MIN) | (mpl_value > MPL_MAX)),
+        ANOMALY_MPL_OUT_OF_RANGE, 0
+    )
 
-        issues.append(", ".join(anomaly) if anomaly else "OK")
+    mask |= np.where(_numeric(df["avg_perf_3yr"]) > 5, ANOMALY_PERF_INVALID, 0)
 
-    df["anomaly_flag"] = issues
+    df["anomaly_mask"] = mask
     return df
 
 
+def anomaly_labels(mask: pd.Series) -> pd.Series:
+    """
+    Menerjemahkan 'anomaly_mask' menjadi teks ("OK" bila 0).
+    Cukup dipanggil untuk baris yang ditampilkan; label dihitung
+    sekali per nilai mask unik.
+    """
+    def describe(value):
+        parts = [label for bit, label in ANOMALY_LABELS.items() if value & bit]
+        return ", ".join(parts) if parts else "OK"
+
+    codes, uniques = pd.factorize(mask.astype(np.int64))
+    labels = np.array([describe(int(v)) for v in uniques], dtype=object)
+    return pd.Series(labels[codes], index=mask.index, dtype=object)
+
+
 # ============================================================
 # 3. KOMPETENSI GAP ANALYSIS
 # ============================================================
-def compute_competency_gap(df: pd.DataFrame, required: dict) -> pd.DataFrame:
+@timed("stage.compute_competency_gap")
+def compute_competency_gap(df: pd.DataFrame, required: dict, copy: bool = True) -> pd.DataFrame:
     """
     Mengukur gap antara competency employee vs kebutuhan jabatan.
     Parameter 'required' adalah dictionary:
@@ -112,103 +224,551 @@ def compute_competency_gap(df: pd.DataFrame, required: dict) -> pd.DataFrame:
         "soft": ["analytical", "communication", "coordination"]
     }
     """
-    df = df.copy()
-    gap_scores = []
-
-    for idx, row in df.iterrows():
-        emp_tech = [x.strip().lower() for x in str(row["technical_skills"]).split(",")]
-        emp_soft = [x.strip().lower() for x in str(row["soft_skills"]).split(",")]
-
-        required_tech = [x.lower() for x in required["technical"]]
-        required_soft = [x.lower() for x in required["soft"]]
-
-        tech_gap = len([t for t in required_tech if t not in emp_tech])
-        soft_gap = len([s for s in required_soft if s not in emp_soft])
-
-        total_gap = tech_gap + soft_gap
-        gap_scores.append(total_gap)
-
-    df["competency_gap_score"] = gap_scores
+    if copy:
+        df = df.copy()
+    gaps = competency_gap_matrix(df, {"required": required})
+    df["competency_gap_score"] = gaps["required"].to_numpy()
     return df
 
 
 # ============================================================
 # 4. TALENT READINESS INDEX (untuk kandidat Bureau Head)
 # ============================================================
-def compute_talent_readiness(df: pd.DataFrame) -> pd.DataFrame:
+@timed("stage.compute_talent_readiness")
+def compute_talent_readiness(df: pd.DataFrame,
+                             formula: str = DEFAULT_TRI_FORMULA,
+                             copy: bool = True) -> pd.DataFrame:
     """
-    Menilai kesiapan talent:
+    Menilai kesiapan talent dengan formula TRI bernama
+    (lihat talent_readiness.TRI_FORMULAS). Default 'strategist_v1':
     - Performance (40%)
     - Tenure (20%)
     - Competency gap (20%)
     - No discipline issue (20%)
     """
-    df = df.copy()
-
-    scores = []
-    for idx, row in df.iterrows():
-        s = 0
-        s += (row["avg_perf_3yr"] / 5) * 40
-        s += min(row["years_in_bureau"] / 5, 1) * 20
-        s += (1 - min(row["competency_gap_score"] / 5, 1)) * 20
-        if not row["has_discipline_issue"]:
-            s += 20
-
-        scores.append(s)
-
-    df["talent_readiness_index"] = [round(x, 1) for x in scores]
+    if copy:
+        df = df.copy()
+    df["talent_readiness_index"] = compute_tri(df, formula).to_numpy()
     return df
 
 
 # ============================================================
 # 5. AUTO INSIGHT GENERATOR
 # ============================================================
-def generate_insights(df: pd.DataFrame) -> list:
+class QuantileSketch:
     """
-    Memberikan insight otomatis berbasis kondisi data.
+    Histogram rentang tetap [lo, hi] — sketsa kuantil yang bisa
+    digabung (jumlahkan bin). Resolusi (hi - lo) / bins; nilai di
+    luar rentang masuk bin ujung, NaN diabaikan.
     """
-    insights = []
 
-    avg_perf = df["avg_perf_3yr"].mean()
-    if avg_perf < 3:
-        insights.append("⚠️ Rata-rata kinerja pegawai rendah (<3). Perlu intervensi HC.")
-    else:
-        insights.append("✅ Kinerja pegawai tergolong baik.")
+    def __init__(self, lo=0.0, hi=100.0, bins=1000):
+        self.lo, self.hi, self.bins = float(lo), float(hi), bins
+        self.counts = np.zeros(bins, dtype=np.int64)
 
-    high_gap = (df["competency_gap_score"] >= 3).sum()
-    if high_gap > 5:
-        insights.append("⚠️ Banyak pegawai memiliki gap kompetensi besar.")
-    else:
-        insights.append("✅ Mayoritas pegawai memiliki kompetensi sesuai kebutuhan.")
+    def update(self, values):
+        values = np.asarray(values, dtype=float)
+        values = values[~np.isnan(values)]
+        idx = ((values - self.lo) / (self.hi - self.lo) * self.bins).astype(np.int64)
+        np.add.at(self.counts, np.clip(idx, 0, self.bins - 1), 1)
 
-    dq = df["data_quality_score_adv"].mean()
-    if dq < 70:
-        insights.append("⚠️ Kualitas data HC perlu perbaikan segera.")
-    else:
-        insights.append("✅ Data HC cukup berkualitas.")
+    def merge(self, other):
+        self.counts += other.counts
+        return self
+
+    @property
+    def count(self) -> int:
+        return int(self.counts.sum())
+
+    def quantile(self, q: float) -> float:
+        """Perkiraan kuantil q (0–1): titik tengah bin; NaN bila kosong."""
+        total = self.count
+        if total == 0:
+            return float("nan")
+        pos = int(np.searchsorted(np.cumsum(self.counts), q * total, side="left"))
+        width = (self.hi - self.lo) / self.bins
+        return self.lo + (min(pos, self.bins - 1) + 0.5) * width
+
+
+class InsightAggregate:
+    """
+    Ringkasan yang bisa digabung untuk insight & metrik dashboard:
+    jumlah, hitungan ambang, hitungan bit anomali, sketsa kuantil
+    TRI / DQ dan (opsional) gap per profil jabatan. Dihitung per
+    chunk lalu merge() — tidak butuh seluruh tabel di memori.
+    """
+
+    HIGH_GAP = 3
+
+    def __init__(self, profiles: dict = None):
+        self.profiles = profiles
+        self.rows = 0
+        self.perf_sum, self.perf_count = 0.0, 0
+        self.dq_sum, self.dq_count = 0.0, 0
+        self.high_gap = 0
+        self.ready = 0
+        self.anomalies = 0
+        self.anomaly_bits = {bit: 0 for bit in ANOMALY_LABELS}
+        self.tri = QuantileSketch(0, 100)
+        self.dq = QuantileSketch(0, 100)
+        n_profiles = len(profiles) if profiles else 0
+        self.profile_gap_sum = np.zeros(n_profiles)
+        self.profile_no_gap = np.zeros(n_profiles, dtype=np.int64)
+
+    @classmethod
+    def from_frame(cls, df: pd.DataFrame, profiles: dict = None):
+        return cls(profiles).update(df)
+
+    def update(self, df: pd.DataFrame):
+        """Tambahkan satu chunk hasil score_employees."""
+        self.rows += len(df)
+
+        perf = _numeric(df["avg_perf_3yr"])
+        self.perf_sum += float(perf.sum())
+        self.perf_count += int(perf.count())
+
+        dq = _numeric(df["data_quality_score_adv"])
+        self.dq_sum += float(dq.sum())
+        self.dq_count += int(dq.count())
+        self.dq.update(dq.to_numpy())
+
+        self.high_gap += int((df["competency_gap_score"] >= self.HIGH_GAP).sum())
+
+        tri = _numeric(df["talent_readiness_index"])
+        self.ready += int((tri >= READY_THRESHOLD).sum())
+        self.tri.update(tri.to_numpy())
+
+        mask = df["anomaly_mask"].fillna(0).to_numpy(dtype=np.int64)
+        self.anomalies += int((mask != 0).sum())
+        for bit in self.anomaly_bits:
+            self.anomaly_bits[bit] += int(((mask & bit) != 0).sum())
+
+        if self.profiles:
+            gaps = competency_gap_matrix(df, self.profiles).to_numpy()
+            self.profile_gap_sum += gaps.sum(axis=0)
+            self.profile_no_gap += (gaps == 0).sum(axis=0)
+        return self
+
+    def merge(self, other):
+        self.rows += other.rows
+        self.perf_sum += other.perf_sum
+        self.perf_count += other.perf_count
+        self.dq_sum += other.dq_sum
+        self.dq_count += other.dq_count
+        self.high_gap += other.high_gap
+        self.ready += other.ready
+        self.anomalies += other.anomalies
+        for bit, n in other.anomaly_bits.items():
+            self.anomaly_bits[bit] += n
+        self.tri.merge(other.tri)
+        self.dq.merge(other.dq)
+        if self.profiles:
+            self.profile_gap_sum += other.profile_gap_sum
+            self.profile_no_gap += other.profile_no_gap
+        return self
+
+    @property
+    def mean_perf(self) -> float:
+        return self.perf_sum / self.perf_count if self.perf_count else float("nan")
+
+    @property
+    def mean_dq(self) -> float:
+        return self.dq_sum / self.dq_count if self.dq_count else float("nan")
+
+    def profile_summary(self) -> pd.DataFrame:
+        """Per profil: jumlah pegawai tanpa gap dan rata-rata gap."""
+        mean_gap = self.profile_gap_sum / self.rows if self.rows else self.profile_gap_sum
+        return pd.DataFrame({
+            "profile": list(self.profiles or {}),
+            "no_gap": self.profile_no_gap,
+            "mean_gap": np.round(mean_gap, 2),
+        })
+
+    def insights(self) -> list:
+        insights = []
+
+        if self.mean_perf < 3:
+            insights.append("⚠️ Rata-rata kinerja pegawai rendah (<3). Perlu intervensi HC.")
+        else:
+            insights.append("✅ Kinerja pegawai tergolong baik.")
+
+        if self.high_gap > 5:
+            insights.append("⚠️ Banyak pegawai memiliki gap kompetensi besar.")
+        else:
+            insights.append("✅ Mayoritas pegawai memiliki kompetensi sesuai kebutuhan.")
+
+        if self.mean_dq < 70:
+            insights.append("⚠️ Kualitas data HC perlu perbaikan segera.")
+        else:
+            insights.append("✅ Data HC cukup berkualitas.")
+
+        insights.append(f"⭐ {self.ready} kandidat berpotensi untuk pipeline Bureau Head.")
 
-    ready = (df["talent_readiness_index"] >= 75).sum()
-    insights.append(f"⭐ {ready} kandidat berpotensi untuk pipeline Bureau Head.")
+        return insights
 
-    return insights
+
+@timed("stage.generate_insights")
+def generate_insights(df: pd.DataFrame) -> list:
+    """
+    Memberikan insight otomatis berbasis kondisi data.
+    Untuk data per chunk gunakan InsightAggregate langsung.
+    """
+    return InsightAggregate.from_frame(df).insights()
 
 
 # ============================================================
 # 6. PIPELINE UTAMA UNTUK DIPANGGIL DARI STREAMLIT
 # ============================================================
-def run_data_strategist_pipeline(df: pd.DataFrame, required_skills: dict):
+def score_employees(df: pd.DataFrame, required_skills: dict,
+                    formula: str = DEFAULT_TRI_FORMULA, as_of=None) -> pd.DataFrame:
     """
-    Pipeline lengkap:
+    Tahap skoring per baris (1–4) tanpa insight:
     1. Skor kualitas data (advanced)
     2. Deteksi anomali
     3. Competency gap
     4. Talent readiness index
+    """
+    df = compute_data_quality(df, as_of)     # satu-satunya salinan frame
+    detect_anomalies(df, copy=False)
+    compute_competency_gap(df, required_skills, copy=False)
+    return compute_talent_readiness(df, formula, copy=False)
+
+
+def run_data_strategist_pipeline(df: pd.DataFrame, required_skills: dict,
+                                 workers: int = 1, partition_by: str = "id"):
+    """
+    Pipeline lengkap:
+    1–4. score_employees (DQ, anomali, gap, TRI)
     5. Generate insights
+    workers > 1 → partisi diskor paralel di process pool (lihat
+    score_parallel); hasil identik dengan mode serial.
     """
-    df1 = compute_data_quality(df)
-    df2 = detect_anomalies(df1)
-    df3 = compute_competency_gap(df2, required_skills)
-    df4 = compute_talent_readiness(df3)
+    if workers > 1 and len(df) >= PARALLEL_MIN_ROWS:
+        df4, aggregate = score_parallel(df, required_skills, workers, partition_by)
+        return df4, aggregate.insights()
+
+    df4 = score_employees(df, required_skills)
     insights = generate_insights(df4)
 
     return df4, insights
+
+
+def run_pipeline_streaming(chunks, required_skills: dict,
+                           formula: str = DEFAULT_TRI_FORMULA, as_of=None,
+                           sink=None, profiles: dict = None):
+    """
+    Mode out-of-core: 'chunks' = iterable DataFrame, mis.
+    pd.read_sql_query(..., chunksize=...). Tiap chunk diskor, diserahkan
+    ke sink(scored) (tulis ke DB / file) lalu dibuang; insight dihitung
+    dari InsightAggregate gabungan. Memori sebanding satu chunk.
+    Mengembalikan (InsightAggregate, insights).
+    """
+    if as_of is None:
+        as_of = pd.Timestamp.now(tz="UTC")     # sama untuk semua chunk
+
+    aggregate = InsightAggregate(profiles)
+    for chunk in chunks:
+        scored = score_employees(chunk, required_skills, formula, as_of)
+        aggregate.update(scored)
+        if sink is not None:
+            sink(scored)
+    return aggregate, aggregate.insights()
+
+
+# ============================================================
+# 6b. MODE PARALEL (PROCESS POOL)
+# ============================================================
+# Kolom yang ditulis score_employees (kolom lain tidak berubah)
+SCORED_COLUMNS = [
+    "data_quality_score_adv", "anomaly_mask",
+    "competency_gap_score", "talent_readiness_index",
+]
+
+PARTITION_KEYS = ("id", "department", "bureau")
+PARTITIONS_PER_WORKER = 4       # partisi kecil → beban antar worker rata
+PARALLEL_MIN_ROWS = 200_000     # di bawah ini overhead spawn pool > manfaat
+
+
+def partition_rows(df: pd.DataFrame, by: str = "id", parts: int = 2) -> list:
+    """
+    Posisi baris (array int) per partisi.
+    - "id": rentang employee_id berurutan, ukuran sama
+    - "department" / "bureau": grup utuh (satu unit tidak terpecah),
+      dibagi ke 'parts' partisi secara greedy, grup terbesar dulu
+    Partisi kosong dibuang.
+    """
+    if by not in PARTITION_KEYS:
+        raise ValueError(f"partition_by harus salah satu dari {PARTITION_KEYS}")
+
+    if by == "id":
+        order = np.argsort(df["employee_id"].astype(str).to_numpy(), kind="stable")
+        return [p for p in np.array_split(order, parts) if len(p)]
+
+    codes, _ = pd.factorize(df[by].fillna(""))
+    counts = np.bincount(codes)
+    load = np.zeros(parts, dtype=np.int64)
+    owner = np.empty(len(counts), dtype=np.int64)
+    for group in np.argsort(-counts, kind="stable"):
+        owner[group] = int(np.argmin(load))
+        load[owner[group]] += counts[group]
+
+    row_owner = owner[codes]
+    return [p for p in (np.flatnonzero(row_owner == i) for i in range(parts)) if len(p)]
+
+
+def _to_columns(df: pd.DataFrame) -> dict:
+    """
+    DataFrame → {kolom: ndarray}. Kolom numerik dikirim sebagai buffer
+    numpy kontigu (pickle protokol 5 menyalin buffer apa adanya),
+    bukan lewat pickle DataFrame beserta index dan block manager.
+    """
+    return {col: df[col].to_numpy() for col in df.columns}
+
+
+def _score_columns(task):
+    """Worker: skor satu partisi, kembalikan kolom skor + agregat."""
+    columns, required_skills, formula, as_of, profiles = task
+    df = pd.DataFrame(columns, copy=False)
+    scored = score_employees(df, required_skills, formula, as_of)
+    aggregate = InsightAggregate.from_frame(scored, profiles)
+    return {col: scored[col].to_numpy() for col in SCORED_COLUMNS}, aggregate
+
+
+def process_pool(workers: int) -> ProcessPoolExecutor:
+    """
+    Pool proses dengan start method 'spawn': proses Streamlit
+    multi-thread dan memegang koneksi SQLite, fork tidak aman.
+    """
+    return ProcessPoolExecutor(max_workers=workers,
+                               mp_context=multiprocessing.get_context("spawn"))
+
+
+def score_parallel(df: pd.DataFrame, required_skills: dict, workers: int,
+                   partition_by: str = "id", formula: str = DEFAULT_TRI_FORMULA,
+                   as_of=None, profiles: dict = None):
+    """
+    score_employees paralel: df dipartisi (partition_rows), tiap
+    partisi dikirim ke worker sebagai kolom numpy, worker hanya
+    mengembalikan kolom skor + InsightAggregate. Hasil disusun kembali
+    ke urutan baris semula. Mengembalikan (DataFrame skor, agregat).
+    """
+    if as_of is None:
+        as_of = pd.Timestamp.now(tz="UTC")     # sama untuk semua partisi
+
+    parts = partition_rows(df, partition_by,
+                           workers * (PARTITIONS_PER_WORKER if partition_by == "id" else 1))
+    tasks = (
+        (_to_columns(df.iloc[rows]), required_skills, formula, as_of, profiles)
+        for rows in parts
+    )
+
+    aggregate = InsightAggregate(profiles)
+    results = []
+    with process_pool(workers) as pool:
+        for columns, partial in pool.map(_score_columns, tasks):
+            results.append(columns)
+            aggregate.merge(partial)
+
+    positions = np.concatenate(parts)
+    out = df.copy()
+    for col in SCORED_COLUMNS:
+        values = np.concatenate([r[col] for r in results])
+        column = np.empty_like(values)
+        column[positions] = values
+        out[col] = column
+    return out, aggregate
+
+
+# ============================================================
+# 7. RANKING KANDIDAT (TOP-K BERBOBOT)
+# ============================================================
+# Fitur ranking, semua skala 0–1
+RANKING_FEATURES = [
+    "performance",      # avg_perf_3yr / 5
+    "tenure",           # years_in_bureau / 5 (maks 1), sama dengan TRI
+    "skill_match",      # porsi skill wajib yang dimiliki
+    "certifications",   # jumlah sertifikasi / 3 (maks 1)
+    "discipline",       # 1 bila tanpa isu disiplin
+    "data_quality",     # skor kualitas data / 100
+]
+
+DEFAULT_RANKING_WEIGHTS = {
+    "performance": 0.35,
+    "tenure": 0.15,
+    "skill_match": 0.25,
+    "certifications": 0.10,
+    "discipline": 0.10,
+    "data_quality": 0.05,
+}
+
+
+def _weight_vector(weights: dict = None) -> np.ndarray:
+    weights = DEFAULT_RANKING_WEIGHTS if weights is None else weights
+    unknown = set(weights) - set(RANKING_FEATURES)
+    if unknown:
+        raise KeyError(f"Fitur ranking tidak dikenal: {sorted(unknown)}")
+    w = np.array([float(weights.get(f, 0.0)) for f in RANKING_FEATURES])
+    if (w < 0).any() or w.sum() == 0:
+        raise ValueError("Bobot ranking harus >= 0 dan tidak semuanya 0")
+    return w / w.sum()
+
+
+class RankingMatrix:
+    """
+    Matriks fitur (n_pegawai x len(RANKING_FEATURES)) yang dihitung
+    sekali; setiap permintaan ranking hanya perkalian matriks-vektor,
+    filter kode kategori, lalu seleksi parsial top-K (argpartition).
+    """
+
+    def __init__(self, frame: pd.DataFrame, features: np.ndarray, mpl: np.ndarray):
+        self.frame = frame.reset_index(drop=True)
+        self.features = features
+        self.mpl = mpl
+        self._codes = {}
+        self._groups = {}
+        self._scores = {}
+        for col in ("department", "bureau"):
+            codes, uniques = pd.factorize(self.frame[col])
+            self._codes[col] = (codes, {v: i for i, v in enumerate(uniques)})
+
+    @classmethod
+    def from_frame(cls, df: pd.DataFrame, required_skills: dict):
+        v = coerce_numeric(df, ["avg_perf_3yr", "years_in_bureau", "has_discipline_issue"])
+
+        gaps = competency_gap_matrix(df, {"required": required_skills})["required"].to_numpy()
+        n_required = len({
+            (cat, normalize_skill(s))
+            for cat in ("technical", "soft") for s in required_skills.get(cat, [])
+        })
+        skill_match = 1 - gaps / n_required if n_required else np.ones(len(df))
+
+        certs = (df["certifications"].fillna("").astype(str).str.split(",")
+                 .map(lambda parts: sum(1 for p in parts if p.strip())).to_numpy())
+
+        if "data_quality_score_adv" in df.columns:
+            dq = df["data_quality_score_adv"]
+        elif "data_quality_score" in df.columns and df["data_quality_score"].notna().all():
+            dq = df["data_quality_score"]
+        else:
+            dq = compute_data_quality(df)["data_quality_score_adv"]
+        dq = np.nan_to_num(_numeric(dq).to_numpy(dtype=float), nan=0.0)
+
+        features = np.column_stack([
+            np.clip(v["avg_perf_3yr"] / 5, 0, 1),
+            np.minimum(v["years_in_bureau"] / 5, 1),
+            skill_match,
+            np.minimum(certs / 3, 1),
+            np.where(np.trunc(v["has_discipline_issue"]) != 0, 0.0, 1.0),
+            np.clip(dq / 100, 0, 1),
+        ])
+
+        _, mpl = parse_mpl(df["mpl_level"])
+        frame = df[["employee_id", "full_name", "department", "bureau",
+                    "job_title", "mpl_level"]]
+        return cls(frame, features, mpl.to_numpy(dtype=float))
+
+    def __len__(self):
+        return len(self.frame)
+
+    # --------------------------------------------------------
+    # FILTER
+    # --------------------------------------------------------
+    def _match(self, col, values):
+        codes, lookup = self._codes[col]
+        if isinstance(values, str):
+            values = [values]
+        wanted = [lookup[v] for v in values if v in lookup]
+        return np.isin(codes, wanted)
+
+    def _candidates(self, department=None, bureau=None, mpl_band=None) -> np.ndarray:
+        keep = np.ones(len(self), dtype=bool)
+        if department is not None:
+            keep &= self._match("department", department)
+        if bureau is not None:
+            keep &= self._match("bureau", bureau)
+        if mpl_band is not None:
+            low, high = mpl_band
+            keep &= (self.mpl >= low) & (self.mpl <= high)     # NaN → False
+        return np.flatnonzero(keep)
+
+    def _group_rows(self, col):
+        """Indeks baris per nilai kategori (dihitung sekali per kolom)."""
+        if col not in self._groups:
+            codes, lookup = self._codes[col]
+            order = np.argsort(codes, kind="stable")
+            bounds = np.searchsorted(codes[order], np.arange(len(lookup) + 1))
+            self._groups[col] = {
+                value: order[bounds[i]:bounds[i + 1]] for value, i in lookup.items()
+            }
+        return self._groups[col]
+
+    # --------------------------------------------------------
+    # TOP-K
+    # --------------------------------------------------------
+    @staticmethod
+    def _select(rows: np.ndarray, score: np.ndarray, k: int) -> np.ndarray:
+        """
+        K baris skor tertinggi tanpa full sort (rows harus urut naik).
+        Skor sama di batas ke-K diputus oleh posisi baris agar hasil
+        deterministik; hasil diurutkan skor desc, lalu posisi.
+        """
+        if k <= 0:
+            return rows[:0]
+        if k < len(rows):
+            s = score[rows]
+            kth = s[np.argpartition(-s, k - 1)[k - 1]]
+            above = rows[s > kth]
+            ties = rows[s == kth][:k - len(above)]
+            rows = np.concatenate([above, ties])
+        return rows[np.lexsort((rows, -score[rows]))]
+
+    def _score(self, weights):
+        """Skor berbobot; disimpan per kombinasi bobot (permintaan berulang)."""
+        w = _weight_vector(weights)
+        key = tuple(w)
+        if key not in self._scores:
+            if len(self._scores) >= 8:
+                self._scores.pop(next(iter(self._scores)))
+            self._scores[key] = self.features @ w
+        return self._scores[key]
+
+    def _result(self, rows, score):
+        out = self.frame.iloc[rows].reset_index(drop=True)
+        out["rank_score"] = np.round(score[rows] * 100, 1)
+        feats = pd.DataFrame(np.round(self.features[rows], 3), columns=RANKING_FEATURES)
+        return pd.concat([out, feats], axis=1)
+
+    def top_k(self, k: int = 20, weights: dict = None, department=None,
+              bureau=None, mpl_band=None) -> pd.DataFrame:
+        """
+        Top-K pegawai berdasarkan skor berbobot (0–100).
+        department / bureau: satu nilai atau daftar; mpl_band: (min, max)
+        inklusif atas angka MPL (MPL tidak valid tidak lolos).
+        """
+        score = self._score(weights)
+        rows = self._candidates(department, bureau, mpl_band)
+        out = self._result(self._select(rows, score, k), score)
+        out.insert(0, "rank", np.arange(1, len(out) + 1))
+        return out
+
+    def top_k_per(self, group: str = "bureau", k: int = 20, weights: dict = None,
+                  department=None, bureau=None, mpl_band=None) -> pd.DataFrame:
+        """Top-K per department / bureau dengan satu perhitungan skor."""
+        score = self._score(weights)
+        allowed = np.zeros(len(self), dtype=bool)
+        allowed[self._candidates(department, bureau, mpl_band)] = True
+
+        parts = []
+        for value, rows in self._group_rows(group).items():
+            rows = rows[allowed[rows]]
+            if len(rows) == 0:
+                continue
+            part = self._result(self._select(rows, score, k), score)
+            part.insert(0, "rank", np.arange(1, len(part) + 1))
+            parts.append(part)
+
+        if not parts:
+            empty = self._result(np.array([], dtype=int), score)
+            empty.insert(0, "rank", np.array([], dtype=int))
+            return empty
+        return pd.concat(parts, ignore_index=True)
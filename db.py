@@ -1,54 +1,147 @@
+import os
 import sqlite3
+import threading
+
+from migrations import migrate
+from employee_search import rebuild_search_index
+from perf import connection_factory
 
 DB_NAME = "hc_employee.db"
 
-def get_conn():
-    return sqlite3.connect(DB_NAME)
-
-def init_db():
-    conn = sqlite3.connect(DB_NAME)
-    cur = conn.cursor()
-
-    # EMPLOYEES TABLE
-    cur.execute("""
-        CREATE TABLE IF NOT EXISTS employees (
-            employee_id TEXT PRIMARY KEY,
-            full_name TEXT,
-            email TEXT,
-            department TEXT,
-            bureau TEXT,
-            job_title TEXT,
-            mpl_level TEXT,
-            work_location TEXT,
-            date_joined TEXT,
-            years_in_bureau REAL,
-            years_in_department REAL,
-            avg_perf_3yr REAL,
-            has_discipline_issue INTEGER,
-            technical_skills TEXT,
-            soft_skills TEXT,
-            certifications TEXT,
-            notes TEXT,
-            is_candidate_bureau_head INTEGER,
-            data_quality_score REAL,
-            last_updated TEXT
-        )
-    """)
-
-    # AUDIT LOG TABLE
-    cur.execute("""
-        CREATE TABLE IF NOT EXISTS audit_log (
-            id INTEGER PRIMARY KEY AUTOINCREMENT,
-            action_time TEXT,
-            user_role TEXT,
-            action_type TEXT,
-            employee_id TEXT,
-            detail TEXT,
-            before_data TEXT,
-            after_data TEXT,
-            ip_address TEXT
-        )
-    """)
+# ==========================================================
+# CONNECTION MANAGER
+# ==========================================================
+BUSY_TIMEOUT_MS = 5000
+MMAP_SIZE = 256 * 1024 * 1024
+CACHED_STATEMENTS = 256
+
+_local = threading.local()
+_epoch = 0          # naik saat database di-reset → koneksi lama dibuang
+
+
+def open_conn(db_path=DB_NAME, check_same_thread=True):
+    """Koneksi baru dengan PRAGMA standar (WAL, busy timeout, mmap)."""
+    conn = sqlite3.connect(
+        db_path,
+        timeout=BUSY_TIMEOUT_MS / 1000,
+        cached_statements=CACHED_STATEMENTS,
+        check_same_thread=check_same_thread,
+        factory=connection_factory(),
+    )
+    conn.execute("PRAGMA journal_mode=WAL")
+    conn.execute("PRAGMA synchronous=NORMAL")
+    conn.execute(f"PRAGMA busy_timeout={BUSY_TIMEOUT_MS}")
+    conn.execute(f"PRAGMA mmap_size={MMAP_SIZE}")
+    return conn
+
+
+def get_conn(db_path=DB_NAME):
+    """
+    Koneksi milik thread saat ini (dipakai ulang antar pemanggilan).
+    Jangan di-close oleh pemanggil; commit/rollback seperti biasa.
+    """
+    conns = getattr(_local, "conns", None)
+    if conns is None:
+        conns = _local.conns = {}
+
+    entry = conns.get(db_path)
+    if entry is not None and entry[0] == _epoch:
+        return entry[1]
+    if entry is not None:
+        entry[1].close()
+
+    conn = open_conn(db_path)
+    conns[db_path] = (_epoch, conn)
+    return conn
+
+
+def close_conn(db_path=DB_NAME):
+    """Tutup koneksi thread ini (mis. sebelum file database dihapus)."""
+    conns = getattr(_local, "conns", {})
+    entry = conns.pop(db_path, None)
+    if entry is not None:
+        entry[1].close()
+
+
+_close_hooks = []       # dipanggil sebelum reset (mis. koneksi pengamat cache)
 
+
+def on_reset(hook):
+    """Daftarkan hook() yang menutup koneksi milik modul lain sebelum reset_db."""
+    _close_hooks.append(hook)
+
+
+def _drop_all(db_path):
+    """Fallback reset: kosongkan skema lewat koneksi baru."""
+    conn = open_conn(db_path)
+    try:
+        objects = conn.execute(
+            "SELECT type, name, sql FROM sqlite_master "
+            "WHERE name NOT LIKE 'sqlite_%' AND sql IS NOT NULL"
+        ).fetchall()
+        # trigger & view dulu, lalu virtual table (ikut membuang shadow
+        # table FTS5), baru tabel biasa yang tersisa
+        order = {"trigger": 0, "view": 1, "table": 2}
+        objects.sort(key=lambda o: (order.get(o[0], 3),
+                                    not (o[2] or "").upper().startswith("CREATE VIRTUAL")))
+        for kind, name, _ in objects:
+            if kind in order:
+                conn.execute(f'DROP {kind.upper()} IF EXISTS "{name}"')
+        conn.execute("PRAGMA user_version=0")
+        conn.commit()
+        conn.execute("VACUUM")
+    finally:
+        conn.close()
+
+
+def reset_db(db_path=DB_NAME):
+    """
+    Hapus file database (termasuk -wal/-shm) lalu buat ulang skema.
+    Koneksi thread lain tidak bisa ditutup dari sini (sqlite3 per
+    thread); bila file masih terkunci (Windows) semua tabel di-drop
+    sebagai gantinya. Koneksi lama dibuang lewat _epoch.
+    """
+    global _epoch
+    _epoch += 1
+    _migrated.discard(db_path)
+    close_conn(db_path)
+    for hook in _close_hooks:
+        hook()
+    try:
+        for suffix in ("", "-wal", "-shm"):
+            try:
+                os.remove(db_path + suffix)
+            except FileNotFoundError:
+                pass
+    except OSError:
+        _drop_all(db_path)
+    init_db(db_path)
+
+
+def vacuum_db(db_path=DB_NAME):
+    conn = get_conn(db_path)
+    conn.execute("VACUUM")
+    # VACUUM boleh menomori ulang rowid employees → index FTS dibangun ulang
+    rebuild_search_index(conn)
     conn.commit()
-    conn.close()
+    conn.execute("PRAGMA wal_checkpoint(TRUNCATE)")
+
+
+# ==========================================================
+# SCHEMA
+# ==========================================================
+_migrated = set()       # db_path yang sudah dimigrasi di proses ini
+_migrate_lock = threading.Lock()
+
+
+def init_db(db_path=DB_NAME):
+    """
+    Pastikan skema terbaru (lihat migrations.py). Migrasi hanya
+    dijalankan sekali per proses per file database.
+    """
+    if db_path in _migrated:
+        return
+    with _migrate_lock:
+        if db_path not in _migrated:
+            migrate(get_conn(db_path))
+            _migrated.add(db_path)
@@ -0,0 +1,130 @@
+# ============================================================
+#  employee_search.py
+#  Full-text search pegawai (nama, jabatan, catatan, skill) lewat
+#  tabel FTS5 employees_fts — external content atas employees,
+#  disinkronkan trigger (migrasi v9). Ranking bm25.
+#  Plus lookup prefix Employee ID / nama untuk typeahead form.
+# ============================================================
+
+import re
+
+import pandas as pd
+
+FTS_TABLE = "employees_fts"
+
+# urutan kolom = urutan di CREATE VIRTUAL TABLE (migrasi v9)
+FTS_COLUMNS = [
+    "full_name", "job_title", "notes",
+    "technical_skills", "soft_skills", "certifications",
+]
+
+# bobot bm25 per kolom: cocok di nama jauh lebih relevan dari catatan
+BM25_WEIGHTS = {
+    "full_name": 10.0,
+    "job_title": 4.0,
+    "notes": 1.0,
+    "technical_skills": 2.0,
+    "soft_skills": 2.0,
+    "certifications": 2.0,
+}
+
+DEFAULT_LIMIT = 20
+LOOKUP_LIMIT = 10
+
+_PREFIX_END = "\U0010ffff"     # batas atas range prefix
+
+_PHRASE = re.compile(r'"([^"]*)"')
+_WORD = re.compile(r"\w+", re.UNICODE)
+
+
+# ============================================================
+# QUERY BUILDER
+# ============================================================
+def fts_query(text: str):
+    """
+    Input bebas → ekspresi MATCH FTS5 yang aman.
+    - "teks berkutip" → frasa persis
+    - kata lain       → prefix (budi → budi*), semua kata wajib (AND)
+    Karakter operator FTS5 dibuang, jadi input pengguna tidak bisa
+    membuat syntax error. None bila tidak ada kata.
+    """
+    text = str(text or "")
+    terms = []
+    for phrase in _PHRASE.findall(text):
+        words = _WORD.findall(phrase)
+        if words:
+            terms.append('"' + " ".join(words) + '"')
+    for word in _WORD.findall(_PHRASE.sub(" ", text)):
+        terms.append(f'"{word}"*')
+    return " ".join(terms) or None
+
+
+# ============================================================
+# SEARCH API
+# ============================================================
+def search_employees(conn, text, limit=DEFAULT_LIMIT) -> pd.DataFrame:
+    """
+    Pegawai yang cocok dengan 'text', urut relevansi bm25 (terbaik
+    dulu). Kolom 'cuplikan' = potongan teks yang cocok.
+    """
+    match = fts_query(text)
+    if match is None:
+        return pd.DataFrame()
+
+    weights = ", ".join(str(BM25_WEIGHTS[c]) for c in FTS_COLUMNS)
+    return pd.read_sql_query(
+        "SELECT e.employee_id, e.full_name, e.department, e.bureau, e.job_title, "
+        f"snippet({FTS_TABLE}, -1, '[', ']', '…', 8) AS cuplikan, "
+        f"bm25({FTS_TABLE}, {weights}) AS score "
+        f"FROM {FTS_TABLE} JOIN employees e ON e.rowid = {FTS_TABLE}.rowid "
+        f"WHERE {FTS_TABLE} MATCH ? "
+        "ORDER BY score LIMIT ?",
+        conn, params=(match, limit)
+    )
+
+
+def lookup_employees(conn, text, limit=LOOKUP_LIMIT) -> pd.DataFrame:
+    """
+    Typeahead: pegawai yang Employee ID atau namanya berawalan 'text'.
+    Range scan pada primary key dan idx_employees_name (NOCASE), masing-
+    masing berhenti di 'limit' baris. Cocok ID didahulukan.
+    """
+    prefix = str(text or "").strip()
+    if not prefix:
+        return pd.DataFrame()
+
+    columns = "employee_id, full_name, department, job_title"
+    frames = []
+    for id_prefix in dict.fromkeys([prefix, prefix.upper()]):
+        frames.append(pd.read_sql_query(
+            f"SELECT {columns} FROM employees "
+            "WHERE employee_id >= ? AND employee_id < ? "
+            "ORDER BY employee_id LIMIT ?",
+            conn, params=(id_prefix, id_prefix + _PREFIX_END, limit)
+        ))
+    frames.append(pd.read_sql_query(
+        f"SELECT {columns} FROM employees "
+        "WHERE full_name >= ? COLLATE NOCASE AND full_name < ? COLLATE NOCASE "
+        "ORDER BY full_name COLLATE NOCASE LIMIT ?",
+        conn, params=(prefix, prefix + _PREFIX_END, limit)
+    ))
+
+    df = pd.concat(frames, ignore_index=True)
+    return df.drop_duplicates("employee_id").head(limit).reset_index(drop=True)
+
+
+def fetch_employee(conn, employee_id):
+    """Satu baris employees (dict) lewat primary key, None bila tidak ada."""
+    cur = conn.execute("SELECT * FROM employees WHERE employee_id=?", (employee_id,))
+    row = cur.fetchone()
+    if row is None:
+        return None
+    return dict(zip([d[0] for d in cur.description], row))
+
+
+def rebuild_search_index(conn):
+    """
+    Bangun ulang index dari employees. Wajib setelah VACUUM: rowid
+    implisit employees (PK TEXT) boleh berubah, index FTS memakai rowid.
+    """
+    conn.execute(f"INSERT INTO {FTS_TABLE}({FTS_TABLE}) VALUES('rebuild')")
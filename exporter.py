@@ -0,0 +1,212 @@
+# ============================================================
+#  exporter.py
+#  Ekspor hasil pipeline (DQ, anomali, gap, TRI) ke CSV, Excel,
+#  Arrow IPC dan Parquet secara streaming: employees dibaca per
+#  chunk (keyset employee_id), diskor dengan score_employees, lalu
+#  langsung ditulis — memori sebanding satu chunk, bukan seluruh tabel.
+#  Kecuali export_file (unduhan UI): isi file dikembalikan sebagai
+#  bytes, jadi memori sebanding ukuran file hasil ekspor.
+# ============================================================
+
+import argparse
+import os
+import tempfile
+from datetime import datetime, timezone
+
+import pandas as pd
+
+from db import DB_NAME, get_conn, init_db
+from data_strategist import score_employees, anomaly_labels
+from skills import ROLE_PROFILES, DEFAULT_PROFILE
+
+DEFAULT_CHUNK_ROWS = 10_000
+
+EXPORT_COLUMNS = [
+    "employee_id", "full_name", "department", "bureau", "job_title",
+    "mpl_level", "years_in_bureau", "years_in_department", "avg_perf_3yr",
+    "data_quality_score_adv", "anomaly_mask", "anomalies",
+    "competency_gap_score", "talent_readiness_index",
+]
+
+# format → (ekstensi, mime)
+EXPORT_FORMATS = {
+    "csv": (".csv", "text/csv"),
+    "xlsx": (".xlsx", "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet"),
+    "arrow": (".arrow", "application/vnd.apache.arrow.file"),
+    "parquet": (".parquet", "application/vnd.apache.parquet"),
+}
+
+
+def _pyarrow():
+    try:
+        import pyarrow
+        import pyarrow.ipc
+        import pyarrow.parquet
+    except ImportError:
+        raise ImportError("Ekspor Arrow/Parquet membutuhkan paket pyarrow (pip install pyarrow)")
+    return pyarrow
+
+
+def available_formats() -> list:
+    """Format yang bisa dipakai di environment ini (Arrow/Parquet butuh pyarrow)."""
+    try:
+        _pyarrow()
+    except ImportError:
+        return ["csv", "xlsx"]
+    return list(EXPORT_FORMATS)
+
+
+# ============================================================
+# SUMBER: PIPELINE PER CHUNK
+# ============================================================
+def iter_pipeline_chunks(conn, required_skills, chunk_rows=DEFAULT_CHUNK_ROWS):
+    """
+    Output run_data_strategist_pipeline (tahap 1–4) per chunk.
+    Semua tahap bersifat per baris, jadi hasil per chunk identik
+    dengan menjalankan pipeline pada seluruh tabel; as_of Timeliness
+    dikunci sekali untuk semua chunk.
+    """
+    as_of = datetime.now(timezone.utc).replace(tzinfo=None)
+    last_id = ""
+    while True:
+        df = pd.read_sql_query(
+            "SELECT * FROM employees WHERE employee_id > ? ORDER BY employee_id LIMIT ?",
+            conn, params=(last_id, chunk_rows)
+        )
+        if df.empty:
+            return
+        scored = score_employees(df, required_skills, as_of=as_of)
+        scored["anomalies"] = anomaly_labels(scored["anomaly_mask"])
+        yield scored[EXPORT_COLUMNS]
+        last_id = df["employee_id"].iloc[-1]
+
+
+# ============================================================
+# WRITER PER FORMAT
+# ============================================================
+def _write_csv(chunks, f):
+    header = True
+    for df in chunks:
+        df.to_csv(f, index=False, header=header)
+        header = False
+
+
+def _write_xlsx(chunks, f):
+    """openpyxl write-only: baris langsung dialirkan ke file, memori konstan."""
+    from openpyxl import Workbook
+
+    wb = Workbook(write_only=True)
+    ws = wb.create_sheet("Talent Readiness")
+    ws.append(EXPORT_COLUMNS)
+    for df in chunks:
+        for row in df.astype(object).where(df.notna(), None).itertuples(index=False):
+            ws.append(list(row))
+    wb.save(f)
+
+
+def _arrow_schema(pa):
+    text = pa.string()
+    return pa.schema([
+        ("employee_id", text), ("full_name", text), ("department", text),
+        ("bureau", text), ("job_title", text), ("mpl_level", text),
+        ("years_in_bureau", pa.float64()), ("years_in_department", pa.float64()),
+        ("avg_perf_3yr", pa.float64()), ("data_quality_score_adv", pa.int64()),
+        ("anomaly_mask", pa.int64()), ("anomalies", text),
+        ("competency_gap_score", pa.float64()), ("talent_readiness_index", pa.float64()),
+    ])
+
+
+def _arrow_batch(pa, schema, df):
+    df = df.copy()
+    for col in ("years_in_bureau", "years_in_department", "avg_perf_3yr"):
+        df[col] = pd.to_numeric(df[col], errors="coerce")
+    for col in ("employee_id", "full_name", "department", "bureau", "job_title", "mpl_level"):
+        df[col] = df[col].astype(object).where(df[col].notna(), None)
+    return pa.RecordBatch.from_pandas(df, schema=schema, preserve_index=False)
+
+
+def _write_arrow(chunks, f):
+    pa = _pyarrow()
+    schema = _arrow_schema(pa)
+    with pa.ipc.new_file(f, schema) as writer:
+        for df in chunks:
+            writer.write_batch(_arrow_batch(pa, schema, df))
+
+
+def _write_parquet(chunks, f):
+    """Satu row group per chunk."""
+    pa = _pyarrow()
+    schema = _arrow_schema(pa)
+    with pa.parquet.ParquetWriter(f, schema, compression="zstd") as writer:
+        for df in chunks:
+            writer.write_batch(_arrow_batch(pa, schema, df))
+
+
+_WRITERS = {
+    "csv": _write_csv,
+    "xlsx": _write_xlsx,
+    "arrow": _write_arrow,
+    "parquet": _write_parquet,
+}
+
+
+# ============================================================
+# API EKSPOR
+# ============================================================
+def export_scored(path, fmt, profile=DEFAULT_PROFILE,
+                  chunk_rows=DEFAULT_CHUNK_ROWS, db_path=DB_NAME) -> int:
+    """Tulis hasil pipeline ke file 'path'. Mengembalikan jumlah baris."""
+    if fmt not in _WRITERS:
+        raise ValueError(f"Format ekspor tidak dikenal: {fmt}")
+
+    init_db(db_path)
+    conn = get_conn(db_path)
+    rows = 0
+
+    def counted():
+        nonlocal rows
+        for df in iter_pipeline_chunks(conn, ROLE_PROFILES[profile], chunk_rows):
+            rows += len(df)
+            yield df
+
+    if fmt == "csv":
+        with open(path, "w", encoding="utf-8", newline="") as f:
+            _write_csv(counted(), f)
+    else:
+        with open(path, "wb") as f:
+            _WRITERS[fmt](counted(), f)
+    return rows
+
+
+def export_file(fmt, profile=DEFAULT_PROFILE, chunk_rows=DEFAULT_CHUNK_ROWS,
+                db_path=DB_NAME) -> bytes:
+    """
+    Ekspor ke file sementara lalu kembalikan isinya (bytes) untuk
+    diunduh. Pipeline tetap streaming per chunk, tetapi seluruh file
+    dibaca ke memori — untuk tabel besar gunakan export_scored / CLI
+    (lihat EXPORT_MAX_ROWS di ui_quality). File sementara selalu
+    ditutup dan dihapus.
+    """
+    suffix = EXPORT_FORMATS[fmt][0]
+    tmp = tempfile.NamedTemporaryFile(suffix=suffix, delete=False)
+    tmp.close()
+    try:
+        export_scored(tmp.name, fmt, profile, chunk_rows, db_path)
+        with open(tmp.name, "rb") as f:
+            return f.read()
+    finally:
+        os.remove(tmp.name)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Ekspor hasil pipeline talent readiness.")
+    parser.add_argument("path", help="file tujuan (.csv / .xlsx / .arrow / .parquet)")
+    parser.add_argument("--format", default="", choices=["", *EXPORT_FORMATS])
+    parser.add_argument("--profile", default=DEFAULT_PROFILE, choices=list(ROLE_PROFILES))
+    parser.add_argument("--chunk-rows", type=int, default=DEFAULT_CHUNK_ROWS)
+    parser.add_argument("--db", default=DB_NAME)
+    args = parser.parse_args()
+
+    fmt = args.format or os.path.splitext(args.path)[1].lstrip(".").lower()
+    rows = export_scored(args.path, fmt, args.profile, args.chunk_rows, args.db)
+    print({"rows": rows, "path": args.path, "format": fmt})
@@ -1,66 +1,299 @@
-import sqlite3
-import random
+import argparse
+import time
 from datetime import datetime, timedelta
 
-DB_PATH = "hc_employee.db"
+import numpy as np
+import pandas as pd
+
+from db import get_conn, init_db, DB_NAME
+from audit_engine import AUDIT_INSERT_SQL, audit_row, diff_detail
+from skill_index import INDEX_COLUMNS, index_employees
+
+DB_PATH = DB_NAME
 
 DEPARTMENTS = ["Finance", "HC", "ICT", "Mining", "Processing", "Logistics", "Legal", "Risk Management"]
 BUREAUS = ["Bureau A", "Bureau B", "Bureau C", "Bureau D"]
 JOB_TITLES = ["Staff", "Supervisor", "Superintendent", "Specialist", "Manager", "Senior Manager"]
 WORK_LOCATIONS = ["Jakarta", "Bogor", "Kalikuning", "Pongkor", "UBPN Konut", "UBPN Maluku Utara"]
-MPL_LEVELS = ["I", "II", "III", "IV", "V", "VI"]
 
 TECH_SKILLS = ["SAP", "SQL", "Python", "HCIS", "Geology", "Mining Ops", "Finance Control", "Data Analysis"]
 SOFT_SKILLS = ["Leadership", "Communication", "Teamwork", "Analytical", "Problem Solving", "Coordination"]
 CERTIFICATIONS = ["ISO9001", "ISO14001", "ISO27001", "OHSAS", "Risk Management", "Project Mgmt"]
 
-def generate_random_date():
-    days_ago = random.randint(100, 2000)
-    return (datetime.now() - timedelta(days=days_ago)).date().isoformat()
+FIRST_NAMES = ["Adi", "Budi", "Citra", "Dewi", "Eko", "Fitri", "Gita", "Hendra", "Indah", "Joko",
+               "Kartika", "Lestari", "Made", "Nur", "Putri", "Rizky", "Sari", "Tono", "Wahyu", "Yuni"]
+LAST_NAMES = ["Santoso", "Wijaya", "Saputra", "Hidayat", "Kusuma", "Pratama", "Siregar", "Nasution",
+              "Simanjuntak", "Wibowo", "Setiawan", "Gunawan", "Lubis", "Harahap", "Purnomo"]
+NOTES = ["", "", "Kandidat program talent pool", "Mutasi dari unit lain",
+         "Sedang mengikuti program pengembangan kepemimpinan", "Perlu update sertifikasi",
+         "Rotasi jabatan direncanakan tahun depan"]
 
+EMAIL_DOMAIN = "hc.example.co.id"
+ID_PREFIX = "EMP"
+ID_WIDTH = 7          # EMP0000001 … EMP9999999
+MPL_RANGE = (10, 26)  # M10–M25
+CHUNK_SIZE = 50_000
+
+EMPLOYEE_COLUMNS = [
+    "employee_id", "full_name", "email", "department", "bureau", "job_title",
+    "mpl_level", "work_location", "date_joined", "years_in_bureau",
+    "years_in_department", "avg_perf_3yr", "has_discipline_issue",
+    "technical_skills", "soft_skills", "certifications", "notes", "last_updated"
+]
+
+# kolom wajib DQ yang dapat dikosongkan oleh "dirty data"
+DIRTY_BLANK_COLUMNS = ["full_name", "department", "bureau", "job_title", "work_location", "date_joined"]
+
+
+# ==========================================================
+# SAMPLING VEKTOR
+# ==========================================================
+def _sample_skills(rng, n, skills, k_min, k_max):
+    """
+    Subset acak berukuran k_min..k_max per baris, dikodekan sebagai
+    bitmask lalu diterjemahkan lewat tabel semua kombinasi.
+    """
+    m = len(skills)
+    k = rng.integers(k_min, k_max + 1, n)
+    rank = rng.random((n, m)).argsort(axis=1).argsort(axis=1)
+    masks = ((rank < k[:, None]) * (1 << np.arange(m))).sum(axis=1)
+
+    combos = np.array([
+        ", ".join(s for b, s in enumerate(skills) if combo >> b & 1)
+        for combo in range(1 << m)
+    ], dtype=object)
+    return combos[masks]
+
+
+def _pick(rng, n, values, p=None):
+    return np.asarray(values, dtype=object)[rng.choice(len(values), n, p=p)]
+
+
+def _days_ago(now, days):
+    """Tanggal ISO (teks) 'days' hari sebelum now, lewat tabel tanggal unik."""
+    table = (np.datetime64(now.date(), "D") - np.arange(days.max() + 1)).astype(str).astype(object)
+    return table[days]
+
+
+def _department_probabilities(department_weights):
+    if not department_weights:
+        return None
+    weights = np.array([float(department_weights.get(d, 1.0)) for d in DEPARTMENTS])
+    return weights / weights.sum()
+
+
+def build_columns(n, rng, start=1, dirty_rate=0.05, anomaly_rate=0.02,
+                  department_weights=None, now=None) -> dict:
+    """
+    Satu batch pegawai sintetis sebagai kolom NumPy (urutan EMPLOYEE_COLUMNS).
+    Semua nilai acak disampling secara vektor; hanya perakitan teks
+    ID/email yang berupa list comprehension.
+    """
+    now = now or datetime.now()
+    idx_text = np.array(list(map(str, range(start, start + n))), dtype=object)
+
+    first = rng.integers(0, len(FIRST_NAMES), n)
+    last = rng.integers(0, len(LAST_NAMES), n)
+    full_names = np.array([f"{f} {l}" for f in FIRST_NAMES for l in LAST_NAMES], dtype=object)
+    email_names = np.array([f"{f}.{l}".lower() for f in FIRST_NAMES for l in LAST_NAMES], dtype=object)
+    name_idx = first * len(LAST_NAMES) + last
+
+    cols = {
+        "employee_id": ID_PREFIX + np.array([t.zfill(ID_WIDTH) for t in idx_text], dtype=object),
+        "full_name": full_names[name_idx],
+        "email": email_names[name_idx] + idx_text + ("@" + EMAIL_DOMAIN),
+        "department": _pick(rng, n, DEPARTMENTS, _department_probabilities(department_weights)),
+        "bureau": _pick(rng, n, BUREAUS),
+        "job_title": _pick(rng, n, JOB_TITLES),
+        "mpl_level": _pick(rng, n, [f"M{m}" for m in range(*MPL_RANGE)]),
+        "work_location": _pick(rng, n, WORK_LOCATIONS),
+    }
+
+    cols["date_joined"] = _days_ago(now, rng.integers(100, 8000, n))
+
+    years_bureau = rng.integers(0, 21, n)
+    cols["years_in_bureau"] = years_bureau.astype(float)
+    cols["years_in_department"] = (years_bureau + rng.integers(0, 11, n)).astype(float)
+    cols["avg_perf_3yr"] = np.round(rng.uniform(2.0, 5.0, n), 2)
+    cols["has_discipline_issue"] = (rng.random(n) < 0.25).astype(int)
+
+    cols["technical_skills"] = _sample_skills(rng, n, TECH_SKILLS, 1, 4)
+    cols["soft_skills"] = _sample_skills(rng, n, SOFT_SKILLS, 1, 3)
+    cols["certifications"] = _sample_skills(rng, n, CERTIFICATIONS, 0, 2)
+    cols["notes"] = _pick(rng, n, NOTES)
+
+    # last_updated tersebar dalam ~1,5 tahun terakhir
+    times = np.array([
+        f"T{s // 3600:02d}:{s // 60 % 60:02d}:{s % 60:02d}" for s in range(86400)
+    ], dtype=object)
+    cols["last_updated"] = _days_ago(now, rng.integers(1, 540, n)) + times[rng.integers(0, 86400, n)]
+
+    _inject_anomalies(cols, rng, anomaly_rate)
+    _inject_dirty_data(cols, rng, dirty_rate)
+    return {c: cols[c] for c in EMPLOYEE_COLUMNS}
+
+
+def build_employees(n, rng, **kwargs) -> pd.DataFrame:
+    """build_columns sebagai DataFrame (untuk benchmark / analisis di memori)."""
+    return pd.DataFrame(build_columns(n, rng, **kwargs))
 
-def generate_dummy_data(n=50):
 
-    conn = sqlite3.connect(DB_PATH)
-    cur = conn.cursor()
-
-    for i in range(1, n+1):
-        emp_id = f"EMP{str(i).zfill(3)}"
-        name = f"Dummy Employee {i}"
-
-        department = random.choice(DEPARTMENTS)
-        bureau = random.choice(BUREAUS)
-        job_title = random.choice(JOB_TITLES)
-        work_loc = random.choice(WORK_LOCATIONS)
-        mpl = random.choice(MPL_LEVELS)
-
-        years_bureau = random.randint(0, 20)
-        years_dept = years_bureau + random.randint(0, 10)  # dept >= bureau
-        avg_perf = round(random.uniform(2.0, 5.0), 2)
-
-        tech = ", ".join(random.sample(TECH_SKILLS, random.randint(1, 4)))
-        soft = ", ".join(random.sample(SOFT_SKILLS, random.randint(1, 3)))
-        cert = ", ".join(random.sample(CERTIFICATIONS, random.randint(0, 2)))
-
-        discipline = random.choice([0, 0, 0, 1])  # 25% memiliki isu disiplin
-
-        last_updated = datetime.now().isoformat()
-
-        cur.execute("""
-            INSERT OR REPLACE INTO employees (
-                employee_id, full_name, department, bureau, job_title, work_location,
-                mpl_level, years_in_bureau, years_in_department, avg_perf_3yr,
-                technical_skills, soft_skills, certifications, has_discipline_issue,
-                last_updated
-            )
-            VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
-        """, (
-            emp_id, name, department, bureau, job_title, work_loc,
-            mpl, years_bureau, years_dept, avg_perf, tech, soft, cert, discipline,
-            last_updated
+def _inject_anomalies(cols, rng, rate):
+    rows = np.flatnonzero(rng.random(len(cols["employee_id"])) < rate)
+    kind = rng.integers(0, 4, len(rows))
+
+    swap = rows[kind == 0]   # years bureau > years dept
+    cols["years_in_bureau"][swap] = cols["years_in_department"][swap] + rng.integers(1, 6, len(swap))
+
+    out_of_range = rows[kind == 1]
+    cols["mpl_level"][out_of_range] = _pick(rng, len(out_of_range), ["M3", "M5", "M35", "M40"])
+
+    invalid = rows[kind == 2]
+    cols["mpl_level"][invalid] = _pick(rng, len(invalid), ["I", "IV", "VI", "Mx"])
+
+    perf = rows[kind == 3]
+    cols["avg_perf_3yr"][perf] = np.round(rng.uniform(5.1, 6.0, len(perf)), 2)
+
+
+def _inject_dirty_data(cols, rng, rate):
+    rows = np.flatnonzero(rng.random(len(cols["employee_id"])) < rate)
+    kind = rng.integers(0, 3, len(rows))
+
+    blank = rows[kind == 0]
+    which = rng.choice(len(DIRTY_BLANK_COLUMNS), len(blank))
+    for c, col in enumerate(DIRTY_BLANK_COLUMNS):
+        cols[col][blank[which == c]] = None
+
+    bad_email = rows[kind == 1]
+    cols["email"][bad_email] = [e.replace("@", " at ") for e in cols["email"][bad_email]]
+
+    bad_location = rows[kind == 2]
+    cols["work_location"][bad_location] = "-"
+
+
+# ==========================================================
+# RIWAYAT AUDIT
+# ==========================================================
+def _audit_rows(records, rng, update_rate):
+    """
+    INSERT (state awal), lalu untuk sebagian pegawai UPDATE kinerja
+    pada last_updated — sehingga replay riwayat audit menghasilkan
+    state baris yang tersimpan.
+    """
+    updated = rng.random(len(records)) < update_rate
+    old_perf = np.round(rng.uniform(2.0, 5.0, len(records)), 2)
+    created_days = rng.integers(1, 366, len(records))
+
+    rows = []
+    for rec, has_update, perf, days in zip(records, updated, old_perf, created_days):
+        created = dict(rec)
+        if has_update:
+            created["avg_perf_3yr"] = float(perf)
+            created["last_updated"] = (
+                datetime.fromisoformat(rec["last_updated"]) - timedelta(days=int(days))
+            ).isoformat()
+
+        rows.append(audit_row(
+            created["last_updated"][:19] + "+07:00", "generator", "System",
+            "INSERT", rec["employee_id"], "Insert employee", {}, created
         ))
+        if has_update:
+            rows.append(audit_row(
+                rec["last_updated"][:19] + "+07:00", "generator", "System",
+                "UPDATE", rec["employee_id"], diff_detail(created, rec), created, rec
+            ))
+    return rows
 
-    conn.commit()
-    conn.close()
 
+# ==========================================================
+# BULK GENERATOR
+# ==========================================================
+def generate_bulk_employees(n, seed=None, dirty_rate=0.05, anomaly_rate=0.02,
+                            department_weights=None, with_audit=False,
+                            audit_update_rate=0.3, start=1,
+                            chunk_size=CHUNK_SIZE, db_path=DB_PATH) -> dict:
+    """
+    Buat n pegawai sintetis (opsional + riwayat audit) dalam satu
+    transaksi. Batch disampling dengan NumPy lalu ditulis lewat
+    executemany. 'seed' membuat dataset dapat direproduksi.
+    """
+    init_db(db_path)
+    conn = get_conn(db_path)
+    rng = np.random.default_rng(seed)
+    now = datetime.now()
+
+    placeholders = ", ".join("?" for _ in EMPLOYEE_COLUMNS)
+    # upsert, bukan INSERT OR REPLACE: REPLACE menghapus baris tanpa
+    # memicu trigger DELETE sehingga index FTS tertinggal. scored_at
+    # dikosongkan agar baris yang ditimpa di-scoring ulang.
+    updates = ", ".join(f"{c}=excluded.{c}" for c in EMPLOYEE_COLUMNS if c != "employee_id")
+    insert_sql = (f"INSERT INTO employees ({', '.join(EMPLOYEE_COLUMNS)}) "
+                  f"VALUES ({placeholders}) "
+                  f"ON CONFLICT(employee_id) DO UPDATE SET {updates}, scored_at=NULL")
+
+    started = time.perf_counter()
+    audit_count = 0
+    try:
+        for offset in range(0, n, chunk_size):
+            size = min(chunk_size, n - offset)
+            cols = build_columns(size, rng, start + offset, dirty_rate,
+                                 anomaly_rate, department_weights, now)
+            # tolist() → tipe Python (int64 NumPy tidak bisa di-bind sqlite3)
+            values = list(zip(*(cols[c].tolist() for c in EMPLOYEE_COLUMNS)))
+            conn.executemany(insert_sql, values)
+            index_employees(conn, pd.DataFrame(
+                {c: cols[c] for c in ["employee_id", *INDEX_COLUMNS.values()]}
+            ))
+
+            if with_audit:
+                records = [dict(zip(EMPLOYEE_COLUMNS, v)) for v in values]
+                rows = _audit_rows(records, rng, audit_update_rate)
+                conn.executemany(AUDIT_INSERT_SQL, rows)
+                audit_count += len(rows)
+        conn.commit()
+    except Exception:
+        conn.rollback()
+        raise
+
+    return {
+        "employees": n,
+        "audit_rows": audit_count,
+        "seconds": round(time.perf_counter() - started, 2),
+    }
+
+
+def generate_dummy_data(n=50):
+    generate_bulk_employees(n)
     return f"{n} dummy employees berhasil dibuat!"
+
+
+def _parse_weights(text):
+    weights = {}
+    for part in (text or "").split(","):
+        if "=" in part:
+            name, value = part.split("=", 1)
+            weights[name.strip()] = float(value)
+    return weights
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Generate dataset pegawai sintetis (bulk).")
+    parser.add_argument("n", type=int, help="jumlah pegawai")
+    parser.add_argument("--seed", type=int, default=None)
+    parser.add_argument("--dirty-rate", type=float, default=0.05)
+    parser.add_argument("--anomaly-rate", type=float, default=0.02)
+    parser.add_argument("--department-weights", default="",
+                        help="contoh: ICT=3,Finance=2 (department lain bobot 1)")
+    parser.add_argument("--audit", action="store_true", help="buat juga riwayat audit_log")
+    parser.add_argument("--audit-update-rate", type=float, default=0.3)
+    parser.add_argument("--db", default=DB_PATH)
+    args = parser.parse_args()
+
+    result = generate_bulk_employees(
+        args.n, seed=args.seed, dirty_rate=args.dirty_rate,
+        anomaly_rate=args.anomaly_rate,
+        department_weights=_parse_weights(args.department_weights),
+        with_audit=args.audit, audit_update_rate=args.audit_update_rate,
+        db_path=args.db,
+    )
+    print(result)
@@ -0,0 +1,357 @@
+# ============================================================
+#  history.py
+#  Rekonstruksi data pegawai "per tanggal" (as-of) dari audit_log.
+#  Snapshot akhir bulan: snapshot penuh (semua pegawai) tiap
+#  FULL_SNAPSHOT_EVERY bulan, di antaranya hanya delta pegawai yang
+#  berubah. Query hanya me-replay event sejak snapshot terdekat.
+# ============================================================
+
+from datetime import date, datetime, timedelta
+
+import pandas as pd
+
+from audit_engine import (
+    WIB, to_wib_iso, now_wib, row_changes, encode_changes, decode_changes,
+    _legacy_json
+)
+
+FULL_SNAPSHOT_EVERY = 6
+
+_EVENT_COLUMNS = "id, action_time, action_type, employee_id, changes, before_data, after_data, detail"
+
+
+# ============================================================
+# REPLAY EVENT
+# ============================================================
+def _event_changes(row):
+    return row_changes({
+        "changes": row[4], "before_data": row[5],
+        "after_data": row[6], "detail": row[7],
+    })
+
+
+def _undo(record, row):
+    """Batalkan satu baris audit: field yang berubah kembali ke nilai lama."""
+    for field, (old, _) in _event_changes(row).items():
+        record[field] = old
+
+
+def _base_image(conn, employee_id):
+    """
+    State pegawai sebelum event audit pertamanya, untuk pegawai tanpa
+    log INSERT (dummy tanpa audit, data pra-audit, baris migrasi):
+    mundur dari baris employees saat ini dengan membatalkan semua
+    event-nya, seperti audit_engine.employee_images. Pegawai yang sudah
+    dihapus: image penuh tertua (before_data yang dipertahankan v5).
+    """
+    cur = conn.execute("SELECT * FROM employees WHERE employee_id=?", (employee_id,))
+    current = cur.fetchone()
+    order = "DESC" if current is not None else ""
+    events = conn.execute(
+        f"SELECT {_EVENT_COLUMNS} FROM audit_log WHERE employee_id=? "
+        f"ORDER BY action_time {order}, id {order}",
+        (employee_id,)
+    )
+    if current is None:
+        oldest = events.fetchone()
+        return {"employee_id": employee_id, **(_legacy_json(oldest[5]) if oldest else {})}
+
+    state = dict(zip([d[0] for d in cur.description], current))
+    for row in events:
+        _undo(state, row)
+    return state
+
+
+def _apply(states, row, touched=None, conn=None):
+    """
+    Terapkan satu baris audit (urutan _EVENT_COLUMNS) ke dict state.
+    Event pertama yang bukan INSERT → state awal dari _base_image
+    (butuh conn), bukan dict kosong.
+    """
+    action_type, employee_id = row[2], row[3]
+    if touched is not None:
+        touched.add(employee_id)
+    if action_type == "DELETE":
+        states.pop(employee_id, None)
+        return
+
+    record = states.get(employee_id)
+    if record is None:
+        record = states[employee_id] = (
+            _base_image(conn, employee_id)
+            if action_type != "INSERT" and conn is not None
+            else {"employee_id": employee_id}
+        )
+    for field, (_, new) in _event_changes(row).items():
+        record[field] = new
+
+
+def _as_of_iso(at):
+    """
+    datetime / date / teks → batas action_time (inklusif) format WIB.
+    Tanggal saja = akhir hari; waktu tanpa zona dianggap WIB.
+    """
+    if isinstance(at, date) and not isinstance(at, datetime):
+        at = at.isoformat()
+    if isinstance(at, str):
+        text = at.strip()
+        if len(text) == 10:
+            return f"{text}T23:59:59+07:00"
+        at = datetime.fromisoformat(text.replace(" ", "T"))
+    if at.tzinfo is None:
+        at = WIB.localize(at)
+    return to_wib_iso(at.isoformat())
+
+
+# ============================================================
+# SNAPSHOT
+# ============================================================
+def _drop_stale_snapshots(conn):
+    """
+    Snapshot basi bila ada baris audit yang masuk SETELAH snapshot dibuat
+    (id > max_audit_id) tetapi bertanggal <= cutoff-nya (mis. import data
+    historis). Snapshot tersebut dan semua sesudahnya dihapus.
+    """
+    snaps = conn.execute(
+        "SELECT snapshot_id, cutoff, max_audit_id FROM employee_snapshots ORDER BY cutoff"
+    ).fetchall()
+    for snapshot_id, cutoff, max_audit_id in snaps:
+        late = conn.execute(
+            "SELECT 1 FROM audit_log WHERE id > ? AND action_time <= ? LIMIT 1",
+            (max_audit_id, cutoff)
+        ).fetchone()
+        if late:
+            stale = "SELECT snapshot_id FROM employee_snapshots WHERE cutoff >= ?"
+            conn.execute(f"DELETE FROM employee_snapshot_rows WHERE snapshot_id IN ({stale})", (cutoff,))
+            conn.execute("DELETE FROM employee_snapshots WHERE cutoff >= ?", (cutoff,))
+            conn.commit()
+            return
+
+
+def _latest_snapshot(conn, at_iso=None):
+    """(snapshot_id, cutoff, base_id) terbaru dengan cutoff <= at_iso."""
+    sql = "SELECT snapshot_id, cutoff, base_id FROM employee_snapshots"
+    params = []
+    if at_iso is not None:
+        sql += " WHERE cutoff <= ?"
+        params.append(at_iso)
+    return conn.execute(sql + " ORDER BY cutoff DESC LIMIT 1", params).fetchone()
+
+
+def _load_snapshot(conn, snap, employee_id=None):
+    """
+    State pada snapshot: snapshot penuh (base) + delta sesudahnya sampai
+    snapshot ini. State NULL = pegawai dihapus.
+    """
+    snapshot_id, _, base_id = snap
+    sql = ("SELECT employee_id, state FROM employee_snapshot_rows "
+           "WHERE snapshot_id BETWEEN ? AND ?")
+    params = [base_id, snapshot_id]
+    if employee_id:
+        sql += " AND employee_id=?"
+        params.append(employee_id)
+
+    states = {}
+    for eid, state in conn.execute(sql + " ORDER BY snapshot_id", params):
+        states[eid] = state
+    return {eid: decode_changes(state) for eid, state in states.items() if state is not None}
+
+
+def _month_cutoffs(first_iso, until_iso):
+    """Akhir tiap bulan (23:59:59 WIB) dari bulan first_iso sampai sebelum until_iso."""
+    year, month = int(first_iso[:4]), int(first_iso[5:7])
+    cutoffs = []
+    while True:
+        year, month = (year + 1, 1) if month == 12 else (year, month + 1)
+        end = date(year, month, 1) - timedelta(days=1)
+        cutoff = f"{end.isoformat()}T23:59:59+07:00"
+        if cutoff >= until_iso:
+            return cutoffs
+        cutoffs.append(cutoff)
+
+
+def build_snapshots(conn) -> int:
+    """
+    Buat snapshot untuk setiap akhir bulan yang sudah lewat dan belum
+    punya snapshot — satu kali replay maju dari snapshot terakhir.
+    Mengembalikan jumlah snapshot baru.
+    """
+    _drop_stale_snapshots(conn)
+
+    max_id = conn.execute("SELECT MAX(id) FROM audit_log").fetchone()[0]
+    if max_id is None:
+        return 0
+
+    last = _latest_snapshot(conn)
+    if last:
+        states = _load_snapshot(conn, last)
+        start = last[1]
+        base_id = last[2]
+        since_full = conn.execute(
+            "SELECT COUNT(*) FROM employee_snapshots WHERE snapshot_id > ?", (base_id,)
+        ).fetchone()[0]
+    else:
+        states = {}
+        first = conn.execute("SELECT MIN(action_time) FROM audit_log").fetchone()[0]
+        # awal bulan event pertama
+        start = first[:7] + "-01T00:00:00+07:00"
+        base_id = None
+        since_full = FULL_SNAPSHOT_EVERY
+
+    cutoffs = _month_cutoffs(start, now_wib()[:7] + "-01T00:00:00+07:00")
+    if last:
+        cutoffs = [c for c in cutoffs if c > last[1]]
+    if not cutoffs:
+        return 0
+
+    events = conn.execute(
+        f"SELECT {_EVENT_COLUMNS} FROM audit_log "
+        "WHERE id <= ? AND action_time > ? AND action_time <= ? "
+        "ORDER BY action_time, id",
+        (max_id, start if last else "", cutoffs[-1])
+    )
+
+    pending = iter(cutoffs)
+    cutoff = next(pending)
+    touched = set()
+    created = 0
+
+    def write(cutoff):
+        nonlocal base_id, since_full
+        full = since_full + 1 >= FULL_SNAPSHOT_EVERY
+        cur = conn.execute(
+            "INSERT INTO employee_snapshots (cutoff, max_audit_id, base_id, employees, created_at) "
+            "VALUES (?, ?, ?, ?, ?)",
+            (cutoff, max_id, base_id, len(states), now_wib())
+        )
+        snapshot_id = cur.lastrowid
+        if full:
+            base_id, since_full = snapshot_id, 0
+            conn.execute("UPDATE employee_snapshots SET base_id=? WHERE snapshot_id=?",
+                         (snapshot_id, snapshot_id))
+            rows = states.keys()
+        else:
+            since_full += 1
+            rows = touched
+
+        conn.executemany(
+            "INSERT INTO employee_snapshot_rows (snapshot_id, employee_id, state) VALUES (?, ?, ?)",
+            ((snapshot_id, eid, encode_changes(states[eid]) if eid in states else None)
+             for eid in rows)
+        )
+        touched.clear()
+
+    for row in events:
+        while cutoff is not None and row[1] > cutoff:
+            write(cutoff)
+            created += 1
+            cutoff = next(pending, None)
+        _apply(states, row, touched, conn)
+
+    while cutoff is not None:
+        write(cutoff)
+        created += 1
+        cutoff = next(pending, None)
+
+    conn.commit()
+    return created
+
+
+# ============================================================
+# QUERY AS-OF
+# ============================================================
+def _unaudited_states(conn, at_iso, employee_id=None) -> pd.DataFrame:
+    """
+    Pegawai tanpa event audit s.d. 'at' (dummy, bulk load, data
+    pra-audit): baris employees saat ini, perubahan audit sesudah
+    'at' dibatalkan mundur. Pegawai yang punya log INSERT (berarti
+    dibuat sesudah 'at') atau date_joined sesudah 'at' dilewati.
+    Event yang dibatalkan hanya milik pegawai tersebut (CROSS JOIN →
+    lookup index per pegawai), bukan seluruh audit_log sesudah 'at'.
+    """
+    candidates = (
+        "SELECT * FROM employees e WHERE NOT EXISTS ("
+        "  SELECT 1 FROM audit_log a WHERE a.employee_id = e.employee_id "
+        "  AND (a.action_time <= ? OR a.action_type = 'INSERT')) "
+        "AND (e.date_joined IS NULL OR e.date_joined = '' OR e.date_joined <= ?)"
+    )
+    params = [at_iso, at_iso[:10]]
+    if employee_id:
+        candidates += " AND e.employee_id = ?"
+        params.append(employee_id)
+    cur = conn.execute(candidates, params)
+    df = pd.DataFrame.from_records(cur.fetchall(), columns=[d[0] for d in cur.description])
+    if df.empty:
+        return df
+
+    columns = ", ".join(f"a.{c.strip()}" for c in _EVENT_COLUMNS.split(","))
+    later = conn.execute(
+        f"WITH c AS ({candidates}) SELECT {columns} FROM c "
+        "CROSS JOIN audit_log a ON a.employee_id = c.employee_id AND a.action_time > ? "
+        "ORDER BY a.action_time DESC, a.id DESC",
+        (*params, at_iso)
+    )
+    undone = {}
+    for row in later:
+        _undo(undone.setdefault(row[3], {}), row)
+    if undone:
+        # hanya pegawai yang punya event sesudah 'at' yang diubah
+        fields = {field for changes in undone.values() for field in changes}
+        for field in fields:
+            df[field] = df[field].astype(object) if field in df.columns else None
+        positions = pd.Index(df["employee_id"]).get_indexer(list(undone))
+        for pos, changes in zip(positions, undone.values()):
+            for field, value in changes.items():
+                df.at[pos, field] = value
+    return df
+
+
+def employees_as_of(conn, at, employee_id=None):
+    """
+    State tabel employees (atau satu pegawai) pada waktu 'at' dari
+    riwayat audit. Pegawai tanpa riwayat audit s.d. 'at' diambil dari
+    baris saat ini (lihat _unaudited_states) — nilainya perkiraan bila
+    data berubah di luar audit (mis. import dummy).
+
+    Mengembalikan (DataFrame, info) dengan info = snapshot yang dipakai,
+    jumlah event yang di-replay dan jumlah pegawai dari baris saat ini.
+    """
+    at_iso = _as_of_iso(at)
+    _drop_stale_snapshots(conn)
+
+    snap = _latest_snapshot(conn, at_iso)
+    states = _load_snapshot(conn, snap, employee_id) if snap else {}
+
+    sql = f"SELECT {_EVENT_COLUMNS} FROM audit_log WHERE action_time <= ?"
+    params = [at_iso]
+    if snap:
+        sql += " AND action_time > ?"
+        params.append(snap[1])
+    if employee_id:
+        sql += " AND employee_id = ?"
+        params.append(employee_id)
+
+    replayed = 0
+    for row in conn.execute(sql + " ORDER BY action_time, id", params):
+        _apply(states, row, conn=conn)
+        replayed += 1
+
+    unaudited = _unaudited_states(conn, at_iso, employee_id)
+
+    columns = [r[1] for r in conn.execute("PRAGMA table_info(employees)")]
+    frames = [f for f in (pd.DataFrame(list(states.values())), unaudited) if not f.empty]
+    df = pd.concat(frames, ignore_index=True) if len(frames) > 1 else (
+        frames[0] if frames else pd.DataFrame()
+    )
+    if not df.empty:
+        df = df[[c for c in columns if c in df.columns]
+                + [c for c in df.columns if c not in columns]]
+        df = df.sort_values("employee_id", ignore_index=True)
+
+    info = {
+        "as_of": at_iso,
+        "snapshot": snap[1] if snap else None,
+        "replayed_events": replayed,
+        "from_current_rows": len(unaudited),
+    }
+    return df, info
@@ -0,0 +1,396 @@
+# ============================================================
+#  importer.py
+#  Import massal pegawai dari Excel (.xlsx) / CSV secara streaming:
+#  baca per chunk → validasi + koersi → upsert executemany + audit
+#  massal dalam satu transaksi per chunk → checkpoint.
+#  Import yang terputus dapat dilanjutkan dari chunk terakhir.
+# ============================================================
+
+import argparse
+import hashlib
+import json
+import os
+from datetime import date, datetime
+
+import numpy as np
+import pandas as pd
+
+from db import DB_NAME, get_conn, init_db
+from audit_engine import AUDIT_INSERT_SQL, audit_row, change_set, diff_detail, now_wib
+from data_strategist import compute_data_quality, detect_anomalies, anomaly_labels
+from score_store import get_state, set_state
+from skill_index import INDEX_COLUMNS, index_employees
+
+DEFAULT_CHUNK_ROWS = 5_000
+IN_BATCH = 900              # batas parameter untuk WHERE employee_id IN (...)
+
+TEXT_COLUMNS = [
+    "full_name", "email", "department", "bureau", "job_title", "mpl_level",
+    "work_location", "date_joined", "technical_skills", "soft_skills",
+    "certifications", "notes",
+]
+NUMERIC_COLUMNS = ["years_in_bureau", "years_in_department", "avg_perf_3yr"]
+FLAG_COLUMNS = ["has_discipline_issue", "is_candidate_bureau_head"]
+
+IMPORT_COLUMNS = ["employee_id"] + TEXT_COLUMNS + NUMERIC_COLUMNS + FLAG_COLUMNS
+
+# kolom yang dibutuhkan compute_data_quality / detect_anomalies
+_SCORING_COLUMNS = IMPORT_COLUMNS + ["last_updated"]
+
+_TRUE = {"1", "y", "ya", "yes", "true", "t"}
+_FALSE = {"0", "n", "tidak", "no", "false", "f"}
+
+CHECKPOINT_PREFIX = "import_checkpoint:"
+
+
+# ============================================================
+# SUMBER FILE
+# ============================================================
+def _file_format(name, fmt=None):
+    if fmt:
+        return fmt
+    ext = os.path.splitext(str(name))[1].lower()
+    if ext in (".xlsx", ".xlsm"):
+        return "xlsx"
+    if ext == ".csv":
+        return "csv"
+    raise ValueError(f"Format file tidak didukung: {name}")
+
+
+def fingerprint(source) -> str:
+    """SHA-1 isi file (path atau file-like) — kunci checkpoint."""
+    h = hashlib.sha1()
+    if isinstance(source, (str, os.PathLike)):
+        with open(source, "rb") as f:
+            for block in iter(lambda: f.read(1 << 20), b""):
+                h.update(block)
+    else:
+        source.seek(0)
+        for block in iter(lambda: source.read(1 << 20), b""):
+            h.update(block)
+        source.seek(0)
+    return h.hexdigest()
+
+
+def _header(name) -> str:
+    """'Employee ID' → 'employee_id'."""
+    return str(name or "").strip().lower().replace(" ", "_").replace("-", "_")
+
+
+def _drop_blank(df: pd.DataFrame, row_numbers):
+    blank = df.isna() | (df.astype(str).apply(lambda c: c.str.strip()) == "")
+    keep = ~blank.all(axis=1).to_numpy()
+    return df[keep].reset_index(drop=True), row_numbers[keep]
+
+
+def iter_chunks(source, fmt, chunk_rows=DEFAULT_CHUNK_ROWS, skip_rows=0):
+    """
+    (DataFrame, nomor baris di file, jumlah baris data terbaca) per
+    chunk. Sel dibaca apa adanya (CSV sebagai teks), baris kosong
+    dibuang; skip_rows record data pertama dilewati (resume). CSV
+    dilewati per record, bukan per baris fisik: field berkutip boleh
+    berisi newline (mis. notes).
+    Excel dibaca openpyxl read-only → memori konstan per chunk.
+    """
+    if not isinstance(source, (str, os.PathLike)):
+        source.seek(0)
+
+    if fmt == "csv":
+        reader = pd.read_csv(
+            source, dtype=str, keep_default_na=False, chunksize=chunk_rows,
+            skip_blank_lines=False
+        )
+        consumed = skip_rows
+        to_skip = skip_rows
+        for df in reader:
+            if to_skip >= len(df):
+                to_skip -= len(df)
+                continue
+            df = df.iloc[to_skip:].reset_index(drop=True)
+            to_skip = 0
+            df.columns = [_header(c) for c in df.columns]
+            rows = np.arange(consumed, consumed + len(df)) + 2    # +header, 1-based
+            consumed += len(df)
+            df, rows = _drop_blank(df, rows)
+            yield df, rows, consumed
+        return
+
+    from openpyxl import load_workbook
+
+    wb = load_workbook(source, read_only=True, data_only=True)
+    try:
+        ws = wb.active
+        header = next(ws.iter_rows(min_row=1, max_row=1, values_only=True), ())
+        columns = [_header(c) for c in header]
+        consumed = skip_rows
+        batch = []
+        for values in ws.iter_rows(min_row=skip_rows + 2, values_only=True):
+            batch.append(values)
+            if len(batch) == chunk_rows:
+                rows = np.arange(consumed, consumed + len(batch)) + 2
+                consumed += len(batch)
+                yield (*_drop_blank(pd.DataFrame(batch, columns=columns), rows), consumed)
+                batch = []
+        if batch:
+            rows = np.arange(consumed, consumed + len(batch)) + 2
+            consumed += len(batch)
+            yield (*_drop_blank(pd.DataFrame(batch, columns=columns), rows), consumed)
+    finally:
+        wb.close()
+
+
+# ============================================================
+# VALIDASI + KOERSI
+# ============================================================
+def _cell_text(value):
+    if value is None:
+        return None
+    if isinstance(value, float):
+        if np.isnan(value):
+            return None
+        if value.is_integer():
+            value = int(value)
+    if isinstance(value, (datetime, date)):
+        value = value.date() if isinstance(value, datetime) else value
+        return value.isoformat()
+    text = str(value).strip()
+    return text or None
+
+
+def coerce_chunk(raw: pd.DataFrame):
+    """
+    Koersi chunk mentah ke tipe kolom employees.
+    Angka memakai aturan yang sama dengan scorer DQ (pd.to_numeric,
+    teks tidak valid = kosong). Mengembalikan (df, issues) dengan
+    issues[i] = daftar catatan validasi baris i.
+    """
+    cols = [c for c in IMPORT_COLUMNS if c in raw.columns]
+    df = pd.DataFrame(index=raw.index)
+    issues = [[] for _ in range(len(raw))]
+
+    for col in cols:
+        values = raw[col].map(_cell_text).astype(object)
+        values = values.where(values.notna(), None)
+        if col in NUMERIC_COLUMNS:
+            numbers = pd.to_numeric(values, errors="coerce")
+            bad = values.notna() & numbers.isna()
+            for i in np.flatnonzero(bad.to_numpy()):
+                issues[i].append(f"{col} bukan angka")
+            df[col] = numbers.astype(object).where(numbers.notna(), None)
+        elif col in FLAG_COLUMNS:
+            # kosong / tidak dikenali → None = pertahankan nilai lama
+            lowered = values.str.lower()
+            flags = np.select([lowered.isin(_TRUE), lowered.isin(_FALSE)], [1, 0], -1)
+            bad = values.notna() & (flags == -1)
+            for i in np.flatnonzero(bad.to_numpy()):
+                issues[i].append(f"{col} bukan ya/tidak (nilai lama dipertahankan)")
+            df[col] = [None if f == -1 else int(f) for f in flags]
+        else:
+            df[col] = values
+
+    return df, issues
+
+
+def _fetch_existing(conn, ids, columns):
+    """employee_id → dict kolom (hanya pegawai yang sudah ada)."""
+    existing = {}
+    select = ", ".join(columns)
+    for i in range(0, len(ids), IN_BATCH):
+        batch = ids[i:i + IN_BATCH]
+        marks = ", ".join("?" for _ in batch)
+        cur = conn.execute(
+            f"SELECT {select} FROM employees WHERE employee_id IN ({marks})", batch
+        )
+        names = [d[0] for d in cur.description]
+        for row in cur:
+            existing[row[0]] = dict(zip(names, row))
+    return existing
+
+
+# ============================================================
+# PROSES SATU CHUNK
+# ============================================================
+def plan_chunk(conn, raw: pd.DataFrame, row_numbers):
+    """
+    Bandingkan chunk dengan isi database. Mengembalikan (writes, report):
+    writes = [(action, employee_id, before, after)] untuk INSERT/UPDATE,
+    report = DataFrame per baris (aksi, field berubah, skor DQ, anomali).
+    """
+    df, issues = coerce_chunk(raw)
+    file_columns = [c for c in IMPORT_COLUMNS if c in df.columns]
+
+    if "employee_id" not in df.columns:
+        report = pd.DataFrame({
+            "row": row_numbers, "employee_id": None, "action": "REJECT",
+            "fields": "", "dq_score": None, "anomalies": "",
+            "issues": "kolom employee_id tidak ada",
+        })
+        return [], report
+
+    ids = df["employee_id"].tolist()
+    existing = _fetch_existing(conn, sorted({i for i in ids if i}), _SCORING_COLUMNS)
+    # baris terakhir menang bila satu employee_id muncul berulang
+    last_pos = {eid: pos for pos, eid in enumerate(ids) if eid}
+    now = datetime.now().isoformat()
+
+    actions, fields, merged, writes = [], [], [], []
+    for pos, rec in enumerate(df.to_dict("records")):
+        eid = rec["employee_id"]
+        before_full = existing.get(eid)
+        changed = {}
+        for col in FLAG_COLUMNS:
+            if col in rec and rec[col] is None:
+                rec[col] = before_full[col] if before_full else 0
+
+        if not eid:
+            action = "REJECT"
+            issues[pos].append("employee_id kosong")
+        elif last_pos[eid] != pos:
+            action = "SKIP"
+            issues[pos].append("employee_id duplikat (baris terakhir dipakai)")
+        elif before_full is None:
+            action = "INSERT"
+            writes.append((action, eid, {}, rec))
+        else:
+            # teks kosong "" di database setara dengan sel kosong
+            before = {c: None if before_full[c] == "" else before_full[c] for c in file_columns}
+            changed = change_set(before, rec)
+            action = "UPDATE" if changed else "UNCHANGED"
+            if changed:
+                before["last_updated"] = before_full["last_updated"]
+                writes.append((action, eid, before, rec))
+
+        actions.append(action)
+        fields.append(", ".join(changed))
+        # record sesudah import → dasar skor DQ / anomali di laporan
+        after = {**{c: None for c in _SCORING_COLUMNS}, **(before_full or {})}
+        if action in ("INSERT", "UPDATE"):
+            after.update(rec, last_updated=now)
+        merged.append(after)
+
+    scored = detect_anomalies(compute_data_quality(pd.DataFrame(merged, columns=_SCORING_COLUMNS)))
+    report = pd.DataFrame({
+        "row": row_numbers,
+        "employee_id": ids,
+        "action": actions,
+        "fields": fields,
+        "dq_score": scored["data_quality_score_adv"].to_numpy(),
+        "anomalies": anomaly_labels(scored["anomaly_mask"]).to_numpy(),
+        "issues": ["; ".join(i) for i in issues],
+    })
+    return writes, report
+
+
+def write_chunk(conn, writes, username, user_role, file_columns):
+    """
+    Upsert + audit + index skill untuk satu chunk. Tidak commit —
+    pemanggil meng-commit bersama checkpoint.
+    """
+    if not writes:
+        return
+
+    now = datetime.now().isoformat()
+    columns = file_columns + ["last_updated"]
+    placeholders = ", ".join("?" for _ in columns)
+    updates = ", ".join(f"{c}=excluded.{c}" for c in columns if c != "employee_id")
+    conn.executemany(
+        f"INSERT INTO employees ({', '.join(columns)}) VALUES ({placeholders}) "
+        f"ON CONFLICT(employee_id) DO UPDATE SET {updates}, scored_at=NULL",
+        ([after.get(c) for c in file_columns] + [now] for _, _, _, after in writes)
+    )
+
+    action_time = now_wib()
+    conn.executemany(AUDIT_INSERT_SQL, [
+        audit_row(
+            action_time, username, user_role, action, eid,
+            "Insert employee (import)" if action == "INSERT" else diff_detail(before, after),
+            before, {**after, "last_updated": now}
+        )
+        for action, eid, before, after in writes
+    ])
+
+    if any(c in file_columns for c in INDEX_COLUMNS.values()):
+        ids = [eid for _, eid, _, _ in writes]
+        skills = _fetch_existing(conn, ids, ["employee_id", *INDEX_COLUMNS.values()])
+        index_employees(conn, pd.DataFrame(list(skills.values())))
+
+
+# ============================================================
+# IMPORT FILE
+# ============================================================
+def import_file(source, name=None, username=None, user_role=None, dry_run=False,
+                resume=True, chunk_rows=DEFAULT_CHUNK_ROWS, fmt=None,
+                db_path=DB_NAME, progress=None) -> dict:
+    """
+    Import streaming. Tiap chunk = satu transaksi (upsert + audit +
+    checkpoint), jadi import yang terputus dilanjutkan dari chunk
+    berikutnya bila file yang sama di-import ulang (resume=True).
+    dry_run=True hanya membuat laporan tanpa menulis apa pun.
+
+    progress(baris_diproses) dipanggil setelah tiap chunk.
+    Mengembalikan ringkasan jumlah per aksi + DataFrame 'report'.
+    """
+    fmt = _file_format(name or source, fmt)
+    init_db(db_path)
+    conn = get_conn(db_path)
+
+    key = CHECKPOINT_PREFIX + fingerprint(source)
+    checkpoint = json.loads(get_state(conn, key, "null") or "null") if resume else None
+    skip = checkpoint["rows"] if checkpoint and not dry_run else 0
+
+    reports = []
+    processed = skip
+    for raw, row_numbers, processed in iter_chunks(source, fmt, chunk_rows, skip):
+        writes, report = plan_chunk(conn, raw, row_numbers)
+        reports.append(report)
+
+        if not dry_run:
+            try:
+                file_columns = [c for c in IMPORT_COLUMNS if c in raw.columns]
+                write_chunk(conn, writes, username, user_role, file_columns)
+                set_state(conn, key, json.dumps({"rows": processed}))
+                conn.commit()
+            except Exception:
+                conn.rollback()
+                raise
+        if progress is not None:
+            progress(processed)
+
+    if not dry_run:
+        conn.execute("DELETE FROM pipeline_state WHERE key=?", (key,))
+        conn.commit()
+
+    report = pd.concat(reports, ignore_index=True) if reports else pd.DataFrame()
+    counts = report["action"].value_counts().to_dict() if not report.empty else {}
+    return {
+        "rows": processed,
+        "resumed_from": skip,
+        "inserted": counts.get("INSERT", 0),
+        "updated": counts.get("UPDATE", 0),
+        "unchanged": counts.get("UNCHANGED", 0),
+        "rejected": counts.get("REJECT", 0) + counts.get("SKIP", 0),
+        "dry_run": dry_run,
+        "report": report,
+    }
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Import pegawai dari Excel / CSV.")
+    parser.add_argument("path", help="file .xlsx atau .csv")
+    parser.add_argument("--dry-run", action="store_true", help="laporan saja, tanpa menulis")
+    parser.add_argument("--no-resume", action="store_true", help="abaikan checkpoint")
+    parser.add_argument("--chunk-rows", type=int, default=DEFAULT_CHUNK_ROWS)
+    parser.add_argument("--user", default="import")
+    parser.add_argument("--role", default="HC System Bureau Head")
+    parser.add_argument("--report", default="", help="simpan laporan ke CSV")
+    parser.add_argument("--db", default=DB_NAME)
+    args = parser.parse_args()
+
+    result = import_file(
+        args.path, username=args.user, user_role=args.role, dry_run=args.dry_run,
+        resume=not args.no_resume, chunk_rows=args.chunk_rows, db_path=args.db,
+    )
+    report = result.pop("report")
+    if args.report:
+        report.to_csv(args.report, index=False)
+    print(result)
@@ -0,0 +1,372 @@
+# ============================================================
+#  migrations.py
+#  Migrasi skema berversi (PRAGMA user_version).
+#  Tambahkan langkah baru di akhir MIGRATIONS; jangan ubah
+#  langkah yang sudah pernah dirilis.
+# ============================================================
+
+
+def ensure_columns(cur, table, columns):
+    """Tambahkan kolom yang belum ada (ALTER TABLE ... ADD COLUMN)."""
+    cur.execute(f"PRAGMA table_info({table})")
+    existing = {row[1] for row in cur.fetchall()}
+    for name, col_type in columns.items():
+        if name not in existing:
+            cur.execute(f"ALTER TABLE {table} ADD COLUMN {name} {col_type}")
+
+
+# ============================================================
+# LANGKAH MIGRASI
+# ============================================================
+def _v1_base_schema(cur):
+    """Tabel employees + satu bentuk audit_log (termasuk username)."""
+    cur.execute("""
+        CREATE TABLE IF NOT EXISTS employees (
+            employee_id TEXT PRIMARY KEY,
+            full_name TEXT,
+            email TEXT,
+            department TEXT,
+            bureau TEXT,
+            job_title TEXT,
+            mpl_level TEXT,
+            work_location TEXT,
+            date_joined TEXT,
+            years_in_bureau REAL,
+            years_in_department REAL,
+            avg_perf_3yr REAL,
+            has_discipline_issue INTEGER,
+            technical_skills TEXT,
+            soft_skills TEXT,
+            certifications TEXT,
+            notes TEXT,
+            is_candidate_bureau_head INTEGER,
+            data_quality_score REAL,
+            last_updated TEXT
+        )
+    """)
+
+    cur.execute("""
+        CREATE TABLE IF NOT EXISTS audit_log (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            action_time TEXT,
+            username TEXT,
+            user_role TEXT,
+            action_type TEXT,
+            employee_id TEXT,
+            detail TEXT,
+            before_data TEXT,
+            after_data TEXT,
+            ip_address TEXT
+        )
+    """)
+
+    # database lama dari db.init_db versi awal belum punya username
+    ensure_columns(cur, "audit_log", {"username": "TEXT"})
+
+
+def _v2_pipeline_scores(cur):
+    """Kolom hasil pipeline + state watermark scoring."""
+    ensure_columns(cur, "employees", {
+        "anomaly_mask": "INTEGER",
+        "competency_gap_score": "REAL",
+        "talent_readiness_index": "REAL",
+        "scored_at": "TEXT",
+    })
+
+    cur.execute("""
+        CREATE TABLE IF NOT EXISTS pipeline_state (
+            key TEXT PRIMARY KEY,
+            value TEXT
+        )
+    """)
+
+
+def _v3_indexes(cur):
+    """Index untuk jalur akses yang benar-benar dipakai halaman."""
+    for ddl in [
+        "CREATE INDEX IF NOT EXISTS idx_audit_time ON audit_log(action_time)",
+        "CREATE INDEX IF NOT EXISTS idx_audit_employee_time ON audit_log(employee_id, action_time)",
+        "CREATE INDEX IF NOT EXISTS idx_employees_department ON employees(department)",
+        "CREATE INDEX IF NOT EXISTS idx_employees_bureau ON employees(bureau)",
+        "CREATE INDEX IF NOT EXISTS idx_employees_last_updated ON employees(last_updated)",
+        "CREATE INDEX IF NOT EXISTS idx_employees_dq ON employees(data_quality_score)",
+        "CREATE INDEX IF NOT EXISTS idx_employees_tri ON employees(talent_readiness_index)",
+        "CREATE INDEX IF NOT EXISTS idx_employees_anomaly ON employees(anomaly_mask) WHERE anomaly_mask != 0",
+        "CREATE INDEX IF NOT EXISTS idx_employees_scored_at ON employees(scored_at)",
+    ]:
+        cur.execute(ddl)
+    cur.execute("ANALYZE")
+
+
+def _v4_audit_time(cur):
+    """
+    action_time seragam WIB '+07:00' (audit.py lama menulis waktu
+    naive) + index untuk filter username pada halaman audit.
+    """
+    from audit_engine import to_wib_iso     # hindari import melingkar db ↔ audit_engine
+
+    rows = cur.execute(
+        "SELECT id, action_time FROM audit_log WHERE action_time IS NOT NULL "
+        "AND action_time NOT GLOB "
+        "'[0-9][0-9][0-9][0-9]-[0-9][0-9]-[0-9][0-9]T[0-9][0-9]:[0-9][0-9]:[0-9][0-9]+07:00'"
+    ).fetchall()
+
+    updates = []
+    for row_id, value in rows:
+        try:
+            updates.append((to_wib_iso(value), row_id))
+        except ValueError:
+            pass    # teks tidak dikenali dibiarkan apa adanya
+    cur.executemany("UPDATE audit_log SET action_time=? WHERE id=?", updates)
+
+    cur.execute(
+        "CREATE INDEX IF NOT EXISTS idx_audit_user_time ON audit_log(username, action_time)"
+    )
+
+
+def _v5_audit_changes(cur, chunk=5_000):
+    """
+    Payload audit ringkas: before_data/after_data/detail JSON diganti
+    kolom 'changes' (hanya field berubah, zlib). Ukuran file baru
+    turun setelah VACUUM (tombol Optimize Database).
+    Baris audit tertua tiap pegawai tetap menyimpan before_data /
+    after_data penuh: tanpa baris INSERT, itu satu-satunya image
+    lengkap untuk rekonstruksi (audit_engine.employee_images).
+    """
+    from audit_engine import row_changes, encode_changes
+
+    ensure_columns(cur, "audit_log", {"changes": "BLOB"})
+    keep_full = {
+        r[0] for r in cur.execute(
+            "SELECT MIN(id) FROM audit_log WHERE changes IS NULL GROUP BY employee_id"
+        )
+    }
+
+    last_id = 0
+    while True:
+        rows = cur.execute(
+            "SELECT id, action_type, before_data, after_data, detail FROM audit_log "
+            "WHERE id > ? AND changes IS NULL ORDER BY id LIMIT ?",
+            (last_id, chunk)
+        ).fetchall()
+        if not rows:
+            break
+
+        updates, kept = [], []
+        for row_id, action_type, before_data, after_data, detail in rows:
+            changes = row_changes({
+                "before_data": before_data, "after_data": after_data, "detail": detail,
+            })
+            if action_type == "UPDATE" and detail and detail.startswith("{"):
+                detail = "Update: " + ", ".join(changes)
+            (kept if row_id in keep_full else updates).append(
+                (encode_changes(changes), detail, row_id)
+            )
+        cur.executemany(
+            "UPDATE audit_log SET changes=?, detail=?, before_data=NULL, after_data=NULL "
+            "WHERE id=?", updates
+        )
+        cur.executemany("UPDATE audit_log SET changes=?, detail=? WHERE id=?", kept)
+        last_id = rows[-1][0]
+
+
+def _v6_employee_snapshots(cur):
+    """
+    Snapshot state pegawai per akhir bulan untuk query as-of (history.py).
+    base_id = snapshot penuh yang menjadi dasar snapshot delta.
+    """
+    cur.execute("""
+        CREATE TABLE IF NOT EXISTS employee_snapshots (
+            snapshot_id INTEGER PRIMARY KEY,
+            cutoff TEXT NOT NULL,
+            max_audit_id INTEGER NOT NULL,
+            base_id INTEGER,
+            employees INTEGER,
+            created_at TEXT
+        )
+    """)
+    cur.execute("CREATE INDEX IF NOT EXISTS idx_snapshots_cutoff ON employee_snapshots(cutoff)")
+
+    cur.execute("""
+        CREATE TABLE IF NOT EXISTS employee_snapshot_rows (
+            snapshot_id INTEGER,
+            employee_id TEXT,
+            state BLOB,
+            PRIMARY KEY (snapshot_id, employee_id)
+        ) WITHOUT ROWID
+    """)
+    cur.execute(
+        "CREATE INDEX IF NOT EXISTS idx_snapshot_rows_employee "
+        "ON employee_snapshot_rows(employee_id, snapshot_id)"
+    )
+
+
+def _v7_screening_index(cur):
+    """
+    Screening: WHERE department=? AND tri>=? ORDER BY tri DESC LIMIT ?
+    langsung dari index. Index department tunggal menjadi prefiksnya.
+    """
+    cur.execute(
+        "CREATE INDEX IF NOT EXISTS idx_employees_dept_tri "
+        "ON employees(department, talent_readiness_index)"
+    )
+    cur.execute("DROP INDEX IF EXISTS idx_employees_department")
+
+
+def _v8_skill_postings(cur):
+    """
+    Inverted index skill → pegawai (skill_index.py). Kunci employee_id,
+    bukan rowid, karena VACUUM boleh menomori ulang rowid implisit.
+    """
+    from skill_index import rebuild_skill_index
+
+    cur.execute("""
+        CREATE TABLE IF NOT EXISTS skill_postings (
+            skill TEXT NOT NULL,
+            employee_id TEXT NOT NULL,
+            PRIMARY KEY (skill, employee_id)
+        ) WITHOUT ROWID
+    """)
+    cur.execute(
+        "CREATE INDEX IF NOT EXISTS idx_skill_postings_employee "
+        "ON skill_postings(employee_id)"
+    )
+    rebuild_skill_index(cur.connection)
+
+
+def _v9_employee_fts(cur):
+    """
+    Full-text search (employee_search.py): FTS5 external content atas
+    employees + trigger sinkron. Trigger update hanya untuk kolom teks,
+    jadi update skor pipeline tidak menyentuh index.
+    """
+    cols = "full_name, job_title, notes, technical_skills, soft_skills, certifications"
+    new = ", ".join(f"new.{c.strip()}" for c in cols.split(","))
+    old = ", ".join(f"old.{c.strip()}" for c in cols.split(","))
+
+    cur.execute(f"""
+        CREATE VIRTUAL TABLE IF NOT EXISTS employees_fts USING fts5(
+            {cols},
+            content='employees', content_rowid='rowid',
+            tokenize='unicode61 remove_diacritics 2', prefix='2 3'
+        )
+    """)
+
+    cur.execute(f"""
+        CREATE TRIGGER IF NOT EXISTS employees_fts_ai AFTER INSERT ON employees BEGIN
+            INSERT INTO employees_fts(rowid, {cols}) VALUES (new.rowid, {new});
+        END
+    """)
+    cur.execute(f"""
+        CREATE TRIGGER IF NOT EXISTS employees_fts_ad AFTER DELETE ON employees BEGIN
+            INSERT INTO employees_fts(employees_fts, rowid, {cols})
+            VALUES ('delete', old.rowid, {old});
+        END
+    """)
+    cur.execute(f"""
+        CREATE TRIGGER IF NOT EXISTS employees_fts_au AFTER UPDATE OF {cols} ON employees BEGIN
+            INSERT INTO employees_fts(employees_fts, rowid, {cols})
+            VALUES ('delete', old.rowid, {old});
+            INSERT INTO employees_fts(rowid, {cols}) VALUES (new.rowid, {new});
+        END
+    """)
+
+    cur.execute("INSERT INTO employees_fts(employees_fts) VALUES('rebuild')")
+
+
+def _v10_name_index(cur):
+    """Typeahead form: prefix nama tanpa beda huruf besar/kecil."""
+    cur.execute(
+        "CREATE INDEX IF NOT EXISTS idx_employees_name "
+        "ON employees(full_name COLLATE NOCASE)"
+    )
+
+
+def _v11_last_updated_utc(cur):
+    """
+    last_updated tercampur format (spasi/'T', mikrodetik, offset zona
+    waktu); watermark skor membandingkan nilai ternormalisasi UTC
+    (score_store.LAST_UPDATED_UTC) lewat index ekspresi ini.
+    """
+    cur.execute(
+        "CREATE INDEX IF NOT EXISTS idx_employees_last_updated_utc "
+        "ON employees(strftime('%Y-%m-%d %H:%M:%f', last_updated))"
+    )
+
+
+def _v12_rebuild_snapshots(cur):
+    """
+    Snapshot lama bisa berisi state parsial (pegawai tanpa log INSERT
+    di-replay dari dict kosong) — dihapus, dibangun ulang oleh
+    history.build_snapshots.
+    """
+    cur.execute("DELETE FROM employee_snapshot_rows")
+    cur.execute("DELETE FROM employee_snapshots")
+
+
+def _v13_profile_gaps(cur):
+    """
+    Gap kompetensi per profil jabatan (katalog skills.ROLE_PROFILES),
+    disimpan bersama skor pipeline — dashboard mengagregasi di SQL.
+    """
+    cur.execute("""
+        CREATE TABLE IF NOT EXISTS profile_gaps (
+            employee_id TEXT NOT NULL,
+            profile TEXT NOT NULL,
+            gap INTEGER NOT NULL,
+            PRIMARY KEY (employee_id, profile)
+        ) WITHOUT ROWID
+    """)
+    cur.execute(
+        "CREATE INDEX IF NOT EXISTS idx_profile_gaps_profile ON profile_gaps(profile, gap)"
+    )
+
+
+MIGRATIONS = [
+    (1, "base schema + unified audit_log", _v1_base_schema),
+    (2, "pipeline score columns + pipeline_state", _v2_pipeline_scores),
+    (3, "indexes for hot queries", _v3_indexes),
+    (4, "normalize audit action_time to WIB", _v4_audit_time),
+    (5, "diff-only compressed audit payload", _v5_audit_changes),
+    (6, "employee snapshots for as-of queries", _v6_employee_snapshots),
+    (7, "department + TRI index for screening", _v7_screening_index),
+    (8, "inverted skill index", _v8_skill_postings),
+    (9, "FTS5 employee search + sync triggers", _v9_employee_fts),
+    (10, "case-insensitive name index for typeahead", _v10_name_index),
+    (11, "normalized last_updated index for score watermark", _v11_last_updated_utc),
+    (12, "rebuild snapshots with full base images", _v12_rebuild_snapshots),
+    (13, "stored gap per role profile", _v13_profile_gaps),
+]
+
+LATEST_VERSION = MIGRATIONS[-1][0]
+
+
+def current_version(conn) -> int:
+    return conn.execute("PRAGMA user_version").fetchone()[0]
+
+
+def migrate(conn) -> int:
+    """
+    Jalankan langkah yang belum diterapkan, masing-masing dalam satu
+    transaksi bersama update user_version. BEGIN IMMEDIATE mengunci
+    penulisan sehingga proses lain tidak menjalankan langkah yang sama.
+    Mengembalikan versi akhir.
+    """
+    if current_version(conn) >= LATEST_VERSION:
+        return current_version(conn)
+
+    if conn.in_transaction:
+        conn.commit()
+
+    for version, _, step in MIGRATIONS:
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            if current_version(conn) < version:
+                step(conn.cursor())
+                conn.execute(f"PRAGMA user_version={version}")
+            conn.execute("COMMIT")
+        except Exception:
+            conn.execute("ROLLBACK")
+            raise
+
+    return current_version(conn)
@@ -0,0 +1,254 @@
+# ============================================================
+#  perf.py
+#  Instrumentasi hot path: timer & counter ringan dengan histogram
+#  bergulir (p50/p95/p99), koneksi SQLite terinstrumentasi (setiap
+#  execute / fetch tercatat) dan capture cProfile / tracemalloc
+#  opsional per render halaman. Dimatikan dengan HC_PERF=0.
+# ============================================================
+
+import cProfile
+import io
+import os
+import pstats
+import sqlite3
+import threading
+import time
+import tracemalloc
+from collections import deque
+from contextlib import contextmanager
+from functools import wraps
+
+import numpy as np
+import pandas as pd
+
+ENABLED = os.environ.get("HC_PERF", "1") != "0"
+
+WINDOW = 1024           # sampel terakhir per metrik untuk persentil
+SLOW_SQL_MS = 100       # statement selambat ini dicatat teksnya
+SLOW_SQL_KEEP = 20
+PROFILE_TOP = 30        # baris pstats pada capture cProfile
+TRACE_TOP = 15          # baris alokasi pada capture tracemalloc
+
+
+class RollingHistogram:
+    """Jumlah/total/maks sepanjang umur proses + jendela sampel untuk persentil."""
+
+    def __init__(self, window=WINDOW):
+        self.samples = deque(maxlen=window)
+        self.count = 0
+        self.total = 0.0
+        self.max = 0.0
+
+    def add(self, ms):
+        self.samples.append(ms)
+        self.count += 1
+        self.total += ms
+        self.max = max(self.max, ms)
+
+    def percentiles(self, qs=(50, 95, 99)):
+        if not self.samples:
+            return [float("nan")] * len(qs)
+        return np.percentile(np.fromiter(self.samples, float), qs).tolist()
+
+
+_lock = threading.Lock()
+_timers = {}
+_counters = {}
+_slow_sql = deque(maxlen=SLOW_SQL_KEEP)
+
+
+# ============================================================
+# TIMER & COUNTER
+# ============================================================
+def record(name, ms):
+    with _lock:
+        hist = _timers.get(name)
+        if hist is None:
+            hist = _timers[name] = RollingHistogram()
+        hist.add(ms)
+
+
+def count(name, n=1):
+    if not ENABLED:
+        return
+    with _lock:
+        _counters[name] = _counters.get(name, 0) + n
+
+
+@contextmanager
+def timer(name):
+    """with timer("stage.x"): ... → durasi (ms) masuk histogram 'name'."""
+    if not ENABLED:
+        yield
+        return
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        record(name, (time.perf_counter() - start) * 1000)
+
+
+def timed(name=None):
+    """Decorator timer; nama default = nama fungsi."""
+    def decorate(fn):
+        if not ENABLED:
+            return fn
+        metric = name or fn.__name__
+
+        @wraps(fn)
+        def wrapper(*args, **kwargs):
+            start = time.perf_counter()
+            try:
+                return fn(*args, **kwargs)
+            finally:
+                record(metric, (time.perf_counter() - start) * 1000)
+        return wrapper
+    return decorate
+
+
+def snapshot() -> pd.DataFrame:
+    """Ringkasan semua timer (ms), urut total waktu terbesar."""
+    with _lock:
+        rows = [
+            (name, h.count, h.total, h.total / h.count, *h.percentiles(), h.max)
+            for name, h in _timers.items()
+        ]
+    df = pd.DataFrame(rows, columns=["metric", "count", "total_ms", "mean_ms",
+                                     "p50_ms", "p95_ms", "p99_ms", "max_ms"])
+    return df.sort_values("total_ms", ascending=False, ignore_index=True).round(2)
+
+
+def counters() -> dict:
+    with _lock:
+        return dict(sorted(_counters.items()))
+
+
+def slow_queries() -> pd.DataFrame:
+    with _lock:
+        rows = list(_slow_sql)
+    return pd.DataFrame(rows, columns=["ms", "sql"]).sort_values("ms", ascending=False)
+
+
+def reset():
+    with _lock:
+        _timers.clear()
+        _counters.clear()
+        _slow_sql.clear()
+
+
+# ============================================================
+# SQLITE TERINSTRUMENTASI
+# ============================================================
+def _sql_metric(sql):
+    verb = sql.lstrip().split(None, 1)[0].upper() if sql.strip() else "?"
+    return f"sql.{verb}"
+
+
+@contextmanager
+def _sql_timer(sql):
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        ms = (time.perf_counter() - start) * 1000
+        record(_sql_metric(sql), ms)
+        if ms >= SLOW_SQL_MS:
+            with _lock:
+                _slow_sql.append((round(ms, 1), " ".join(sql.split())[:300]))
+
+
+class InstrumentedCursor(sqlite3.Cursor):
+    """Cursor (dipakai pandas.read_sql_query) yang mencatat execute & fetch."""
+
+    def execute(self, sql, parameters=(), /):
+        with _sql_timer(sql):
+            return super().execute(sql, parameters)
+
+    def executemany(self, sql, seq_of_parameters, /):
+        with _sql_timer(sql):
+            return super().executemany(sql, seq_of_parameters)
+
+    def fetchall(self):
+        with timer("sql.fetch"):
+            return super().fetchall()
+
+    def fetchmany(self, size=None):
+        with timer("sql.fetch"):
+            return super().fetchmany(self.arraysize if size is None else size)
+
+
+class InstrumentedConnection(sqlite3.Connection):
+    """
+    Factory koneksi untuk db.open_conn: conn.execute / executemany /
+    executescript dan cursor() tercatat sebagai sql.<VERB>.
+    """
+
+    def cursor(self, factory=InstrumentedCursor):
+        return super().cursor(factory)
+
+    def execute(self, sql, parameters=(), /):
+        with _sql_timer(sql):
+            return super().execute(sql, parameters)
+
+    def executemany(self, sql, seq_of_parameters, /):
+        with _sql_timer(sql):
+            return super().executemany(sql, seq_of_parameters)
+
+    def executescript(self, script, /):
+        with _sql_timer(script):
+            return super().executescript(script)
+
+    def commit(self):
+        with timer("sql.COMMIT"):
+            super().commit()
+
+
+def connection_factory():
+    return InstrumentedConnection if ENABLED else sqlite3.Connection
+
+
+# ============================================================
+# CAPTURE PER RENDER (cProfile / tracemalloc)
+# ============================================================
+class Capture:
+    """Hasil capture satu render; diisi saat blok render selesai."""
+
+    def __init__(self, name):
+        self.name = name
+        self.ms = None
+        self.profile = None     # teks pstats (cumulative)
+        self.memory = None      # teks top alokasi + peak
+
+
+@contextmanager
+def page_render(name, profile=False, trace_memory=False):
+    """
+    Timer render halaman ('page.<name>'), opsional dengan cProfile
+    (thread render saja) dan tracemalloc. Mengembalikan Capture.
+    """
+    capture = Capture(name)
+    profiler = cProfile.Profile() if profile else None
+    started_trace = trace_memory and not tracemalloc.is_tracing()
+    if started_trace:
+        tracemalloc.start()
+    if profiler is not None:
+        profiler.enable()
+    start = time.perf_counter()
+    try:
+        yield capture
+    finally:
+        capture.ms = (time.perf_counter() - start) * 1000
+        if ENABLED:
+            record(f"page.{name}", capture.ms)
+        if profiler is not None:
+            profiler.disable()
+            out = io.StringIO()
+            pstats.Stats(profiler, stream=out).sort_stats("cumulative").print_stats(PROFILE_TOP)
+            capture.profile = out.getvalue()
+        if started_trace:
+            top = tracemalloc.take_snapshot().statistics("lineno")[:TRACE_TOP]
+            _, peak = tracemalloc.get_traced_memory()
+            tracemalloc.stop()
+            capture.memory = "\n".join(
+                [f"peak: {peak / 2**20:.1f} MB"] + [str(stat) for stat in top]
+            )
@@ -0,0 +1,385 @@
+# ============================================================
+#  score_store.py
+#  Skor pipeline disimpan di tabel employees; hanya baris yang
+#  berubah sejak run terakhir yang dihitung ulang.
+# ============================================================
+
+import argparse
+import json
+from datetime import datetime, timedelta, timezone
+
+import pandas as pd
+
+from db import DB_NAME, open_conn, get_conn, init_db
+from data_strategist import (
+    score_employees, process_pool, InsightAggregate,
+    TIMELINESS_FRESH_DAYS, TIMELINESS_STALE_DAYS
+)
+from skills import ROLE_PROFILES, competency_gap_matrix
+from talent_readiness import DEFAULT_TRI_FORMULA, READY_THRESHOLD
+
+DEFAULT_CHUNK_ROWS = 10_000
+
+# Naikkan bila logika skoring berubah → semua baris dihitung ulang
+SCORING_VERSION = 1
+
+STATE_WATERMARK = "score_watermark"
+STATE_SIGNATURE = "score_signature"
+STATE_AS_OF = "score_as_of"
+
+# last_updated bisa bercampur format (spasi/'T', mikrodetik, offset zona
+# waktu) — dibandingkan sebagai UTC 'YYYY-MM-DD HH:MM:SS.SSS', sama
+# dengan index idx_employees_last_updated_utc (migrasi v11). Nilai tanpa
+# zona waktu dianggap UTC, seperti Timeliness di data_strategist.
+LAST_UPDATED_UTC = "strftime('%Y-%m-%d %H:%M:%f', last_updated)"
+
+# Kolom employees ← kolom hasil pipeline
+SCORE_COLUMNS = {
+    "data_quality_score": "data_quality_score_adv",
+    "anomaly_mask": "anomaly_mask",
+    "competency_gap_score": "competency_gap_score",
+    "talent_readiness_index": "talent_readiness_index",
+}
+
+
+# ============================================================
+# PIPELINE STATE
+# ============================================================
+def get_state(conn, key, default=None):
+    row = conn.execute("SELECT value FROM pipeline_state WHERE key=?", (key,)).fetchone()
+    return row[0] if row else default
+
+
+def set_state(conn, key, value):
+    conn.execute(
+        "INSERT INTO pipeline_state (key, value) VALUES (?, ?) "
+        "ON CONFLICT(key) DO UPDATE SET value=excluded.value",
+        (key, value)
+    )
+
+
+def _skill_key(skills: dict) -> dict:
+    return {cat: sorted(s.lower() for s in skills.get(cat, [])) for cat in ("technical", "soft")}
+
+
+def pipeline_signature(required_skills: dict, formula: str) -> str:
+    """Termasuk katalog ROLE_PROFILES — profile_gaps ikut dihitung ulang bila berubah."""
+    return json.dumps({
+        "version": SCORING_VERSION,
+        **_skill_key(required_skills),
+        "formula": formula,
+        "profiles": {name: _skill_key(profile) for name, profile in ROLE_PROFILES.items()},
+    }, sort_keys=True)
+
+
+def _utc_text(value):
+    """Timestamp (teks format apa pun / datetime) → teks LAST_UPDATED_UTC; None bila tak terbaca."""
+    ts = pd.to_datetime(value, errors="coerce", utc=True, format="ISO8601")
+    if pd.isna(ts):
+        return None
+    return ts.round("ms").strftime("%Y-%m-%d %H:%M:%S.%f")[:23]
+
+
+# ============================================================
+# INCREMENTAL REFRESH
+# ============================================================
+def _stale_rows_query(watermark, prev_as_of, as_of):
+    """
+    Baris yang perlu dihitung ulang:
+    - belum pernah diskor
+    - last_updated lebih baru dari watermark
+    - umur last_updated melewati batas Timeliness sejak run terakhir
+    Mengembalikan (kondisi WHERE, params).
+    """
+    where = ["scored_at IS NULL", f"{LAST_UPDATED_UTC} > ?"]
+    params = [watermark]
+
+    for days in (TIMELINESS_FRESH_DAYS, TIMELINESS_STALE_DAYS):
+        # toleransi 1 hari di kedua sisi; menghitung ulang sedikit
+        # baris ekstra tidak mengubah hasil
+        lower = prev_as_of - timedelta(days=days + 1)
+        upper = as_of - timedelta(days=days - 1)
+        where.append(f"({LAST_UPDATED_UTC} >= ? AND {LAST_UPDATED_UTC} <= ?)")
+        params += [_utc_text(lower), _utc_text(upper)]
+
+    return "(" + " OR ".join(where) + ")", params
+
+
+def _iter_chunks(conn, where="1", params=(), columns="*", chunk_rows=DEFAULT_CHUNK_ROWS):
+    """
+    Baca employees per chunk (keyset employee_id). Tiap chunk dibaca
+    utuh sebelum di-yield, jadi pemanggil boleh menulis ke tabel yang
+    sama di antara chunk.
+    """
+    last_id = ""
+    while True:
+        df = pd.read_sql_query(
+            f"SELECT {columns} FROM employees WHERE employee_id > ? AND {where} "
+            "ORDER BY employee_id LIMIT ?",
+            conn, params=(last_id, *params, chunk_rows)
+        )
+        if df.empty:
+            return
+        yield df
+        last_id = df["employee_id"].iloc[-1]
+
+
+def _score_chunk(df, required_skills, formula, as_of):
+    """
+    Skor satu chunk → (employee_id, {kolom employees: array skor},
+    gap per profil ROLE_PROFILES [baris x profil], last_updated terbaru).
+    """
+    scored = score_employees(df, required_skills, formula, as_of=as_of)
+    newest = pd.to_datetime(scored["last_updated"], errors="coerce", utc=True,
+                            format="ISO8601").max()
+    values = {col: scored[src].to_numpy() for col, src in SCORE_COLUMNS.items()}
+    gaps = competency_gap_matrix(scored, ROLE_PROFILES).to_numpy()
+    return scored["employee_id"].to_numpy(), values, gaps, _utc_text(newest)
+
+
+def _score_range(task):
+    """
+    Worker paralel: baca sendiri rentang employee_id [lo, hi) dari
+    database, skor, kembalikan hanya kolom skor (array numpy).
+    """
+    db_path, lo, hi, where, params, required_skills, formula, as_of = task
+    bound = "employee_id >= ?" + (" AND employee_id < ?" if hi is not None else "")
+    conn = open_conn(db_path)
+    try:
+        df = pd.read_sql_query(
+            f"SELECT * FROM employees WHERE {bound} AND {where}",
+            conn, params=(lo, *([hi] if hi is not None else []), *params)
+        )
+    finally:
+        conn.close()
+    if df.empty:
+        return None
+    return _score_chunk(df, required_skills, formula, as_of)
+
+
+def _range_bounds(conn, chunk_rows):
+    """employee_id awal tiap rentang berisi chunk_rows pegawai (scan index PK)."""
+    rows = conn.execute(
+        "SELECT employee_id FROM (SELECT employee_id, "
+        "ROW_NUMBER() OVER (ORDER BY employee_id) - 1 AS rn FROM employees) "
+        "WHERE rn % ? = 0 ORDER BY employee_id",
+        (chunk_rows,)
+    ).fetchall()
+    starts = [r[0] for r in rows]
+    return list(zip(starts, starts[1:] + [None]))
+
+
+def _scored_chunks(conn, where, params, required_skills, formula, as_of,
+                   chunk_rows, workers):
+    if workers <= 1:
+        for df in _iter_chunks(conn, where, params, chunk_rows=chunk_rows):
+            yield _score_chunk(df, required_skills, formula, as_of)
+        return
+
+    db_path = conn.execute("PRAGMA database_list").fetchone()[2]
+    tasks = [
+        (db_path, lo, hi, where, params, required_skills, formula, as_of)
+        for lo, hi in _range_bounds(conn, chunk_rows)
+    ]
+    with process_pool(workers) as pool:
+        for result in pool.map(_score_range, tasks):
+            if result is not None:
+                yield result
+
+
+def refresh_scores(conn, required_skills: dict,
+                   formula: str = DEFAULT_TRI_FORMULA,
+                   chunk_rows: int = DEFAULT_CHUNK_ROWS,
+                   workers: int = 1) -> int:
+    """
+    Hitung ulang skor hanya untuk baris yang berubah, simpan ke
+    tabel employees, lalu majukan watermark. Bila profil skill atau
+    formula berbeda dari run sebelumnya, semua baris diskor ulang.
+    Baris dibaca dan diskor per chunk — memori sebanding satu chunk.
+    workers > 1 → chunk (rentang employee_id) diskor di process pool;
+    tiap worker membaca rentangnya sendiri, penulisan tetap di sini.
+    Mengembalikan jumlah baris yang diskor.
+
+    Menulis ke database — panggil dari jalur tulis (form, import,
+    generate dummy) atau refresh_if_due di awal run, bukan di tengah
+    render halaman (versi database berubah → cache halaman gugur).
+    """
+    as_of = datetime.now(timezone.utc).replace(tzinfo=None)
+    signature = pipeline_signature(required_skills, formula)
+
+    # watermark lama bisa berformat teks mentah last_updated
+    watermark = _utc_text(get_state(conn, STATE_WATERMARK) or None)
+    prev_as_of = get_state(conn, STATE_AS_OF)
+
+    full = (get_state(conn, STATE_SIGNATURE) != signature
+            or watermark is None or prev_as_of is None)
+    if full:
+        where, params = "1", []
+    else:
+        where, params = _stale_rows_query(watermark, datetime.fromisoformat(prev_as_of), as_of)
+
+    assignments = ", ".join(f"{col}=?" for col in SCORE_COLUMNS)
+    scored_at = datetime.now().isoformat()
+    profiles = list(ROLE_PROFILES)
+    total = 0
+
+    if full:
+        conn.execute("DELETE FROM profile_gaps")
+
+    for ids, values, gaps, newest in _scored_chunks(conn, where, params, required_skills,
+                                                    formula, as_of, chunk_rows, workers):
+        columns = [values[col].tolist() for col in SCORE_COLUMNS]
+        rows = zip(*columns, [scored_at] * len(ids), ids.tolist())
+        conn.executemany(
+            f"UPDATE employees SET {assignments}, scored_at=? WHERE employee_id=?",
+            rows
+        )
+        conn.executemany(
+            "INSERT INTO profile_gaps (employee_id, profile, gap) VALUES (?, ?, ?) "
+            "ON CONFLICT(employee_id, profile) DO UPDATE SET gap=excluded.gap",
+            ((eid, profile, gap) for eid, row in zip(ids.tolist(), gaps.tolist())
+             for profile, gap in zip(profiles, row))
+        )
+        total += len(ids)
+
+        if newest is not None and (watermark is None or newest > watermark):
+            watermark = newest
+
+    # Tidak ada yang berubah → tanpa tulis (versi database tetap,
+    # sehingga cache halaman tetap valid)
+    if total == 0 and not full:
+        return 0
+
+    set_state(conn, STATE_WATERMARK, watermark or "")
+    set_state(conn, STATE_SIGNATURE, signature)
+    set_state(conn, STATE_AS_OF, as_of.isoformat())
+    conn.commit()
+
+    return total
+
+
+def refresh_if_due(conn, required_skills: dict,
+                   formula: str = DEFAULT_TRI_FORMULA) -> int:
+    """
+    Untuk awal run aplikasi, sebelum halaman dirender: refresh_scores
+    hanya bila profil/formula berubah, ada baris belum diskor atau
+    berubah sesudah watermark, atau run terakhir bukan hari ini (batas
+    Timeliness bergeser). Selain itu cukup beberapa lookup index,
+    tanpa tulis.
+    """
+    watermark = _utc_text(get_state(conn, STATE_WATERMARK) or None)
+    prev_as_of = get_state(conn, STATE_AS_OF)
+    today = datetime.now(timezone.utc).date().isoformat()
+
+    due = (
+        get_state(conn, STATE_SIGNATURE) != pipeline_signature(required_skills, formula)
+        or prev_as_of is None or prev_as_of[:10] != today
+        or conn.execute(
+            "SELECT EXISTS (SELECT 1 FROM employees WHERE scored_at IS NULL) "
+            f"OR EXISTS (SELECT 1 FROM employees WHERE {LAST_UPDATED_UTC} > ?)",
+            (watermark,)
+        ).fetchone()[0]
+    )
+    return refresh_scores(conn, required_skills, formula) if due else 0
+
+
+# ============================================================
+# AGREGAT DASHBOARD (SQL atas skor tersimpan)
+# ============================================================
+def _numeric_sql(column):
+    """Seperti _numeric di data_strategist: nilai non-angka dianggap NULL."""
+    return f"CASE WHEN typeof({column}) IN ('integer', 'real') THEN {column} END"
+
+
+def _fill_sketch(conn, sketch, column):
+    """Isi bin QuantileSketch dengan GROUP BY di SQL (rumus bin sama dengan update())."""
+    value = _numeric_sql(column)
+    for idx, n in conn.execute(
+        f"SELECT MIN(MAX(CAST(({value} - ?) / ? * ? AS INTEGER), 0), ?), COUNT(*) "
+        f"FROM employees WHERE {value} IS NOT NULL GROUP BY 1",
+        (sketch.lo, sketch.hi - sketch.lo, sketch.bins, sketch.bins - 1)
+    ):
+        sketch.counts[idx] += n
+
+
+def stored_aggregate(conn, profiles: dict = ROLE_PROFILES) -> InsightAggregate:
+    """
+    InsightAggregate dari kolom skor tersimpan dan profile_gaps, dihitung
+    di SQL — setelah satu baris berubah dashboard tidak perlu memuat dan
+    menghitung gap seluruh pegawai. Hasil sama dengan InsightAggregate
+    atas iter_scored_chunks selama skor mutakhir (refresh_scores).
+    """
+    aggregate = InsightAggregate(profiles)
+    bits = list(aggregate.anomaly_bits)
+    perf = _numeric_sql("avg_perf_3yr")
+    dq = _numeric_sql("data_quality_score")
+    row = conn.execute(
+        f"SELECT COUNT(*), TOTAL({perf}), COUNT({perf}), TOTAL({dq}), COUNT({dq}), "
+        "TOTAL(competency_gap_score >= ?), TOTAL(talent_readiness_index >= ?), "
+        "TOTAL(anomaly_mask != 0)"
+        + "".join(", TOTAL(anomaly_mask & ? != 0)" for _ in bits)
+        + " FROM employees",
+        (InsightAggregate.HIGH_GAP, READY_THRESHOLD, *bits)
+    ).fetchone()
+
+    aggregate.rows = row[0]
+    aggregate.perf_sum, aggregate.perf_count = row[1], row[2]
+    aggregate.dq_sum, aggregate.dq_count = row[3], row[4]
+    aggregate.high_gap, aggregate.ready, aggregate.anomalies = map(int, row[5:8])
+    aggregate.anomaly_bits = dict(zip(bits, map(int, row[8:])))
+
+    _fill_sketch(conn, aggregate.tri, "talent_readiness_index")
+    _fill_sketch(conn, aggregate.dq, "data_quality_score")
+
+    if profiles:
+        stored = {
+            profile: (gap_sum, no_gap) for profile, gap_sum, no_gap in conn.execute(
+                "SELECT profile, TOTAL(gap), TOTAL(gap = 0) FROM profile_gaps GROUP BY profile"
+            )
+        }
+        for i, profile in enumerate(profiles):
+            gap_sum, no_gap = stored.get(profile, (0.0, 0))
+            aggregate.profile_gap_sum[i] = gap_sum
+            aggregate.profile_no_gap[i] = int(no_gap)
+    return aggregate
+
+
+def _scored_frame(df: pd.DataFrame) -> pd.DataFrame:
+    df = df.rename(columns={"data_quality_score": "data_quality_score_adv"})
+    df["anomaly_mask"] = df["anomaly_mask"].fillna(0).astype("int64")
+    return df
+
+
+def load_scored_employees(conn) -> pd.DataFrame:
+    """
+    Tabel employees beserta skor tersimpan, dengan nama kolom
+    yang sama seperti output run_data_strategist_pipeline.
+    """
+    return _scored_frame(pd.read_sql_query("SELECT * FROM employees", conn))
+
+
+def iter_scored_chunks(conn, columns="*", chunk_rows=DEFAULT_CHUNK_ROWS):
+    """load_scored_employees per chunk, untuk agregasi out-of-core."""
+    for df in _iter_chunks(conn, columns=columns, chunk_rows=chunk_rows):
+        yield _scored_frame(df)
+
+
+if __name__ == "__main__":
+    from skills import ROLE_PROFILES, DEFAULT_PROFILE
+
+    parser = argparse.ArgumentParser(description="Skor ulang pegawai (mis. job malam).")
+    parser.add_argument("--profile", default=DEFAULT_PROFILE, choices=list(ROLE_PROFILES))
+    parser.add_argument("--workers", type=int, default=1)
+    parser.add_argument("--chunk-rows", type=int, default=DEFAULT_CHUNK_ROWS)
+    parser.add_argument("--full", action="store_true", help="abaikan watermark, skor semua baris")
+    parser.add_argument("--db", default=DB_NAME)
+    args = parser.parse_args()
+
+    init_db(args.db)
+    conn = get_conn(args.db)
+    if args.full:
+        conn.execute("DELETE FROM pipeline_state WHERE key=?", (STATE_SIGNATURE,))
+    start = datetime.now()
+    rows = refresh_scores(conn, ROLE_PROFILES[args.profile], chunk_rows=args.chunk_rows,
+                          workers=args.workers)
+    print({"rows": rows, "seconds": round((datetime.now() - start).total_seconds(), 1)})
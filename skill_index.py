@@ -0,0 +1,195 @@
+# ============================================================
+#  skill_index.py
+#  Inverted index skill/sertifikasi → daftar employee_id
+#  (tabel skill_postings). Pencarian AND / OR / NOT dijawab dengan
+#  irisan posting list, tanpa memecah teks skill seluruh pegawai.
+# ============================================================
+
+import numpy as np
+import pandas as pd
+
+from skills import SKILL_COLUMNS, factorize_skills, normalize_skill
+
+# kategori token → kolom teks di employees
+INDEX_COLUMNS = {**SKILL_COLUMNS, "cert": "certifications"}
+
+REBUILD_CHUNK = 200_000
+
+
+# ============================================================
+# TOKEN
+# ============================================================
+def posting_rows(df: pd.DataFrame) -> list:
+    """
+    (token, employee_id) untuk semua baris df. Token = "kategori:skill",
+    mis. "technical:sap", "cert:iso27001". Teks unik ditokenisasi sekali;
+    pemilik tiap teks dikelompokkan sekali lewat argsort kode (bukan
+    scan seluruh baris per teks unik).
+    """
+    ids = df["employee_id"].to_numpy(dtype=object)
+    rows = []
+    for category, col in INDEX_COLUMNS.items():
+        if col not in df.columns:
+            continue
+        codes, unique_skills = factorize_skills(df[col])
+        tokens = [[f"{category}:{s}" for s in skills] for skills in unique_skills]
+        rows_with_skill = np.flatnonzero(codes >= 0)
+        order = rows_with_skill[np.argsort(codes[rows_with_skill], kind="stable")]
+        sorted_codes = codes[order]
+        starts = np.flatnonzero(np.r_[True, sorted_codes[1:] != sorted_codes[:-1]])
+        for code, owners in zip(sorted_codes[starts], np.split(ids[order], starts[1:])):
+            rows.extend((token, eid) for token in tokens[code] for eid in owners)
+    return rows
+
+
+def _term_tokens(term: str) -> list:
+    """
+    "technical:SAP" → ["technical:sap"]; tanpa kategori ("SAP") →
+    token di semua kategori (skill teknis, soft, sertifikasi).
+    """
+    category, sep, skill = str(term).partition(":")
+    if sep and category in INDEX_COLUMNS:
+        return [f"{category}:{normalize_skill(skill)}"]
+    return [f"{cat}:{normalize_skill(term)}" for cat in INDEX_COLUMNS]
+
+
+# ============================================================
+# PEMELIHARAAN INDEX
+# ============================================================
+def index_employees(conn, df: pd.DataFrame):
+    """
+    Tulis ulang posting untuk pegawai di df (insert / update).
+    Tidak commit — ikut transaksi pemanggil.
+    """
+    if df.empty:
+        return
+    conn.executemany(
+        "DELETE FROM skill_postings WHERE employee_id=?",
+        ((eid,) for eid in df["employee_id"].tolist())
+    )
+    rows = posting_rows(df)
+    rows.sort()
+    conn.executemany(
+        "INSERT OR IGNORE INTO skill_postings (skill, employee_id) VALUES (?, ?)", rows
+    )
+
+
+def rebuild_skill_index(conn, chunk_rows=REBUILD_CHUNK) -> int:
+    """Bangun ulang seluruh index dari tabel employees (bertahap per chunk)."""
+    cols = ", ".join(["employee_id"] + list(INDEX_COLUMNS.values()))
+    conn.execute("DELETE FROM skill_postings")
+
+    total = 0
+    last_id = ""
+    while True:
+        df = pd.read_sql_query(
+            f"SELECT {cols} FROM employees WHERE employee_id > ? "
+            "ORDER BY employee_id LIMIT ?",
+            conn, params=(last_id, chunk_rows)
+        )
+        if df.empty:
+            break
+        rows = posting_rows(df)
+        rows.sort()
+        conn.executemany(
+            "INSERT OR IGNORE INTO skill_postings (skill, employee_id) VALUES (?, ?)", rows
+        )
+        total += len(rows)
+        last_id = df["employee_id"].iloc[-1]
+
+    return total
+
+
+# ============================================================
+# QUERY
+# ============================================================
+def skill_vocabulary(conn) -> list:
+    """Semua token yang ada di index (DISTINCT dari primary key)."""
+    return [r[0] for r in conn.execute("SELECT DISTINCT skill FROM skill_postings ORDER BY skill")]
+
+
+def _exists(tokens, alias="m"):
+    marks = ", ".join("?" for _ in tokens)
+    return (f"EXISTS (SELECT 1 FROM skill_postings WHERE skill IN ({marks}) "
+            f"AND employee_id = {alias}.employee_id)")
+
+
+def _posting_size(conn, tokens) -> int:
+    marks = ", ".join("?" for _ in tokens)
+    return conn.execute(
+        f"SELECT COUNT(*) FROM skill_postings WHERE skill IN ({marks})", tokens
+    ).fetchone()[0]
+
+
+def _match_query(conn, all_of, any_of, none_of):
+    """
+    SQL daftar employee_id yang cocok. Posting list AND terkecil menjadi
+    driver; term lain diuji dengan lookup primary key (skill, employee_id)
+    per kandidat — biaya sebanding ukuran posting terkecil.
+    """
+    all_terms = [_term_tokens(t) for t in all_of]
+    any_tokens = [tok for t in any_of for tok in _term_tokens(t)]
+    none_terms = [_term_tokens(t) for t in none_of]
+
+    conditions, params = [], []
+    if all_terms:
+        sizes = [_posting_size(conn, tokens) for tokens in all_terms]
+        if min(sizes) == 0:
+            return None, None
+        order = np.argsort(sizes, kind="stable")
+        driver = all_terms[order[0]]
+        rest = [all_terms[i] for i in order[1:]]
+        marks = ", ".join("?" for _ in driver)
+        base = f"SELECT DISTINCT employee_id FROM skill_postings WHERE skill IN ({marks})"
+        base_params = list(driver)
+        for tokens in rest:
+            conditions.append(_exists(tokens))
+            params += tokens
+        if any_tokens:
+            conditions.append(_exists(any_tokens))
+            params += any_tokens
+    elif any_tokens:
+        marks = ", ".join("?" for _ in any_tokens)
+        base = f"SELECT DISTINCT employee_id FROM skill_postings WHERE skill IN ({marks})"
+        base_params = list(any_tokens)
+    else:
+        # hanya NOT → komplemen terhadap seluruh pegawai
+        base = "SELECT employee_id FROM employees"
+        base_params = []
+
+    for tokens in none_terms:
+        conditions.append("NOT " + _exists(tokens))
+        params += tokens
+
+    sql = f"SELECT m.employee_id FROM ({base}) m"
+    if conditions:
+        sql += " WHERE " + " AND ".join(conditions)
+    return sql, base_params + params
+
+
+def search_skills(conn, all_of=(), any_of=(), none_of=(), limit=500):
+    """
+    Pegawai yang punya SEMUA skill all_of, MINIMAL SATU any_of dan
+    TIDAK punya none_of. Term boleh berkategori ("cert:ISO27001") atau
+    tidak ("SAP" = di kategori mana pun).
+    Mengembalikan (DataFrame pegawai, maksimal limit baris; total cocok).
+    """
+    if not (all_of or any_of or none_of):
+        return pd.DataFrame(), 0
+
+    sql, params = _match_query(conn, list(all_of), list(any_of), list(none_of))
+    if sql is None:
+        return pd.DataFrame(), 0
+
+    total = conn.execute(f"SELECT COUNT(*) FROM ({sql})", params).fetchone()[0]
+    if total == 0:
+        return pd.DataFrame(), 0
+
+    df = pd.read_sql_query(
+        "SELECT employee_id, full_name, department, bureau, job_title, "
+        "technical_skills, soft_skills, certifications "
+        f"FROM employees WHERE employee_id IN ({sql} ORDER BY m.employee_id LIMIT ?) "
+        "ORDER BY employee_id",
+        conn, params=[*params, limit]
+    )
+    return df, total
@@ -0,0 +1,196 @@
+# ============================================================
+#  skills.py
+#  Kosakata skill + encoding bitset untuk analisis gap kompetensi
+# ============================================================
+
+import numpy as np
+import pandas as pd
+
+# Kategori skill → kolom sumber di tabel employees
+SKILL_COLUMNS = {
+    "technical": "technical_skills",
+    "soft": "soft_skills",
+}
+
+# ============================================================
+# KATALOG PROFIL JABATAN
+# ============================================================
+ROLE_PROFILES = {
+    "bureau_head": {
+        "label": "Bureau Head",
+        "technical": ["HCIS", "SQL", "SAP"],
+        "soft": ["analytical", "communication", "coordination"],
+    },
+    "ict_lead": {
+        "label": "ICT Lead",
+        "technical": ["SQL", "Python", "Data Analysis", "SAP"],
+        "soft": ["leadership", "problem solving", "communication"],
+    },
+    "finance_controller": {
+        "label": "Finance Controller",
+        "technical": ["Finance Control", "SAP", "Data Analysis"],
+        "soft": ["analytical", "coordination", "communication"],
+    },
+    "hc_business_partner": {
+        "label": "HC Business Partner",
+        "technical": ["HCIS", "Data Analysis"],
+        "soft": ["communication", "coordination", "leadership"],
+    },
+    "mining_ops_head": {
+        "label": "Mining Operations Head",
+        "technical": ["Mining Ops", "Geology"],
+        "soft": ["leadership", "teamwork", "problem solving"],
+    },
+    "risk_manager": {
+        "label": "Risk Manager",
+        "technical": ["Data Analysis", "SQL"],
+        "soft": ["analytical", "problem solving"],
+    },
+}
+
+DEFAULT_PROFILE = "bureau_head"
+
+
+# ============================================================
+# NORMALISASI
+# ============================================================
+def normalize_skill(skill) -> str:
+    return " ".join(str(skill).split()).lower()
+
+
+def split_skills(text) -> list:
+    """Teks skill dipisah koma → daftar skill ternormalisasi (tanpa duplikat)."""
+    if text is None or (isinstance(text, float) and np.isnan(text)):
+        return []
+    skills = []
+    for part in str(text).split(","):
+        skill = normalize_skill(part)
+        if skill and skill not in skills:
+            skills.append(skill)
+    return skills
+
+
+def factorize_skills(series: pd.Series):
+    """
+    Tokenisasi hanya dilakukan per nilai teks unik (kombinasi skill
+    jauh lebih sedikit daripada jumlah pegawai).
+    Hasil: (codes per baris, daftar skill per nilai unik); code -1 = kosong.
+    """
+    codes, uniques = pd.factorize(series, use_na_sentinel=True)
+    return codes, [split_skills(u) for u in uniques]
+
+
+# ============================================================
+# KOSAKATA + BITSET
+# ============================================================
+def _popcount(words: np.ndarray) -> np.ndarray:
+    if hasattr(np, "bitwise_count"):
+        return np.bitwise_count(words)
+    table = np.array([bin(i).count("1") for i in range(256)], dtype=np.uint8)
+    as_bytes = words.view(np.uint8).reshape(words.shape + (8,))
+    return table[as_bytes].sum(axis=-1)
+
+
+class SkillVocabulary:
+    """
+    Pemetaan "kategori:skill" → nomor bit. Skill tiap pegawai di-encode
+    sekali menjadi bitset (uint64, n_pegawai x n_word) sehingga gap untuk
+    banyak profil cukup dihitung dengan popcount(required AND NOT punya).
+    """
+
+    def __init__(self, tokens=()):
+        self.index = {}
+        for token in tokens:
+            self.add(token)
+
+    def add(self, token: str) -> int:
+        if token not in self.index:
+            self.index[token] = len(self.index)
+        return self.index[token]
+
+    @property
+    def n_words(self) -> int:
+        return max(1, (len(self.index) + 63) // 64)
+
+    @classmethod
+    def from_frame(cls, df: pd.DataFrame, profiles: dict = None):
+        vocab = cls()
+        for category, col in SKILL_COLUMNS.items():
+            if col in df.columns:
+                _, unique_skills = factorize_skills(df[col])
+                for skills in unique_skills:
+                    for skill in skills:
+                        vocab.add(f"{category}:{skill}")
+        for profile in (profiles or {}).values():
+            vocab.add_profile(profile)
+        return vocab
+
+    def add_profile(self, profile: dict):
+        for category in SKILL_COLUMNS:
+            for skill in profile.get(category, []):
+                self.add(f"{category}:{normalize_skill(skill)}")
+
+    def encode(self, df: pd.DataFrame) -> np.ndarray:
+        """Bitset skill per pegawai, shape (len(df), n_words)."""
+        bits = np.zeros((len(df), self.n_words), dtype=np.uint64)
+
+        for category, col in SKILL_COLUMNS.items():
+            if col not in df.columns:
+                continue
+            codes, unique_skills = factorize_skills(df[col])
+            unique_bits = np.zeros((len(unique_skills) + 1, self.n_words), dtype=np.uint64)
+            for i, skills in enumerate(unique_skills):
+                for skill in skills:
+                    code = self.index.get(f"{category}:{skill}")
+                    if code is not None:
+                        unique_bits[i, code // 64] |= np.uint64(1) << np.uint64(code % 64)
+            # baris terakhir (nol) untuk nilai kosong (code -1)
+            bits |= unique_bits[codes]
+
+        return bits
+
+    def profile_bits(self, profile: dict) -> np.ndarray:
+        """Bitset skill yang dibutuhkan satu profil, shape (n_words,)."""
+        self.add_profile(profile)
+        bits = np.zeros(self.n_words, dtype=np.uint64)
+        for category in SKILL_COLUMNS:
+            for skill in profile.get(category, []):
+                code = self.index[f"{category}:{normalize_skill(skill)}"]
+                bits[code // 64] |= np.uint64(1) << np.uint64(code % 64)
+        return bits
+
+
+def competency_gap_matrix(df: pd.DataFrame, profiles: dict = None,
+                          vocab: SkillVocabulary = None,
+                          skill_bits: np.ndarray = None,
+                          chunk_rows: int = 200_000) -> pd.DataFrame:
+    """
+    Gap kompetensi seluruh pegawai x seluruh profil sekaligus.
+    Hasil: DataFrame (index = df.index, kolom = nama profil) berisi
+    jumlah skill wajib yang belum dimiliki.
+    """
+    profiles = ROLE_PROFILES if profiles is None else profiles
+    if vocab is None:
+        vocab = SkillVocabulary.from_frame(df, profiles)
+    if skill_bits is None:
+        skill_bits = vocab.encode(df)
+
+    # Skill profil yang belum ada di kosakata → bit baru yang tidak
+    # dimiliki pegawai mana pun (bitset pegawai cukup di-pad nol)
+    for profile in profiles.values():
+        vocab.add_profile(profile)
+    if skill_bits.shape[1] < vocab.n_words:
+        pad = vocab.n_words - skill_bits.shape[1]
+        skill_bits = np.pad(skill_bits, ((0, 0), (0, pad)))
+
+    required = np.zeros((len(profiles), vocab.n_words), dtype=np.uint64)
+    for i, profile in enumerate(profiles.values()):
+        required[i] = vocab.profile_bits(profile)
+
+    gaps = np.empty((len(df), len(profiles)), dtype=np.int64)
+    for start in range(0, len(df), chunk_rows):
+        emp = skill_bits[start:start + chunk_rows]
+        missing = required[None, :, :] & ~emp[:, None, :]
+        gaps[start:start + chunk_rows] = _popcount(missing).sum(axis=-1)
+
+    return pd.DataFrame(gaps, index=df.index, columns=list(profiles))
@@ -0,0 +1,90 @@
+# ============================================================
+#  talent_readiness.py
+#  Talent Readiness Index (TRI) — satu mesin untuk semua halaman
+# ============================================================
+
+import numpy as np
+import pandas as pd
+
+# Batas "siap" yang dipakai dashboard kualitas & screening
+READY_THRESHOLD = 75
+
+
+# ============================================================
+# KOERSI NUMERIK MASSAL (pengganti safe_int / safe_float per sel)
+# ============================================================
+def coerce_numeric(df: pd.DataFrame, columns) -> dict:
+    """
+    Kolom → array float64 dengan None / "" / teks tidak valid = 0.
+    Kolom yang tidak ada dianggap 0 semua.
+    """
+    out = {}
+    for col in columns:
+        if col in df.columns:
+            values = pd.to_numeric(df[col], errors="coerce").to_numpy(dtype=float)
+            out[col] = np.nan_to_num(values, nan=0.0)
+        else:
+            out[col] = np.zeros(len(df))
+    return out
+
+
+# ============================================================
+# FORMULA TRI (bernama + berversi)
+# ============================================================
+def _tri_strategist_v1(v: dict) -> np.ndarray:
+    """
+    - Performance (40%)
+    - Tenure di bureau (20%)
+    - Competency gap (20%)
+    - Tanpa isu disiplin (20%)
+    """
+    score = (v["avg_perf_3yr"] / 5) * 40
+    score += np.minimum(v["years_in_bureau"] / 5, 1) * 20
+    score += (1 - np.minimum(v["competency_gap_score"] / 5, 1)) * 20
+    score += np.where(v["has_discipline_issue"] != 0, 0, 20)
+    return np.round(score, 1)
+
+
+def _tri_screening_v1(v: dict) -> np.ndarray:
+    """
+    Formula lama halaman screening:
+    tahun di department x 2 + kinerja x 10, -15 bila ada isu disiplin,
+    dibatasi 0–100.
+    """
+    years = np.trunc(v["years_in_department"])
+    discipline = np.trunc(v["has_discipline_issue"]) != 0
+    score = years * 2 + v["avg_perf_3yr"] * 10 - np.where(discipline, 15, 0)
+    return np.clip(score, 0, 100)
+
+
+TRI_FORMULAS = {
+    "strategist_v1": {
+        "inputs": ["avg_perf_3yr", "years_in_bureau",
+                   "competency_gap_score", "has_discipline_issue"],
+        "compute": _tri_strategist_v1,
+    },
+    "screening_v1": {
+        "inputs": ["years_in_department", "avg_perf_3yr", "has_discipline_issue"],
+        "compute": _tri_screening_v1,
+    },
+}
+
+DEFAULT_TRI_FORMULA = "strategist_v1"
+
+
+def compute_tri(df: pd.DataFrame, formula: str = DEFAULT_TRI_FORMULA) -> pd.Series:
+    """
+    Hitung TRI untuk seluruh baris sekaligus (vektor).
+    Semua kolom input formula harus ada; 'competency_gap_score'
+    dihitung lebih dulu lewat compute_competency_gap.
+    """
+    if formula not in TRI_FORMULAS:
+        raise ValueError(f"Formula TRI tidak dikenal: {formula}")
+
+    spec = TRI_FORMULAS[formula]
+    missing = [c for c in spec["inputs"] if c not in df.columns]
+    if missing:
+        raise KeyError(f"Kolom untuk TRI '{formula}' belum ada: {missing}")
+
+    values = coerce_numeric(df, spec["inputs"])
+    return pd.Series(spec["compute"](values), index=df.index, name="talent_readiness_index")
@@ -1,24 +1,10 @@
 import streamlit as st
 import streamlit.components.v1 as components
-import pandas as pd
-import json
-import ast
 from db import get_conn
-
-
-# ======================================================
-# SAFE JSON CONVERTER
-# ======================================================
-def safe_json(raw):
-    if raw in (None, "", "null"):
-        return {}
-    try:
-        return json.loads(raw)
-    except:
-        try:
-            return ast.literal_eval(raw)
-        except:
-            return {}
+from audit_engine import (
+    query_audit, audit_usernames, row_changes, split_changes, employee_images
+)
+from ui_search import employee_search_box
 
 
 # ======================================================
@@ -127,23 +113,77 @@ def render_insert(after, username, role, action_time):
 # ======================================================
 # RENDER AUDIT TRAIL (GRID CARD)
 # ======================================================
+def _audit_filters():
+    """Widget filter; mengembalikan dict argumen untuk query_audit."""
+    conn = get_conn()
+
+    c1, c2, c3, c4 = st.columns(4)
+    with c1:
+        dates = st.date_input("Rentang tanggal", value=(), key="audit_dates")
+    with c2:
+        username = st.selectbox("Username", ["Semua"] + audit_usernames(conn), key="audit_user")
+    with c3:
+        employee_id = st.text_input("Employee ID", key="audit_emp").strip()
+    with c4:
+        action_type = st.selectbox("Aksi", ["Semua", "INSERT", "UPDATE", "DELETE"], key="audit_action")
+
+    date_from = dates[0] if len(dates) > 0 else None
+    date_to = dates[1] if len(dates) > 1 else date_from
+
+    return {
+        "date_from": date_from,
+        "date_to": date_to,
+        "username": None if username == "Semua" else username,
+        "employee_id": employee_id or None,
+        "action_type": None if action_type == "Semua" else action_type,
+    }
+
+
 def render_audit():
 
     st.subheader("🕒 Audit Trail")
 
-    conn = get_conn()
-    df = pd.read_sql_query("SELECT * FROM audit_log ORDER BY action_time DESC", conn)
-    conn.close()
+    def filter_employee(employee_id):
+        st.session_state.audit_emp = employee_id
+
+    employee_search_box("audit", on_pick=filter_employee)
+
+    filters = _audit_filters()
+    page_size = st.selectbox("Log per halaman", [20, 50, 100], index=1, key="audit_page_size")
+
+    # Keyset pagination: tumpukan cursor halaman yang sudah dilewati.
+    # Filter berubah → kembali ke halaman pertama.
+    state_key = (tuple(sorted((k, str(v)) for k, v in filters.items())), page_size)
+    if st.session_state.get("audit_state_key") != state_key:
+        st.session_state.audit_state_key = state_key
+        st.session_state.audit_cursors = [None]
+
+    cursors = st.session_state.audit_cursors
+    df, next_cursor = query_audit(
+        get_conn(), cursor=cursors[-1], limit=page_size, **filters
+    )
 
     if df.empty:
         st.info("Belum ada log.")
         return
 
+    nav_prev, nav_info, nav_next = st.columns([1, 2, 1])
+    with nav_prev:
+        if len(cursors) > 1 and st.button("⬅ Sebelumnya", key="audit_prev"):
+            cursors.pop()
+            st.rerun()
+    with nav_info:
+        st.caption(f"Halaman {len(cursors)} — {len(df)} log")
+    with nav_next:
+        if next_cursor is not None and st.button("Berikutnya ➡", key="audit_next"):
+            cursors.append(next_cursor)
+            st.rerun()
+
     df["date"] = df["action_time"].str[:10]
 
     NUM_COLS = 4  # jumlah card per baris
 
-    for date, group in df.groupby("date"):
+    for date, group in df.groupby("date", sort=False):
         st.markdown(f"## 📅 {date}")
 
         rows = group.to_dict("records")
@@ -188,8 +228,8 @@ def render_audit():
                     # DETAIL EXPANDER
                     with st.expander("Detail"):
 
-                        before = safe_json(row["before_data"])
-                        after = safe_json(row["after_data"])
+                        # payload hanya berisi field yang berubah
+                        before, after = split_changes(row_changes(row))
 
                         if row["action_type"] == "INSERT":
                             render_insert(
@@ -207,4 +247,11 @@ def render_audit():
                                 row["action_time"]
                             )
 
+                        # data lengkap direkonstruksi dari riwayat bila diminta
+                        if st.checkbox("Data lengkap", key=f"audit_full_{row['id']}"):
+                            full_before, full_after = employee_images(
+                                get_conn(), row["employee_id"], int(row["id"])
+                            )
+                            st.json({"before": full_before, "after": full_after})
+
                     st.markdown("</div>", unsafe_allow_html=True)
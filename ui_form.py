@@ -1,7 +1,13 @@
+import pandas as pd
 import streamlit as st
 from datetime import datetime
 from db import get_conn
 from audit_engine import AuditTrail
+from cache import invalidate as invalidate_cache
+from skill_index import index_employees
+from score_store import refresh_scores
+from skills import ROLE_PROFILES, DEFAULT_PROFILE
+from ui_search import employee_search_box, employee_lookup_box, load_employee
 
 audit_engine = AuditTrail()
 
@@ -36,22 +42,24 @@ def render_form(role, username):
     cur = conn.cursor()
 
     # ==========================
-    # LOAD EMPLOYEE IDs
+    # PILIH PEGAWAI (TYPEAHEAD)
     # ==========================
-    cur.execute("SELECT employee_id FROM employees")
-    emp_ids = [r[0] for r in cur.fetchall()]
-
-    mode = st.selectbox("Mode", ["Tambah Baru"] + emp_ids)
-    editing = mode != "Tambah Baru"
+    mode = st.radio("Mode", ["Tambah Baru", "Edit Pegawai"], horizontal=True, key="form_mode")
+    editing = mode == "Edit Pegawai"
 
     # ==========================
     # LOAD OLD DATA IF EDITING
     # ==========================
     if editing:
-        cur.execute("SELECT * FROM employees WHERE employee_id=?", (mode,))
-        col = [d[0] for d in cur.description]
-        row_db = cur.fetchone()
-        old = dict(zip(col, row_db))
+        def edit_employee(employee_id):
+            st.session_state.form_lookup = employee_id
+
+        employee_search_box("form", on_pick=edit_employee)
+        selected = employee_lookup_box("form")
+        old = load_employee(selected) if selected else None
+        if old is None:
+            st.info("Ketik awalan Employee ID atau nama pegawai yang akan di-edit.")
+            return
     else:
         old = {}
 
@@ -149,7 +157,10 @@ def render_form(role, username):
                 new_data["last_updated"], employee_id
             ))
 
+            index_employees(conn, pd.DataFrame([new_data]))
             conn.commit()
+            refresh_scores(conn, ROLE_PROFILES[DEFAULT_PROFILE])
+            invalidate_cache()
 
             audit_engine.log_update(username, role, employee_id, old, new_data)
             st.success("Data berhasil di-update!")
@@ -173,9 +184,11 @@ def render_form(role, username):
                 new_data["last_updated"]
             ))
 
+            index_employees(conn, pd.DataFrame([new_data]))
             conn.commit()
+            refresh_scores(conn, ROLE_PROFILES[DEFAULT_PROFILE])
+            invalidate_cache()
 
             audit_engine.log_insert(username, role, employee_id, new_data)
             st.success("Pegawai baru berhasil ditambahkan!")
 
-    conn.close()
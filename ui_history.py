@@ -0,0 +1,61 @@
+import streamlit as st
+from datetime import datetime, time
+
+from db import get_conn
+from history import build_snapshots, employees_as_of
+from cache import cached
+
+MAX_ROWS = 1000     # baris yang dirender di tabel
+
+
+# ======================================================
+# RENDER RIWAYAT DATA (AS-OF)
+# ======================================================
+def render_history():
+
+    st.subheader("🕰️ Data Pegawai per Tanggal")
+    st.caption(
+        "Direkonstruksi dari audit trail. Pegawai tanpa riwayat audit sampai tanggal "
+        "tersebut diambil dari data saat ini (perubahan di luar audit tidak terlihat)."
+    )
+
+    conn = get_conn()
+
+    # snapshot akhir bulan yang belum ada; hanya dicek ulang bila isi
+    # database berubah (cached per versi database)
+    with st.spinner("Menyiapkan snapshot..."):
+        cached("snapshots", None, lambda: build_snapshots(conn))
+
+    c1, c2, c3 = st.columns(3)
+    with c1:
+        day = st.date_input("Tanggal", value=datetime.now().date(), key="asof_date")
+    with c2:
+        at_time = st.time_input("Jam (WIB)", value=time(23, 59), key="asof_time")
+    with c3:
+        employee_id = st.text_input("Employee ID (opsional)", key="asof_emp").strip()
+
+    # time_input per menit → sertakan seluruh menit terpilih
+    at = datetime.combine(day, at_time).replace(second=59)
+    df, info = cached(
+        "as_of", (at, employee_id),
+        lambda: employees_as_of(conn, at, employee_id or None)
+    )
+
+    snapshot = info["snapshot"] or "tidak ada (replay dari awal)"
+    st.caption(
+        f"As of {info['as_of']} — snapshot: {snapshot}, "
+        f"event di-replay: {info['replayed_events']:,}, "
+        f"dari data saat ini: {info['from_current_rows']:,}"
+    )
+
+    if df.empty:
+        st.info("Tidak ada data pegawai pada waktu tersebut.")
+        return
+
+    if employee_id:
+        st.json(df.iloc[0].to_dict())
+    else:
+        st.metric("Jumlah Pegawai", f"{len(df):,}")
+        st.dataframe(df.head(MAX_ROWS), use_container_width=True)
+        if len(df) > MAX_ROWS:
+            st.caption(f"Menampilkan {MAX_ROWS:,} baris pertama.")
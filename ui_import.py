@@ -0,0 +1,84 @@
+import json
+
+import streamlit as st
+
+from db import get_conn
+from importer import import_file, fingerprint, CHECKPOINT_PREFIX
+from score_store import get_state, refresh_scores
+from skills import ROLE_PROFILES, DEFAULT_PROFILE
+from cache import invalidate as invalidate_cache
+
+MAX_ROWS = 1000     # baris laporan yang dirender di tabel
+
+
+def _show_result(result):
+    report = result["report"]
+
+    c1, c2, c3, c4 = st.columns(4)
+    c1.metric("Insert", f"{result['inserted']:,}")
+    c2.metric("Update", f"{result['updated']:,}")
+    c3.metric("Tidak berubah", f"{result['unchanged']:,}")
+    c4.metric("Ditolak", f"{result['rejected']:,}")
+
+    if result["resumed_from"]:
+        st.caption(f"Dilanjutkan dari checkpoint baris data ke-{result['resumed_from']:,}.")
+
+    if report.empty:
+        return
+
+    changes = report[(report["action"] != "UNCHANGED") | (report["issues"] != "")]
+    st.dataframe(changes.head(MAX_ROWS), use_container_width=True)
+    if len(changes) > MAX_ROWS:
+        st.caption(f"Menampilkan {MAX_ROWS:,} dari {len(changes):,} baris laporan.")
+
+    st.download_button(
+        "⬇ Unduh laporan (CSV)", changes.to_csv(index=False).encode("utf-8"),
+        file_name="laporan_import.csv", mime="text/csv", key="import_report_dl"
+    )
+
+
+# ======================================================
+# RENDER IMPORT DATA PEGAWAI
+# ======================================================
+def render_import(role, username):
+
+    st.subheader("📥 Import Data Pegawai (Excel / CSV)")
+    st.caption(
+        "Header kolom mengikuti nama kolom employees (mis. Employee ID, Full Name, "
+        "Department). Kolom yang tidak ada di file tidak diubah."
+    )
+
+    uploaded = st.file_uploader("File HRIS", type=["xlsx", "csv"], key="import_file")
+    if uploaded is None:
+        return
+
+    key = CHECKPOINT_PREFIX + fingerprint(uploaded)
+    checkpoint = get_state(get_conn(), key)
+    if checkpoint:
+        rows = json.loads(checkpoint)["rows"]
+        st.info(f"Import file ini sebelumnya terhenti setelah {rows:,} baris; akan dilanjutkan.")
+
+    c1, c2 = st.columns(2)
+    dry_run = c1.button("🔍 Dry-run (laporan saja)", key="import_dry")
+    run = c2.button("📥 Import", key="import_run")
+    if not (dry_run or run):
+        return
+
+    status = st.empty()
+
+    def progress(rows):
+        status.caption(f"{rows:,} baris diproses...")
+
+    with st.spinner("Memproses file..."):
+        result = import_file(
+            uploaded, name=uploaded.name, username=username, user_role=role,
+            dry_run=dry_run, progress=progress
+        )
+    status.empty()
+
+    if not dry_run:
+        with st.spinner("Menghitung skor baris yang berubah..."):
+            refresh_scores(get_conn(), ROLE_PROFILES[DEFAULT_PROFILE])
+        invalidate_cache()
+        st.success("Import selesai.")
+    _show_result(result)
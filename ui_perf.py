@@ -0,0 +1,50 @@
+import streamlit as st
+
+import perf
+from cache import cache_stats
+
+
+# ======================================================
+# PANEL PERFORMA (SIDEBAR, KHUSUS HC SYSTEM BUREAU HEAD)
+# ======================================================
+def capture_options():
+    """(cProfile, tracemalloc) untuk render halaman ini — dari checkbox panel."""
+    return (st.session_state.get("perf_profile", False),
+            st.session_state.get("perf_trace", False))
+
+
+def render_perf_panel(container, capture=None):
+    """
+    Histogram p50/p95/p99 per timer (SQL, tahap strategist, chart,
+    render halaman), counter, query lambat dan hasil capture render
+    terakhir. Dipanggil setelah halaman selesai dirender agar angka
+    render saat ini ikut tampil.
+    """
+    with container.expander("📊 Performance"):
+        st.checkbox("cProfile tiap render", key="perf_profile")
+        st.checkbox("tracemalloc tiap render", key="perf_trace")
+
+        if capture is not None and capture.ms is not None:
+            st.caption(f"Render terakhir ({capture.name}): {capture.ms:,.0f} ms")
+            if capture.profile:
+                st.code(capture.profile, language=None)
+            if capture.memory:
+                st.code(capture.memory, language=None)
+
+        timers = perf.snapshot()
+        if timers.empty:
+            st.caption("Belum ada data timer.")
+        else:
+            st.dataframe(timers, hide_index=True, use_container_width=True)
+
+        st.caption("Counter")
+        st.json({**perf.counters(), **{f"result_cache.{k}": v for k, v in cache_stats().items()}})
+
+        slow = perf.slow_queries()
+        if not slow.empty:
+            st.caption(f"Query ≥ {perf.SLOW_SQL_MS} ms")
+            st.dataframe(slow, hide_index=True, use_container_width=True)
+
+        if st.button("Reset metrik", key="perf_reset"):
+            perf.reset()
+            st.rerun()
@@ -1,59 +1,94 @@
 import streamlit as st
 import pandas as pd
 from db import get_conn
-from data_strategist import run_data_strategist_pipeline
+from data_strategist import anomaly_labels, ANOMALY_LABELS
+from skills import ROLE_PROFILES
+from talent_readiness import READY_THRESHOLD
+from score_store import stored_aggregate
+from cache import cached
+from exporter import EXPORT_FORMATS, available_formats, export_file
+
+TABLE_ROWS = 1000   # baris yang dirender per tabel
+
+# export_file mengembalikan seluruh file sebagai bytes; di atas batas
+# ini unduhan lewat UI dimatikan dan diarahkan ke CLI exporter.py
+EXPORT_MAX_ROWS = 200_000
+
+
+def load_quality_data():
+    """
+    Agregat insight dan gap per profil dari skor tersimpan + profile_gaps
+    (diperbarui di jalur tulis, hanya baris yang berubah), dihitung di
+    SQL — tabel employees tidak dimuat. Di-cache sampai isi database
+    berubah.
+    """
+    def load():
+        aggregate = stored_aggregate(get_conn(), ROLE_PROFILES)
+
+        if aggregate.rows == 0:
+            return aggregate, [], None
+
+        summary = aggregate.profile_summary()
+        gap_summary = pd.DataFrame({
+            "Profil": [ROLE_PROFILES[p]["label"] for p in summary["profile"]],
+            "Pegawai tanpa gap": summary["no_gap"].to_numpy(),
+            "Rata-rata gap": summary["mean_gap"].to_numpy(),
+        })
+        return aggregate, aggregate.insights(), gap_summary
+
+    return cached("quality", None, load)
+
+
+def load_quality_table(limit=TABLE_ROWS):
+    return cached("quality_table", limit, lambda: pd.read_sql_query(
+        "SELECT employee_id, full_name, data_quality_score AS data_quality_score_adv, "
+        "anomaly_mask, competency_gap_score, talent_readiness_index "
+        "FROM employees ORDER BY employee_id LIMIT ?",
+        get_conn(), params=(limit,)
+    ))
+
+
+def load_anomalies(bits, limit=TABLE_ROWS):
+    """Pegawai dengan anomali (bit 'bits', 0 = semua) + jumlah totalnya."""
+    def load():
+        conn = get_conn()
+        # 'anomaly_mask != 0' → partial index idx_employees_anomaly terpakai
+        where = "anomaly_mask != 0 AND anomaly_mask & ? != 0"
+        params = (bits or -1,)
+        total = conn.execute(f"SELECT COUNT(*) FROM employees WHERE {where}", params).fetchone()[0]
+        df = pd.read_sql_query(
+            f"SELECT employee_id, full_name, anomaly_mask FROM employees WHERE {where} "
+            "ORDER BY employee_id LIMIT ?",
+            conn, params=(*params, limit)
+        )
+        return df, total
+
+    return cached("quality_anomalies", (bits, limit), load)
+
 
 def render_quality():
 
     st.subheader("📈 Data Quality Dashboard (Advanced)")
 
-    conn = get_conn()
-    df = pd.read_sql_query("SELECT * FROM employees", conn)
-    conn.close()
-
-    if df.empty:
-        st.info("Belum ada data.")
-        return
-
     # ==========================================
-    # Tambahkan kolom yang wajib ada di pipeline
+    # SKOR TERSIMPAN (cache per versi database)
     # ==========================================
-    REQUIRED_COLUMNS = [
-        "years_in_department",
-        "years_in_bureau",
-        "avg_perf_3yr",
-        "technical_skills",
-        "soft_skills",
-        "certifications"
-    ]
-
-    for col in REQUIRED_COLUMNS:
-        if col not in df.columns:
-            df[col] = None
+    aggregate, insights, gap_summary = load_quality_data()
 
-    # ==========================================
-    # RUN PIPELINE
-    # ==========================================
-    required_skills = {
-        "technical": ["HCIS", "SQL", "SAP"],
-        "soft": ["analytical", "communication", "coordination"]
-    }
-
-    df_processed, insights = run_data_strategist_pipeline(df, required_skills)
+    if aggregate.rows == 0:
+        st.info("Belum ada data.")
+        return
 
     # ==========================================
     # SUMMARY METRICS
     # ==========================================
     col1, col2, col3 = st.columns(3)
 
-    col1.metric("📉 Rata-rata Data Quality Score",
-                round(df_processed["data_quality_score_adv"].mean(), 1))
+    col1.metric("📉 Rata-rata Data Quality Score", round(aggregate.mean_dq, 1))
 
-    col2.metric("⚠️ Jumlah Anomali",
-                (df_processed["anomaly_flag"] != "OK").sum())
+    col2.metric("⚠️ Jumlah Anomali", aggregate.anomalies)
 
-    col3.metric("⭐ Kandidat Siap (TRI ≥ 75)",
-                (df_processed["talent_readiness_index"] >= 75).sum())
+    col3.metric(f"⭐ Kandidat Siap (TRI ≥ {READY_THRESHOLD})", aggregate.ready)
 
     st.markdown("---")
 
@@ -61,22 +96,43 @@ def render_quality():
     # TABEL
     # ==========================================
     st.markdown("### 📊 Tabel Data Kualitas Pegawai")
-    st.dataframe(df_processed[
-        ["employee_id", "full_name",
-         "data_quality_score_adv", "anomaly_flag",
-         "competency_gap_score", "talent_readiness_index"]
-    ], use_container_width=True)
+    table_df = load_quality_table().copy()
+    table_df.insert(3, "anomaly_flag", anomaly_labels(table_df.pop("anomaly_mask").fillna(0).astype("int64")))
+    st.dataframe(table_df, use_container_width=True)
+    if aggregate.rows > len(table_df):
+        st.caption(f"Menampilkan {len(table_df):,} dari {aggregate.rows:,} pegawai "
+                   "— gunakan Ekspor di bawah untuk tabel lengkap.")
 
     # ==========================================
     # ANOMALI
     # ==========================================
     st.markdown("### 🚨 Anomali Data")
-    anomaly_df = df_processed[df_processed["anomaly_flag"] != "OK"]
+
+    selected_types = st.multiselect(
+        "Filter jenis anomali",
+        list(ANOMALY_LABELS.keys()),
+        format_func=lambda bit: f"{ANOMALY_LABELS[bit]} ({aggregate.anomaly_bits[bit]:,})"
+    )
+    bits = 0
+    for bit in selected_types:
+        bits |= bit
+
+    anomaly_df, anomaly_total = load_anomalies(bits)
 
     if anomaly_df.empty:
         st.success("Tidak ada anomali. Data sangat baik! 🎉")
     else:
-        st.dataframe(anomaly_df[["employee_id", "full_name", "anomaly_flag"]])
+        anomaly_df = anomaly_df.copy()
+        anomaly_df["anomaly_flag"] = anomaly_labels(anomaly_df.pop("anomaly_mask"))
+        st.dataframe(anomaly_df)
+        if anomaly_total > len(anomaly_df):
+            st.caption(f"Menampilkan {len(anomaly_df):,} dari {anomaly_total:,} pegawai beranomali.")
+
+    # ==========================================
+    # GAP PER PROFIL JABATAN
+    # ==========================================
+    st.markdown("### 🎯 Gap Kompetensi per Profil Jabatan")
+    st.dataframe(gap_summary, use_container_width=True, hide_index=True)
 
     # ==========================================
     # INSIGHTS
@@ -84,3 +140,42 @@ def render_quality():
     st.markdown("### 💡 HC Insights (Automated)")
     for i in insights:
         st.write(i)
+
+    # ==========================================
+    # EKSPOR HASIL PIPELINE
+    # ==========================================
+    render_export(aggregate.rows)
+
+
+def render_export(rows):
+    """
+    Unduh tabel hasil pipeline. File baru dibuat saat tombol diklik
+    (deferred download), streaming per chunk ke file sementara. Di atas
+    EXPORT_MAX_ROWS pegawai hanya ditampilkan perintah CLI — isi file
+    unduhan ditahan di memori.
+    """
+    st.markdown("### ⬇ Ekspor Hasil Pipeline")
+
+    c1, c2 = st.columns(2)
+    profile = c1.selectbox(
+        "Profil jabatan", list(ROLE_PROFILES),
+        format_func=lambda p: ROLE_PROFILES[p]["label"], key="export_profile"
+    )
+    fmt = c2.selectbox("Format", available_formats(), key="export_format")
+
+    suffix, mime = EXPORT_FORMATS[fmt]
+    if rows > EXPORT_MAX_ROWS:
+        st.warning(
+            f"{rows:,} pegawai melebihi batas unduhan UI ({EXPORT_MAX_ROWS:,}). "
+            "Jalankan ekspor streaming di server:"
+        )
+        st.code(f"python exporter.py talent_readiness_{profile}{suffix} --profile {profile}",
+                language="bash")
+        return
+
+    st.download_button(
+        f"⬇ Unduh {fmt.upper()}",
+        data=lambda: export_file(fmt, profile),
+        file_name=f"talent_readiness_{profile}{suffix}",
+        mime=mime, on_click="ignore", key="export_download"
+    )
@@ -6,6 +6,16 @@ from math import pi
 import io
 
 from db import get_conn
+import plotly.graph_objects as go
+
+from skills import ROLE_PROFILES, DEFAULT_PROFILE, competency_gap_matrix
+from data_strategist import (
+    RankingMatrix, RANKING_FEATURES, DEFAULT_RANKING_WEIGHTS, MPL_MIN, MPL_MAX
+)
+from talent_readiness import coerce_numeric
+from cache import cached, LRUCache
+from perf import timed
+from ui_search import employee_search_box
 
 
 # ==========================================================
@@ -30,132 +40,297 @@ def safe_float(x):
 
 
 # ==========================================================
-# SKILL MATCH (%)
+# FITUR RADAR (VEKTOR)
 # ==========================================================
-def compute_skill_match(candidate_skills, required_skills):
-    if not candidate_skills:
-        return 0.0
+RADAR_LABELS = ["Experience", "Performance", "Tech Skills", "Soft Skills", "Certifications", "Discipline"]
 
-    cand = set([s.strip().lower() for s in str(candidate_skills).split(",") if s.strip()])
-    req = set([s.strip().lower() for s in required_skills if s.strip()])
+# Profil skill radar (bagian dari kunci cache PNG)
+RADAR_REQUIRED = {
+    "technical": ["sap", "sql", "python"],
+    "soft": ["leadership", "communication", "coordination"],
+}
 
-    if len(req) == 0:
-        return 100.0
 
-    match = len(cand & req) / len(req)
-    return round(match * 100, 1)
+def _profile_key(required):
+    return tuple((cat, tuple(required.get(cat, []))) for cat in ("technical", "soft"))
 
 
-# ==========================================================
-# TRI Calculation
-# ==========================================================
-def compute_TRI(row):
-    years = safe_int(row.get("years_in_department"))
-    perf = safe_float(row.get("avg_perf_3yr"))
-    discipline = safe_int(row.get("has_discipline_issue"))
+def radar_features(df: pd.DataFrame, required=RADAR_REQUIRED) -> np.ndarray:
+    """
+    Matriks fitur radar (n_kandidat x 6, skala 0–100) sekaligus untuk
+    semua kandidat; nilai sama dengan perhitungan per-sel sebelumnya.
+    """
+    v = coerce_numeric(df, ["years_in_department", "avg_perf_3yr", "has_discipline_issue"])
+
+    # skill match = (jumlah skill wajib - gap) / jumlah skill wajib
+    profiles = {cat: {cat: required.get(cat, [])} for cat in ("technical", "soft")}
+    gaps = competency_gap_matrix(df, profiles)
+    match = {}
+    for cat in profiles:
+        n_req = len(required.get(cat, []))
+        match[cat] = (np.full(len(df), 100.0) if n_req == 0
+                      else np.round((n_req - gaps[cat].to_numpy()) / n_req * 100, 1))
 
-    score = years * 2 + perf * 10
-    if discipline:
-        score -= 15
+    certs = (df["certifications"].fillna("").astype(str).str.split(",")
+             .map(lambda parts: sum(1 for p in parts if p.strip())).to_numpy())
 
-    return max(0, min(100, score))
+    return np.column_stack([
+        np.minimum(np.trunc(v["years_in_department"]), 20) * 5,
+        v["avg_perf_3yr"] * 20,
+        match["technical"],
+        match["soft"],
+        np.minimum(certs * 33, 100),
+        np.where(np.trunc(v["has_discipline_issue"]) != 0, 0, 100),
+    ]).astype(float)
 
 
 # ==========================================================
 # RADAR CHART MINI (STREAMLIT-PROOF)
-# — menggunakan PNG buffer agar ukuran stabil
+# — PNG di-cache per (employee_id, last_updated, profil skill)
 # ==========================================================
-def plot_radar_chart(values, labels, title):
+_radar_cache = LRUCache(max_entries=256, max_bytes=32 * 1024 * 1024)
 
-    N = len(values)
+
+@timed("chart.radar_png")
+def _radar_png(rows, names, title, size=2.2) -> bytes:
+    """Satu figure polar; rows = satu atau beberapa vektor fitur (overlay)."""
+    N = len(RADAR_LABELS)
     angles = [n / float(N) * 2 * pi for n in range(N)]
-    values = values + values[:1]
     angles = angles + angles[:1]
 
     # MINI FIGURE
-    fig, ax = plt.subplots(figsize=(2.2, 2.2), dpi=80, subplot_kw=dict(polar=True))
+    fig, ax = plt.subplots(figsize=(size, size), dpi=80, subplot_kw=dict(polar=True))
     ax.set_aspect("equal")
 
-    # Plot data
-    ax.plot(angles, values, linewidth=1.3, linestyle="solid")
-    ax.fill(angles, values, alpha=0.25)
+    for values, name in zip(rows, names):
+        values = list(values) + [values[0]]
+        ax.plot(angles, values, linewidth=1.3, linestyle="solid", label=name)
+        ax.fill(angles, values, alpha=0.25 if len(rows) == 1 else 0.1)
 
     # Label
     ax.set_xticks(angles[:-1])
-    ax.set_xticklabels(labels, fontsize=7)
+    ax.set_xticklabels(RADAR_LABELS, fontsize=7)
 
     ax.set_yticklabels([])
     ax.set_title(title, fontsize=9, pad=10)
+    if len(rows) > 1:
+        ax.legend(fontsize=6, loc="upper right", bbox_to_anchor=(1.35, 1.1))
 
     plt.tight_layout(pad=0.1)
 
     # Render PNG agar ukuran tidak berubah oleh Streamlit
     buf = io.BytesIO()
     fig.savefig(buf, format="png", dpi=90, bbox_inches="tight")
-    buf.seek(0)
     plt.close(fig)
-
-    st.image(buf, width=220)   # ukuran fix & proporsional
+    return buf.getvalue()
+
+
+def radar_png(cands: pd.DataFrame, features: np.ndarray, required=RADAR_REQUIRED) -> bytes:
+    """
+    PNG radar satu kandidat, atau overlay bila lebih dari satu baris.
+    Kunci cache memakai last_updated sehingga perubahan data pegawai
+    otomatis menghasilkan gambar baru.
+    """
+    ids = tuple(zip(cands["employee_id"], cands["last_updated"]))
+    key = (ids, _profile_key(required))
+
+    png = _radar_cache.get(key)
+    if png is None:
+        if len(cands) == 1:
+            png = _radar_png(features, [ids[0][0]], f"Talent Profile – {ids[0][0]}")
+        else:
+            png = _radar_png(features, list(cands["employee_id"]), "Perbandingan Kandidat", size=3.2)
+        _radar_cache.put(key, png)
+    return png
+
+
+@timed("chart.radar_plotly")
+def radar_plotly(cands: pd.DataFrame, features: np.ndarray):
+    """Radar interaktif (dirender di browser, tanpa rasterisasi server)."""
+    fig = go.Figure()
+    labels = RADAR_LABELS + RADAR_LABELS[:1]
+    for emp, values in zip(cands["employee_id"], features):
+        fig.add_trace(go.Scatterpolar(
+            r=list(values) + [values[0]], theta=labels, fill="toself", name=emp
+        ))
+    fig.update_layout(
+        polar=dict(radialaxis=dict(visible=True, range=[0, 100])),
+        height=360, margin=dict(l=40, r=40, t=30, b=30), showlegend=len(cands) > 1
+    )
+    return fig
 
 
 # ==========================================================
 # MAIN SCREENING UI (LEVEL 2 + MULTISELECT)
 # ==========================================================
+SCREENING_COLUMNS = [
+    "employee_id", "full_name", "department", "bureau", "job_title",
+    "mpl_level", "years_in_department", "avg_perf_3yr", "technical_skills",
+    "soft_skills", "certifications", "has_discipline_issue", "last_updated",
+]
+
+# kolom yang dibaca RankingMatrix.from_frame (bukan SELECT *)
+RANKING_COLUMNS = [
+    "employee_id", "full_name", "department", "bureau", "job_title", "mpl_level",
+    "avg_perf_3yr", "years_in_bureau", "has_discipline_issue", "certifications",
+    "technical_skills", "soft_skills",
+]
+
+TABLE_COLUMNS = [
+    "employee_id", "full_name", "department", "bureau", "job_title",
+    "years_in_department", "avg_perf_3yr", "TRI"
+]
+
+
+def load_departments():
+    """DISTINCT department — dibaca dari index (department, TRI)."""
+    def load():
+        rows = get_conn().execute(
+            "SELECT DISTINCT department FROM employees "
+            "WHERE department IS NOT NULL ORDER BY department"
+        ).fetchall()
+        return [r[0] for r in rows]
+
+    return cached("departments", None, load)
+
+
+def query_candidates(department=None, min_tri=0, limit=100):
+    """
+    Filter + urut + limit di SQLite:
+    WHERE department=? AND tri>=? ORDER BY tri DESC LIMIT ?
+    Mengembalikan (DataFrame kandidat, jumlah total yang lolos filter).
+    """
+    def load():
+        where = ["talent_readiness_index >= ?"]
+        params = [min_tri]
+        if department is not None:
+            where.insert(0, "department = ?")
+            params.insert(0, department)
+        clause = " AND ".join(where)
+
+        conn = get_conn()
+        total = conn.execute(
+            f"SELECT COUNT(*) FROM employees WHERE {clause}", params
+        ).fetchone()[0]
+        df = pd.read_sql_query(
+            f"SELECT {', '.join(SCREENING_COLUMNS)}, talent_readiness_index AS TRI "
+            f"FROM employees WHERE {clause} "
+            "ORDER BY talent_readiness_index DESC LIMIT ?",
+            conn, params=params + [limit]
+        )
+        return df, total
+
+    return cached("screening", (department, min_tri, limit), load)
+
+
+def load_candidate(employee_id):
+    """Satu pegawai (kolom screening + TRI) lewat primary key."""
+    def load():
+        return pd.read_sql_query(
+            f"SELECT {', '.join(SCREENING_COLUMNS)}, talent_readiness_index AS TRI "
+            "FROM employees WHERE employee_id = ?",
+            get_conn(), params=(employee_id,)
+        )
+
+    return cached("screening_candidate", employee_id, load)
+
+
+def load_ranking_matrix(profile=DEFAULT_PROFILE):
+    """
+    Matriks fitur ranking, dibangun sekali per versi database — hanya
+    kolom RANKING_COLUMNS + skor kualitas data tersimpan.
+    """
+    def load():
+        df = pd.read_sql_query(
+            f"SELECT {', '.join(RANKING_COLUMNS)}, "
+            "data_quality_score AS data_quality_score_adv FROM employees",
+            get_conn()
+        )
+        return RankingMatrix.from_frame(df, ROLE_PROFILES[profile])
+
+    return cached("ranking", profile, load)
+
+
+def render_ranking(department=None):
+    """Top-K berbobot (opsional per bureau) dari RankingMatrix."""
+    with st.expander("🏆 Ranking Top-K Berbobot"):
+        # isi expander tetap dieksekusi walau tertutup → matriks (seluruh
+        # tabel) hanya dibangun setelah diaktifkan
+        if not st.checkbox("Aktifkan ranking", key="rank_on"):
+            st.caption("Centang untuk membangun matriks ranking seluruh pegawai.")
+            return
+
+        c1, c2, c3 = st.columns(3)
+        k = c1.number_input("K", min_value=1, max_value=200, value=20, key="rank_k")
+        per_bureau = c2.checkbox("Top-K per bureau", key="rank_per_bureau")
+        mpl_band = c3.slider("MPL band", MPL_MIN, MPL_MAX, (MPL_MIN, MPL_MAX), key="rank_mpl")
+
+        st.caption("Bobot fitur (dinormalisasi otomatis)")
+        cols = st.columns(len(RANKING_FEATURES))
+        weights = {
+            f: col.slider(f, 0.0, 1.0, DEFAULT_RANKING_WEIGHTS[f], 0.05, key=f"rank_w_{f}")
+            for f, col in zip(RANKING_FEATURES, cols)
+        }
+        if sum(weights.values()) == 0:
+            st.warning("Minimal satu bobot harus > 0.")
+            return
+
+        ranking = load_ranking_matrix()
+        band = None if mpl_band == (MPL_MIN, MPL_MAX) else mpl_band
+        if per_bureau:
+            result = ranking.top_k_per("bureau", int(k), weights, department=department, mpl_band=band)
+        else:
+            result = ranking.top_k(int(k), weights, department=department, mpl_band=band)
+
+        st.dataframe(result, use_container_width=True, hide_index=True)
+
+
 def render_screening():
 
     st.subheader("📊 Screening Kandidat & Talent Readiness (Level 2 + Multi-Select)")
 
-    conn = get_conn()
-    df = pd.read_sql_query("SELECT * FROM employees", conn)
-    conn.close()
+    # TRI tersimpan di employees.talent_readiness_index — diperbarui di
+    # jalur tulis dan awal run (score_store.refresh_if_due), tidak di sini
+    departments = load_departments()
 
-    if df.empty:
+    if not departments:
         st.warning("Belum ada data pegawai.")
         return
 
-    # Ensure required columns exist
-    required_cols = [
-        "department", "bureau", "job_title", "years_in_department",
-        "avg_perf_3yr", "technical_skills", "soft_skills",
-        "certifications", "has_discipline_issue"
-    ]
-    for c in required_cols:
-        if c not in df.columns:
-            df[c] = None
-
-    # Compute TRI
-    df["TRI"] = df.apply(compute_TRI, axis=1)
-    df = df.sort_values("TRI", ascending=False).reset_index(drop=True)
-
 
     # =============================
     # FILTER
     # =============================
-    col1, col2 = st.columns(2)
+    col1, col2, col3 = st.columns(3)
 
     dept = col1.selectbox(
         "Filter Department",
-        ["Semua"] + sorted(df["department"].dropna().unique().tolist())
+        ["Semua"] + departments
     )
 
     min_tri = col2.slider("Minimal TRI", 0, 100, 0)
 
-    df_filtered = df.copy()
-    if dept != "Semua":
-        df_filtered = df_filtered[df_filtered["department"] == dept]
-    df_filtered = df_filtered[df_filtered["TRI"] >= min_tri]
+    limit = col3.selectbox("Tampilkan maksimal", [100, 500, 1000], index=0)
+
+    df_filtered, total = query_candidates(
+        None if dept == "Semua" else dept, min_tri, limit
+    )
+
+    render_ranking(None if dept == "Semua" else dept)
+
+    found = employee_search_box("screening")
+    if found:
+        st.dataframe(load_candidate(found)[TABLE_COLUMNS], use_container_width=True)
 
 
     # =============================
     # TABLE
     # =============================
     st.markdown("### 📋 Daftar Kandidat")
+    st.caption(f"{total:,} kandidat memenuhi filter — menampilkan {len(df_filtered):,} TRI tertinggi.")
 
     st.dataframe(
-        df_filtered[
-            ["employee_id","full_name","department","bureau","job_title",
-             "years_in_department","avg_perf_3yr","TRI"]
-        ],
+        df_filtered[TABLE_COLUMNS],
         use_container_width=True
     )
 
@@ -179,13 +354,29 @@ def render_screening():
         st.info("Pilih minimal 1 kandidat.")
         return
 
+    mode_col, engine_col = st.columns(2)
+    compare = mode_col.radio(
+        "Tampilan radar", ["Per kandidat", "Perbandingan (overlay)"], horizontal=True
+    ) == "Perbandingan (overlay)"
+    use_plotly = engine_col.checkbox("Radar interaktif (Plotly)")
+
+    cands = (df_filtered.set_index("employee_id").loc[selected_emps]
+             .reset_index())
+    features = radar_features(cands)
+
+    if compare:
+        st.markdown("### 📊 Radar Kompetensi — Perbandingan")
+        if use_plotly:
+            st.plotly_chart(radar_plotly(cands, features), use_container_width=True)
+        else:
+            st.image(radar_png(cands, features), width=360)
+        st.markdown("---")
+
 
     # =============================
     # LOOP PER KANDIDAT
     # =============================
-    for emp in selected_emps:
-
-        cand = df_filtered[df_filtered["employee_id"] == emp].iloc[0]
+    for i, cand in cands.iterrows():
 
         st.markdown(
             f"""
@@ -197,24 +388,16 @@ def render_screening():
             """
         )
 
-        # Radar values
-        required_tech = ["sap", "sql", "python"]
-        required_soft = ["leadership", "communication", "coordination"]
-
-        radar_values = [
-            min(safe_int(cand["years_in_department"]), 20) * 5,
-            safe_float(cand["avg_perf_3yr"]) * 20,
-            compute_skill_match(cand["technical_skills"], required_tech),
-            compute_skill_match(cand["soft_skills"], required_soft),
-            min(len([c for c in (cand["certifications"] or "").split(",") if c.strip()]) * 33, 100),
-            0 if safe_int(cand["has_discipline_issue"]) else 100
-        ]
-
-        labels = ["Experience", "Performance", "Tech Skills", "Soft Skills", "Certifications", "Discipline"]
+        tech_match, soft_match = features[i, 2], features[i, 3]
 
         # Render Mini Radar
-        st.markdown("### 📊 Radar Kompetensi")
-        plot_radar_chart(radar_values, labels, f"Talent Profile – {cand['employee_id']}")
+        if not compare:
+            st.markdown("### 📊 Radar Kompetensi")
+            if use_plotly:
+                st.plotly_chart(radar_plotly(cands.iloc[[i]], features[[i]]),
+                                use_container_width=True, key=f"radar_{cand['employee_id']}")
+            else:
+                st.image(radar_png(cands.iloc[[i]], features[[i]]), width=220)   # ukuran fix & proporsional
 
         # Insights
         st.markdown("### 💡 Insight Singkat")
@@ -227,8 +410,8 @@ def render_screening():
             st.write(f"- Disiplin: {'❌ Ada catatan' if safe_int(cand['has_discipline_issue']) else '✔ Bersih'}")
 
         with colB:
-            st.write(f"- Hard Skill Match: **{compute_skill_match(cand['technical_skills'], required_tech)}%**")
-            st.write(f"- Soft Skill Match: **{compute_skill_match(cand['soft_skills'], required_soft)}%**")
+            st.write(f"- Hard Skill Match: **{tech_match}%**")
+            st.write(f"- Soft Skill Match: **{soft_match}%**")
             st.write(f"- Sertifikasi: **{cand['certifications'] or 'Tidak ada'}**")
 
         st.markdown("---")
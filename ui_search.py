@@ -0,0 +1,118 @@
+import streamlit as st
+
+from db import get_conn
+from employee_search import (
+    search_employees, lookup_employees, fetch_employee, DEFAULT_LIMIT, LOOKUP_LIMIT
+)
+from cache import cached, db_version, LRUCache
+
+# record per pegawai: employee_id → (versi db, last_updated, dict)
+_record_cache = LRUCache(max_entries=256, max_bytes=8 * 1024 * 1024)
+
+
+def search(text, limit=DEFAULT_LIMIT):
+    """search_employees, di-cache per versi database."""
+    return cached("employee_search", (text, limit),
+                  lambda: search_employees(get_conn(), text, limit))
+
+
+def lookup(text, limit=LOOKUP_LIMIT):
+    return cached("employee_lookup", (text, limit),
+                  lambda: lookup_employees(get_conn(), text, limit))
+
+
+def load_employee(employee_id):
+    """
+    Record lengkap satu pegawai, di-cache lintas rerun sampai pegawai
+    itu berubah. Versi database sama → langsung dari cache; versi
+    berubah → cukup cek last_updated pegawai tersebut.
+    """
+    version = db_version()
+    entry = _record_cache.get(employee_id)
+    if entry is not None:
+        cached_version, stamp, record = entry
+        if cached_version != version:
+            row = get_conn().execute(
+                "SELECT last_updated FROM employees WHERE employee_id=?", (employee_id,)
+            ).fetchone()
+            if row is None or row[0] != stamp:
+                entry = None
+            else:
+                _record_cache.put(employee_id, (version, stamp, record))
+        if entry is not None:
+            return dict(record)
+
+    record = fetch_employee(get_conn(), employee_id)
+    if record is None:
+        _record_cache.pop(employee_id)
+        return None
+    _record_cache.put(employee_id, (version, record.get("last_updated"), record))
+    return dict(record)
+
+
+# ======================================================
+# TYPEAHEAD EMPLOYEE ID / NAMA
+# ======================================================
+def employee_lookup_box(key, limit=LOOKUP_LIMIT,
+                        label="Employee ID / Nama (ketik awalannya)"):
+    """
+    Ketik awalan → maksimal 'limit' pegawai yang cocok; hasil teratas
+    langsung terpilih. Mengembalikan employee_id atau None.
+    """
+    text = st.text_input(label, key=f"{key}_lookup",
+                         placeholder="mis. EMP00012 atau Gita").strip()
+    if not text:
+        return None
+
+    df = lookup(text, limit)
+    if df.empty:
+        st.caption("Tidak ada Employee ID / nama dengan awalan tersebut.")
+        return None
+
+    labels = {
+        r.employee_id: f"{r.employee_id} — {r.full_name} ({r.job_title or '-'}, {r.department or '-'})"
+        for r in df.itertuples()
+    }
+    more = "+" if len(df) == limit else ""
+    return st.selectbox(f"Cocok ({len(df)}{more})", list(labels),
+                        format_func=labels.get, key=f"{key}_lookup_pick")
+
+
+# ======================================================
+# KOTAK PENCARIAN PEGAWAI (DIPAKAI ULANG DI BANYAK HALAMAN)
+# ======================================================
+def employee_search_box(key, on_pick=None, limit=DEFAULT_LIMIT,
+                        label="🔎 Cari pegawai (nama, jabatan, catatan, skill)"):
+    """
+    Text input + daftar hasil bm25. Mengembalikan employee_id yang
+    dipilih (atau None). on_pick(employee_id) dipanggil sekali saat
+    pengguna memilih hasil — untuk mengisi widget lain di halaman.
+    """
+    text = st.text_input(
+        label, key=f"{key}_search",
+        placeholder='mis. budi, "data analysis", geolo'
+    ).strip()
+    if not text:
+        return None
+
+    df = search(text, limit)
+    if df.empty:
+        st.caption("Tidak ada pegawai yang cocok.")
+        return None
+
+    labels = {
+        r.employee_id: f"{r.employee_id} — {r.full_name} ({r.job_title or '-'}, {r.department or '-'})"
+        for r in df.itertuples()
+    }
+    pick_key = f"{key}_search_pick"
+
+    def picked():
+        if on_pick is not None and st.session_state.get(pick_key):
+            on_pick(st.session_state[pick_key])
+
+    choice = st.selectbox(
+        f"Hasil ({len(df)} teratas)", list(labels),
+        index=None, format_func=labels.get,
+        placeholder="Pilih pegawai...", key=pick_key, on_change=picked
+    )
+    return choice
@@ -0,0 +1,49 @@
+import streamlit as st
+
+from db import get_conn
+from skill_index import search_skills, skill_vocabulary
+from cache import cached
+
+MAX_ROWS = 500      # baris yang dirender di tabel
+
+
+def load_skill_vocabulary():
+    """Token skill di index, di-cache per versi database."""
+    return cached("skill_vocabulary", None, lambda: skill_vocabulary(get_conn()))
+
+
+def search(all_of, any_of, none_of):
+    def load():
+        return search_skills(get_conn(), all_of, any_of, none_of, limit=MAX_ROWS)
+
+    return cached("skill_search", (tuple(all_of), tuple(any_of), tuple(none_of)), load)
+
+
+# ======================================================
+# RENDER PENCARIAN SKILL
+# ======================================================
+def render_skill_search():
+
+    st.subheader("🔎 Cari Pegawai per Skill")
+    st.caption("Token: technical:… (skill teknis), soft:… (soft skill), cert:… (sertifikasi).")
+
+    vocabulary = load_skill_vocabulary()
+
+    all_of = st.multiselect("Harus punya SEMUA (AND)", vocabulary, key="skill_all")
+    any_of = st.multiselect("Minimal SALAH SATU (OR)", vocabulary, key="skill_any")
+    none_of = st.multiselect("TIDAK punya (NOT)", vocabulary, key="skill_none")
+
+    if not (all_of or any_of or none_of):
+        st.info("Pilih minimal satu skill.")
+        return
+
+    df, total = search(all_of, any_of, none_of)
+
+    st.metric("Pegawai Cocok", f"{total:,}")
+    if df.empty:
+        st.info("Tidak ada pegawai yang cocok.")
+        return
+
+    st.dataframe(df, use_container_width=True)
+    if total > len(df):
+        st.caption(f"Menampilkan {len(df):,} dari {total:,} pegawai (urut Employee ID).")